@@ -0,0 +1,16 @@
+# Fly any mission of missions.json
+#
+# The simulator picks the mission through overrides, e.g.
+# run_script("Fly_Mission.py", world, overrides={"MISSION": "Waypoint_Avoid09"}),
+# which is how `python -m flight.mission compare` runs A/B comparisons. On
+# hardware use `python -m flight.mission fly <name>`. SETTINGS override the
+# mission's settings, e.g. {"safety_margin": 0.3, "policy.forward": 0.8};
+# CONFIG picks another mission file.
+from flight.mission import fly
+
+MISSION = "Waypoint_Avoid06"
+SETTINGS = {}
+CONFIG = None
+
+if __name__ == "__main__":
+    fly(MISSION, SETTINGS, CONFIG)
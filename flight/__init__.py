@@ -0,0 +1 @@
+"""Shared flight helpers for the Waypoint_Avoid scripts."""
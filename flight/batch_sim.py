@@ -0,0 +1,315 @@
+# Vectorized batch mission simulator for parameter sweeps
+"""
+Fly thousands of missions in lockstep as NumPy arrays.
+
+Every drone is one (parameter set, obstacle layout) pair. All drones share
+one physics clock; each runs the move_towards + front-bypass policy of
+Waypoint_Avoid05/06/09 at its own loop rate, and ranging for all drones and
+all four horizontal sensors is a single broadcast ray-vs-box test.
+
+    grid = {"threshold": [0.25, 0.45, 0.60], "step": [0.05, 0.1]}
+    layouts = random_layouts(1000, np.random.default_rng(0))
+    for row in sweep(grid, layouts):
+        print(row)
+
+Differences from the scripts, on purpose: after an avoidance maneuver the
+drone resumes towards the same waypoint instead of skipping it, and a
+waypoint not reached within `leg_timeout` fails the mission. Otherwise
+"success" would not mean anything.
+"""
+import argparse
+import itertools
+
+import numpy as np
+
+# Same square as the scripts' newsequence
+NEWSEQUENCE = [
+    (0.0, 0.0, 0.4),
+    (1.0, 0.0, 0.4),
+    (1.0, -0.4, 0.4),
+    (0.0, -0.4, 0.4),
+    (-1.0, -0.4, 0.4),
+    (-1.0, 0.0, 0.4),
+    (0.0, 0.0, 0.4),
+]
+
+# Policy parameters and the values hard-coded in Waypoint_Avoid06
+DEFAULTS = {
+    "threshold": 0.60,      # is_close() detection range (m)
+    "step": 0.05,           # move_towards step per tick (m)
+    "sidestep": 0.5,        # bypass sidestep (m)
+    "forward": 0.5,         # bypass forward leg (m)
+    "side_sign": -1.0,      # -1: sidestep to -y (04/06/07/08), +1: to +y (05/09)
+    "right_escape": -0.5,   # y shift on a right-side obstacle (scripts use cy - 0.5)
+    "loop_rate": 20.0,      # control loop rate (Hz)
+    "velocity": 0.5,        # PositionHlCommander default velocity (m/s)
+    "clearance": 0.25,      # abort a maneuver leg when the travel direction is this close
+}
+PARAMS = list(DEFAULTS)
+
+# Horizontal Multiranger rays: front, back, left, right
+RAY_AXIS = np.array([0, 0, 1, 1])
+RAY_SIGN = np.array([1.0, -1.0, 1.0, -1.0])
+_PERP = np.arange(3)[None, :] != RAY_AXIS[:, None]       # (4, 3)
+FAR = 1e6                                                 # padding box position
+
+
+def ray_ranges(pos, lo, hi, max_range=4.0):
+    """
+    Ranges (N, 4) for front/back/left/right of N drones against their own
+    boxes lo/hi (N, B, 3). inf where nothing is within max_range.
+    """
+    p = pos[:, None, None, :]                              # (N, 1, 1, 3)
+    blo, bhi = lo[:, None, :, :], hi[:, None, :, :]        # (N, 1, B, 3)
+    inside = (blo <= p) & (p <= bhi)                       # (N, 1, B, 3)
+    in_perp = np.all(inside | ~_PERP[None, :, None, :], axis=-1)   # (N, 4, B)
+
+    p_a = pos[:, RAY_AXIS][:, :, None]                     # (N, 4, 1)
+    lo_a = np.swapaxes(lo[:, :, RAY_AXIS], 1, 2)           # (N, 4, B)
+    hi_a = np.swapaxes(hi[:, :, RAY_AXIS], 1, 2)
+    ahead = np.where(RAY_SIGN[None, :, None] > 0, hi_a >= p_a, lo_a <= p_a)
+    dist = np.where(RAY_SIGN[None, :, None] > 0, lo_a - p_a, p_a - hi_a)
+    dist = np.where(in_perp & ahead, np.maximum(dist, 0.0), np.inf).min(axis=2)
+    dist[dist > max_range] = np.inf
+    return dist
+
+
+def box_clearance(pos, lo, hi):
+    """Distance (N,) from each drone to its nearest box."""
+    d = np.maximum(np.maximum(lo - pos[:, None, :], 0.0), pos[:, None, :] - hi)
+    return np.sqrt((d * d).sum(axis=2)).min(axis=1)
+
+
+def random_layouts(count, rng, boxes=(1, 4), size=(0.1, 0.4), area=((-1.4, 1.4), (-0.9, 0.5)),
+                   route=NEWSEQUENCE, keep_out=0.3):
+    """
+    Random obstacle layouts as (lo, hi) arrays of shape (count, max_boxes, 3).
+    Boxes never cover a waypoint (keep_out margin); unused slots are parked far away.
+    """
+    n_max = boxes[1]
+    lo = np.full((count, n_max, 3), FAR)
+    hi = np.full((count, n_max, 3), FAR)
+    wps = np.array(route)[:, :2]
+    n_boxes = rng.integers(boxes[0], boxes[1] + 1, size=count)
+    for k in range(n_max):
+        sx, sy = rng.uniform(*size, count), rng.uniform(*size, count)
+        cx, cy = rng.uniform(*area[0], count), rng.uniform(*area[1], count)
+        # Reject (park) boxes that would sit on a waypoint
+        gap_x = np.abs(cx[:, None] - wps[None, :, 0]) - sx[:, None] / 2
+        gap_y = np.abs(cy[:, None] - wps[None, :, 1]) - sy[:, None] / 2
+        clear = ((gap_x > keep_out) | (gap_y > keep_out)).all(axis=1)
+        use = (k < n_boxes) & clear
+        lo[use, k] = np.stack([cx - sx / 2, cy - sy / 2, np.zeros(count)], axis=1)[use]
+        hi[use, k] = np.stack([cx + sx / 2, cy + sy / 2, np.full(count, 2.0)], axis=1)[use]
+    return lo, hi
+
+
+class BatchSim:
+    """
+    N drones stepped together. params: dict name -> array (N,) (missing
+    names use DEFAULTS); lo/hi: per-drone obstacle boxes (N, B, 3).
+    """
+
+    def __init__(self, params, lo, hi, route=NEWSEQUENCE, dt=0.01, sensor_period=0.1,
+                 leg_timeout=15.0, max_time=90.0, radius=0.06, kp=25.0, kd=10.0, max_accel=8.0):
+        n = lo.shape[0]
+        self.n = n
+        self.p = {k: np.broadcast_to(np.asarray(params.get(k, v), float), (n,)).copy()
+                  for k, v in DEFAULTS.items()}
+        self.lo, self.hi = lo, hi
+        self.route = np.asarray(route, float)
+        self.dt, self.sensor_period = dt, sensor_period
+        self.leg_timeout, self.max_time = leg_timeout, max_time
+        self.radius, self.kp, self.kd, self.max_accel = radius, kp, kd, max_accel
+
+        start = np.tile(self.route[0], (n, 1))
+        self.pos = start.copy()
+        self.vel = np.zeros((n, 3))
+        self.sp = start.copy()              # high-level setpoint (slews at `velocity`)
+        self.cmd = start.copy()             # last go_to target
+        self.ranges = np.full((n, 4), np.inf)
+        self.wp = np.ones(n, int)           # route[0] is the start / takeoff point
+        self.wp_deadline = np.full(n, leg_timeout)
+        self.mode = np.zeros(n, int)        # 0: progress, 1: maneuver
+        self.legs = np.zeros((n, 3, 3))
+        self.leg = np.zeros(n, int)
+        self.n_legs = np.zeros(n, int)
+        self.next_tick = np.zeros(n)
+        self.active = np.ones(n, bool)
+        self.done = np.zeros(n, bool)
+        self.collided = np.zeros(n, bool)
+        self.timed_out = np.zeros(n, bool)
+        self.t_done = np.full(n, np.nan)
+        self.min_clearance = np.full(n, np.inf)
+        self.maneuvers = np.zeros(n, int)
+        self.now = 0.0
+        self._next_sense = 0.0
+
+    def _tick(self, i):
+        """One control-loop iteration for drones i (index array)."""
+        p = {k: v[i] for k, v in self.p.items()}
+        r = self.ranges[i]
+        cmd = self.cmd[i]
+        mode = self.mode[i]
+
+        # ---- detection (progress mode only, like move_with_avoidance) ----
+        front = (mode == 0) & (r[:, 0] < p["threshold"])
+        right = (mode == 0) & ~front & (r[:, 3] < p["threshold"])
+        side = p["sidestep"] * p["side_sign"]
+        if front.any() or right.any():
+            legs = self.legs[i]
+            f = front
+            zero = np.zeros(f.sum())
+            legs[f, 0] = cmd[f] + np.stack([zero, side[f], zero], 1)
+            legs[f, 1] = legs[f, 0] + np.stack([p["forward"][f], zero, zero], 1)
+            legs[f, 2] = legs[f, 1] - np.stack([zero, side[f], zero], 1)
+            zero = np.zeros(right.sum())
+            legs[right, 0] = cmd[right] + np.stack([zero, p["right_escape"][right], zero], 1)
+            self.legs[i] = legs
+            started = front | right
+            self.n_legs[i] = np.where(front, 3, np.where(right, 1, self.n_legs[i]))
+            self.leg[i] = np.where(started, 0, self.leg[i])
+            mode = np.where(started, 1, mode)
+            self.maneuvers[i] += started
+
+        # ---- targets ----
+        leg = self.leg[i]
+        man = mode == 1
+        target = np.where(man[:, None], self.legs[i, np.minimum(leg, 2)], self.route[self.wp[i]])
+
+        # Abort a leg when the travel direction is blocked
+        delta = target - cmd
+        along_x = np.abs(delta[:, 0]) >= np.abs(delta[:, 1])
+        sensor = np.where(along_x, np.where(delta[:, 0] > 0, 0, 1), np.where(delta[:, 1] > 0, 2, 3))
+        moving = np.abs(delta[:, :2]).max(axis=1) > 1e-9
+        blocked = man & moving & (r[np.arange(len(i)), sensor] < p["clearance"])
+        mode = np.where(blocked, 0, mode)
+        target = np.where(blocked[:, None], self.route[self.wp[i]], target)
+
+        # ---- move_towards: per-axis step ----
+        step = p["step"][:, None]
+        new = cmd + np.clip(target - cmd, -step, step)
+        new[:, 2] = target[:, 2]
+        moved = np.sqrt(((new - cmd) ** 2).sum(axis=1))
+        self.cmd[i] = new
+
+        # ---- convergence ----
+        reached = np.all(np.abs(new - target) < 1e-9, axis=1)
+        leg_done = man & ~blocked & reached
+        leg = np.where(leg_done, leg + 1, leg)
+        mode = np.where(leg_done & (leg >= self.n_legs[i]), 0, mode)
+        self.leg[i] = leg
+
+        wp_done = (mode == 0) & ~man & reached
+        wp = self.wp[i] + wp_done
+        finished = wp >= len(self.route)
+        self.wp[i] = np.minimum(wp, len(self.route) - 1)
+        self.wp_deadline[i] = np.where(wp_done, self.now + self.leg_timeout, self.wp_deadline[i])
+        self.mode[i] = mode
+
+        fin = i[finished]
+        self.done[fin] = True
+        self.active[fin] = False
+        self.t_done[fin] = self.now
+
+        # PositionHlCommander.go_to blocks for distance / velocity
+        self.next_tick[i] = self.now + np.maximum(1.0 / p["loop_rate"], moved / p["velocity"])
+
+    def _physics(self):
+        a = self.active
+        # Setpoint slews towards the last go_to target at the commanded velocity
+        delta = self.cmd[a] - self.sp[a]
+        dist = np.sqrt((delta ** 2).sum(axis=1, keepdims=True))
+        speed = self.p["velocity"][a][:, None]
+        step = np.minimum(dist, speed * self.dt)
+        unit = np.divide(delta, dist, out=np.zeros_like(delta), where=dist > 0)
+        self.sp[a] += unit * step
+        sp_vel = unit * np.where(dist > speed * self.dt, speed, 0.0)
+
+        acc = self.kp * (self.sp[a] - self.pos[a]) + self.kd * (sp_vel - self.vel[a])
+        norm = np.sqrt((acc ** 2).sum(axis=1, keepdims=True))
+        acc *= np.minimum(1.0, self.max_accel / np.maximum(norm, 1e-12))
+        self.vel[a] += acc * self.dt
+        self.pos[a] += self.vel[a] * self.dt
+
+        clearance = box_clearance(self.pos[a], self.lo[a], self.hi[a]) - self.radius
+        self.min_clearance[a] = np.minimum(self.min_clearance[a], clearance)
+        hit = np.flatnonzero(a)[clearance <= 0.0]
+        self.collided[hit] = True
+        self.active[hit] = False
+
+    def run(self):
+        while self.active.any() and self.now < self.max_time:
+            self.now += self.dt
+            self._physics()
+            if self.now >= self._next_sense:
+                self._next_sense += self.sensor_period
+                a = self.active
+                self.ranges[a] = ray_ranges(self.pos[a], self.lo[a], self.hi[a])
+            due = np.flatnonzero(self.active & (self.next_tick <= self.now))
+            if len(due):
+                self._tick(due)
+            late = self.active & (self.now > self.wp_deadline)
+            self.timed_out |= late
+            self.active &= ~late
+        self.timed_out |= self.active
+        return self
+
+    def success(self):
+        return self.done & ~self.collided
+
+
+def sweep(grid, layouts, route=NEWSEQUENCE, chunk=20000, **sim_kwargs):
+    """
+    Run every combination in grid (name -> list of values) on every layout.
+    Returns one summary dict per parameter set.
+    """
+    lo, hi = layouts
+    n_layouts = lo.shape[0]
+    names = list(grid)
+    combos = list(itertools.product(*(grid[k] for k in names)))
+    per_chunk = max(1, chunk // n_layouts)
+    rows = []
+    for start in range(0, len(combos), per_chunk):
+        block = combos[start:start + per_chunk]
+        params = {name: np.repeat([c[k] for c in block], n_layouts) for k, name in enumerate(names)}
+        sim = BatchSim(params, np.tile(lo, (len(block), 1, 1)), np.tile(hi, (len(block), 1, 1)),
+                       route=route, **sim_kwargs).run()
+        ok = sim.success()
+        for k, combo in enumerate(block):
+            s = slice(k * n_layouts, (k + 1) * n_layouts)
+            times = sim.t_done[s][ok[s]]
+            rows.append(dict(zip(names, combo),
+                             success_rate=float(ok[s].mean()),
+                             collision_rate=float(sim.collided[s].mean()),
+                             timeout_rate=float(sim.timed_out[s].mean()),
+                             min_clearance=float(sim.min_clearance[s].min()),
+                             mean_min_clearance=float(sim.min_clearance[s][np.isfinite(sim.min_clearance[s])].mean())
+                             if np.isfinite(sim.min_clearance[s]).any() else float("inf"),
+                             mission_time=float(times.mean()) if len(times) else float("nan"),
+                             maneuvers=float(sim.maneuvers[s].mean())))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep avoidance parameters over random layouts")
+    parser.add_argument("--layouts", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    for name, value in DEFAULTS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, nargs="+", default=[value])
+    args = parser.parse_args()
+
+    layouts = random_layouts(args.layouts, np.random.default_rng(args.seed))
+    grid = {name: getattr(args, name) for name in DEFAULTS}
+    rows = sweep(grid, layouts)
+    rows.sort(key=lambda r: (-r["success_rate"], r["mission_time"]))
+    swept = [k for k in DEFAULTS if len(grid[k]) > 1] or ["threshold"]
+    print(" ".join(f"{k:>10}" for k in swept) + "   success  collide  timeout  min_clr  time_s")
+    for r in rows:
+        print(" ".join(f"{r[k]:>10.3g}" for k in swept)
+              + f"   {r['success_rate']:7.3f}  {r['collision_rate']:7.3f}  {r['timeout_rate']:7.3f}"
+              f"  {r['min_clearance']:7.3f}  {r['mission_time']:6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+# Battery-aware scheduling: pm.vbat monitor, online energy model and leg planner
+"""
+Whether the battery can finish the route, checked before every leg
+instead of flying blind.
+
+- BatteryMonitor logs pm.vbat every 10 ms. The median of the latest
+  readings, corrected for the sag under load, is placed on a 1S LiPo
+  discharge curve. That gives the state of charge and the energy left.
+- EnergyModel fits energy = per_s x seconds + per_m x metres online.
+  Every control tick adds (time, distance flown, energy left) to the
+  normal equations of a least-squares fit. A ridge pulls the two rates
+  towards prior values until the flight tells them apart (hovering
+  against moving).
+- BatteryScheduler decides before each leg. The rest of the route, the
+  final hover and landing must fit in the energy left above a reserve,
+  and unplanned time, such as bypasses, counts as it is observed. If it
+  fits, the route goes on unchanged. The final hover is the first thing
+  to go. If the route still does not fit, the scheduler flies the subset
+  and order of the remaining waypoints that completes the most planned
+  distance and still gets home: exact over subsets, Held-Karp style. A
+  leg counts as completed once both its ends are visited. If not even
+  the way home fits, it lands where it is.
+
+    with BatteryMonitor(scf) as battery:
+        scheduler = BatteryScheduler(battery, EnergyModel(), route, home=(0.0, 0.0, 0.4, 3.0))
+        i = scheduler.next_leg(position)        # route index, scheduler.home, or None: land
+        scheduler.sample(position)              # every control tick
+"""
+import math
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from cflib.crazyflie.log import LogConfig
+
+from flight.lipo import LIPO_CURVE
+
+VOLTAGE_CURVE = np.array(LIPO_CURVE)
+
+MAX_EXACT = 10      # remaining waypoints up to which the trimmed plan is searched exactly
+
+
+def state_of_charge(voltage):
+    """State of charge (0 .. 1) of a resting cell at `voltage`."""
+    return float(np.interp(voltage, VOLTAGE_CURVE[:, 1], VOLTAGE_CURVE[:, 0]))
+
+
+def distance(a, b):
+    return math.sqrt(sum((p - q) ** 2 for p, q in zip(a, b)))
+
+
+class BatteryMonitor:
+    """
+    pm.vbat at rate_ms. capacity_wh: the battery's energy when full;
+    resistance (ohm): internal resistance, for the sag under load; window:
+    readings the median is taken over.
+    """
+
+    def __init__(self, crazyflie, capacity_wh=0.925, resistance=0.1, rate_ms=10, window=25):
+        self._cf = getattr(crazyflie, "cf", crazyflie)
+        self.capacity = capacity_wh * 3600.0
+        self.resistance = resistance
+        self._readings = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._log_config = LogConfig('battery', rate_ms)
+        self._log_config.add_variable('pm.vbat', 'float')
+        self._log_config.data_received_cb.add_callback(self._data_received)
+
+    def start(self):
+        self._cf.log.add_config(self._log_config)
+        self._log_config.start()
+
+    def stop(self):
+        self._log_config.delete()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _data_received(self, timestamp, data, logconf):
+        with self._lock:
+            self._readings.append(data['pm.vbat'])
+
+    # ---- reading ----
+
+    def voltage(self):
+        """Median of the latest readings (V); None before the first packet."""
+        with self._lock:
+            readings = sorted(self._readings)
+        return readings[len(readings) // 2] if readings else None
+
+    def state_of_charge(self, power=0.0):
+        """Charge left (0 .. 1) while drawing `power` watts; None before the first packet."""
+        v = self.voltage()
+        if v is None:
+            return None
+        # v = ocv - R * P / ocv, solved for the open-circuit voltage
+        return state_of_charge((v + math.sqrt(v * v + 4.0 * self.resistance * power)) / 2.0)
+
+    def energy_left(self, power=0.0):
+        """Joules left while drawing `power` watts; None before the first packet."""
+        soc = self.state_of_charge(power)
+        return None if soc is None else soc * self.capacity
+
+
+class EnergyModel:
+    """
+    energy used = per_s x seconds + per_m x metres, least squares over
+    (time, distance, energy left) samples. The normal equations are
+    accumulated per sample (O(1)); the prior values per_s (W) and per_m
+    (J/m) weigh as much as `prior_s` seconds of spread in the samples.
+    """
+
+    def __init__(self, per_s=8.0, per_m=2.0, prior_s=5.0):
+        self.prior = np.array([0.0, -per_s, -per_m])
+        self.prior_s = prior_s
+        self.per_s = per_s
+        self.per_m = per_m
+        self.samples = 0
+        self._xtx = np.zeros((3, 3))
+        self._xty = np.zeros(3)
+
+    def observe(self, seconds, metres, energy):
+        x = np.array((1.0, seconds, metres))
+        self._xtx += np.outer(x, x)
+        self._xty += x * energy
+        self.samples += 1
+
+    def fit(self):
+        """Re-fit per_s and per_m from the samples so far."""
+        if self.samples < 2:
+            return self.per_s, self.per_m
+        ridge = np.diag([0.0, 1.0, 1.0]) * self.prior_s ** 2 * self.samples
+        _, slope_s, slope_m = np.linalg.solve(self._xtx + ridge, self._xty + ridge @ self.prior)
+        self.per_s, self.per_m = max(-slope_s, 0.0), max(-slope_m, 0.0)
+        return self.per_s, self.per_m
+
+    def cost(self, seconds, metres):
+        return self.per_s * seconds + self.per_m * metres
+
+    def power(self, speed):
+        """Watts drawn at `speed` (m/s)."""
+        return self.per_s + self.per_m * speed
+
+
+class BatteryScheduler:
+    """
+    Leg order for one flight of `route` ((x, y, z, duration) waypoints).
+    home: (x, y, z, duration) of the way back to take-off; reserve: share
+    of the capacity never planned for; pause_s / hover_s / landing_s: the
+    mission's pause after each leg, final hover and landing; leg_time:
+    seconds a leg from a point to a waypoint takes (Trajectory.leg_duration
+    when legs end on arrival), else the waypoint's duration.
+    """
+
+    def __init__(self, battery, model, route, home, reserve=0.01, pause_s=0.3, hover_s=5.0, landing_s=3.0,
+                 leg_time=None, clock=time.monotonic, tolerance=0.05):
+        self.battery = battery
+        self.model = model
+        self.route = [tuple(wp) for wp in route]
+        self.home = len(self.route)                 # leg index of the way home
+        self.home_waypoint = tuple(home)
+        self.reserve = reserve
+        self.pause_s = pause_s
+        self.hover_s = hover_s
+        self.landing_s = landing_s
+        self.tolerance = tolerance
+        self._leg_time = leg_time
+        self._clock = clock
+        # planned length of the leg into each waypoint; it counts as completed once both its ends are visited
+        prev = self.home_waypoint[:3]
+        self.value = []
+        for wp in self.route:
+            self.value.append(distance(prev, wp[:3]))
+            prev = wp[:3]
+        self.remaining = list(range(len(self.route)))
+        self.flown = []
+        # waypoints on the take-off spot count as visited from the start
+        self._visited = {i for i, wp in enumerate(self.route) if distance(wp[:3], home[:3]) <= tolerance}
+        self.cut_short = False
+        self.hover = True               # False once the final hover no longer fits
+        self.finished = False
+        self.overrun = 0.0              # unplanned seconds so far (bypasses running over)
+        self._leg = None                # (index, planned seconds, start time) of the leg being flown
+        self._started = None
+        self._odometer = 0.0
+        self._last = None
+        self.speed = 0.0
+        self._plan = None
+
+    # ---- per tick ----
+
+    def sample(self, position):
+        """Add the energy left at this point of the flight to the model."""
+        now = self._clock()
+        if self._started is None:
+            self._started = now
+        if self._last is not None:
+            step = distance(self._last[1], position)
+            self._odometer += step
+            self.speed = step / (now - self._last[0]) if now > self._last[0] else self.speed
+        self._last = (now, position)
+        energy = self.energy_left()
+        if energy is not None:
+            self.model.observe(now - self._started, self._odometer, energy)
+
+    def energy_left(self):
+        """Joules left, sag-corrected for the power the model expects at the current speed."""
+        return self.battery.energy_left(self.model.power(self.speed))
+
+    # ---- planning ----
+
+    def _waypoint(self, i):
+        return self.home_waypoint if i == self.home else self.route[i]
+
+    def _seconds(self, start, i):
+        waypoint = self._waypoint(i)
+        return waypoint[3] if self._leg_time is None else self._leg_time(start, waypoint)
+
+    def _leg_cost(self, start, i):
+        metres = distance(start, self._waypoint(i)[:3])
+        if i == self.home and metres <= self.tolerance:
+            return 0.0                  # already there
+        return self.model.cost(self._seconds(start, i) + self.pause_s + self._allowance(), metres)
+
+    def _allowance(self):
+        """Unplanned seconds to expect per leg, from the legs flown so far."""
+        return self.overrun / len(self.flown) if self.flown else 0.0
+
+    def _route_cost(self, position, order):
+        cost, at = 0.0, position
+        for i in order:
+            cost += self._leg_cost(at, i)
+            at = self.route[i][:3]
+        return cost, at
+
+    def _completed(self, visits):
+        """Planned distance completed by visiting `visits` after the waypoints flown so far."""
+        seen = self._visited | set(self.flown) | set(visits)
+        return sum(self.value[i] for i in visits if i == 0 or i - 1 in seen)
+
+    def _trimmed(self, position, budget):
+        """
+        Subset and order of the remaining waypoints with the most planned
+        distance that gets home within `budget` (least energy among equals).
+        Exact up to MAX_EXACT waypoints; beyond that, the route order cut short.
+        """
+        idx = self.remaining
+        landing = self.model.cost(self.landing_s, 0.0)
+        if len(idx) > MAX_EXACT:
+            best = ([], 0.0)
+            for n in range(1, len(idx) + 1):
+                cost, at = self._route_cost(position, idx[:n])
+                if cost + self._leg_cost(at, self.home) + landing <= budget:
+                    best = (idx[:n], self._completed(idx[:n]))
+            return best[0]
+
+        n = len(idx)
+        cost = {}                       # (mask, last) -> (energy, previous last)
+        for j in range(n):
+            cost[(1 << j, j)] = (self._leg_cost(position, idx[j]), None)
+        between = [[self._leg_cost(self.route[idx[a]][:3], idx[b]) for b in range(n)] for a in range(n)]
+        for mask in range(1, 1 << n):
+            for j in range(n):
+                entry = cost.get((mask, j))
+                if entry is None:
+                    continue
+                for k in range(n):
+                    if mask & (1 << k):
+                        continue
+                    key, energy = (mask | (1 << k), k), entry[0] + between[j][k]
+                    if key not in cost or energy < cost[key][0]:
+                        cost[key] = (energy, j)
+        best, best_key = (0.0, 0.0), None                   # (-value, energy)
+        completed = {}
+        for (mask, j), (energy, _) in cost.items():
+            total = energy + self._leg_cost(self.route[idx[j]][:3], self.home) + landing
+            if total > budget:
+                continue
+            value = completed.get(mask)
+            if value is None:
+                value = completed[mask] = self._completed([idx[k] for k in range(n) if mask & (1 << k)])
+            if (-value, total) < best:
+                best, best_key = (-value, total), (mask, j)
+        order = []
+        while best_key is not None:
+            mask, j = best_key
+            order.append(idx[j])
+            previous = cost[best_key][1]
+            best_key = None if previous is None else (mask & ~(1 << j), previous)
+        return order[::-1]
+
+    def plan(self, position, energy):
+        """
+        (order, home) for the rest of the flight: the remaining waypoints as
+        planned when they fit (without the final hover if only that does not),
+        else a trimmed order and home=True. Once trimmed, the route stays
+        trimmed (the skipped waypoints are behind). An empty order with
+        home=False means land where the drone is.
+        """
+        if energy is None:
+            return list(self.remaining), False        # no battery reading: fly as planned
+        per_s, _ = self.model.fit()
+        budget = energy - self.reserve * self.battery.capacity
+        cost, _ = self._route_cost(position, self.remaining)
+        if self._plan is None and cost + per_s * (self.hover_s * self.hover + self.landing_s) <= budget:
+            return list(self.remaining), False
+        if self._plan is None and cost + per_s * self.landing_s <= budget:
+            if self.hover:
+                print(f"Battery {energy / self.battery.capacity:.0%} ({energy:.0f} J): no final hover")
+                self.hover = False
+            return list(self.remaining), False
+        self.hover = False                  # the trimmed budget has no final hover
+        order = self._trimmed(position, budget)
+        if order:
+            return order, True
+        home = self._leg_cost(position, self.home) + per_s * self.landing_s
+        return [], home <= energy and distance(position, self.home_waypoint[:3]) > self.tolerance
+
+    def next_leg(self, position):
+        """Index of the next leg (a route index or self.home); None: land now."""
+        now = self._clock()
+        if self._leg is not None:
+            i, planned, started = self._leg
+            self.overrun += max(0.0, now - started - planned)
+            self.flown.append(i)
+            self._leg = None
+        if self.finished:
+            return None
+        if not self.remaining:
+            self.finished = True
+            trimmed_home = self._plan is not None and self._plan[1]
+            if not trimmed_home or distance(position, self.home_waypoint[:3]) <= self.tolerance:
+                return None
+            i = self.home                   # a trimmed plan that kept every waypoint still ends at home
+            self._leg = (i, self._seconds(position, i) + self.pause_s, now)
+            return i
+        energy = self.energy_left()
+        order, home = self.plan(position, energy)
+        if order == self.remaining and not home:
+            i = order[0]
+        else:
+            self._report(order, home, energy)
+            if order:
+                i = order[0]
+            else:
+                self.cut_short = self.finished = True
+                if not home:
+                    return None
+                i = self.home
+        if i != self.home:
+            self.remaining.remove(i)
+        self._leg = (i, self._seconds(position, i) + self.pause_s, now)
+        return i
+
+    def _report(self, order, home, energy):
+        plan = (order, home)
+        if plan == self._plan:
+            return
+        self._plan = plan
+        share = energy / self.battery.capacity
+        skipped = [i + 1 for i in self.remaining if i not in order and i not in self._visited]
+        route = " → ".join([str(i + 1) for i in order] + (["home"] if home else ["land"]))
+        skipping = f", skipping waypoint{'s' * (len(skipped) > 1)} {', '.join(map(str, skipped))}" if skipped else ""
+        print(f"Battery {share:.0%} ({energy:.0f} J): {route}{skipping}")
+
+    # ---- reporting ----
+
+    def report(self):
+        return {
+            "voltage": self.battery.voltage(),
+            "charge": self.battery.state_of_charge(self.model.power(self.speed)),
+            "per_s": self.model.per_s,
+            "per_m": self.model.per_m,
+            "samples": self.model.samples,
+            "flown": len([i for i in self.flown if i != self.home]),
+            "waypoints": len(self.route),
+            "cut_short": self.cut_short,
+            "hover": self.hover,
+        }
+
+    def summary(self):
+        r = self.report()
+        charge = "no reading" if r["voltage"] is None else f"{r['voltage']:.2f} V, {r['charge']:.0%} left"
+        ending = ", cut short" if r["cut_short"] else "" if r["hover"] else ", no final hover"
+        return (f"Battery: {charge}; model {r['per_s']:.1f} J/s + {r['per_m']:.1f} J/m over {r['samples']} samples; "
+                f"{r['flown']} of {r['waypoints']} waypoints{ending}")
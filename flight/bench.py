@@ -0,0 +1,339 @@
+# Offline benchmark suite for the avoidance stack, with JSON baselines
+"""
+Speed and safety numbers for the avoidance stack, measured offline so a
+change shows its cost before it flies.
+
+    decision  host time of one avoidance decision (TTC checks, bypass tick)
+    loop      rate a ControlLoop actually holds with that decision inside
+    mission   newsequence flown in the simulator on fixed seeds: completion,
+              collisions, clearance, mission time
+    planner   occupancy-grid update and D* Lite re-plan cost on a scripted approach
+    memory    peak Python allocation of one simulated flight (tracemalloc)
+
+Simulator metrics are deterministic (fixed seeds, virtual clock) and any
+change in them is reported. Host timings keep the best of a few repeats
+(like timeit, since noise only ever adds time) and compare within a
+tolerance.
+Save a baseline, change something, compare:
+
+    python -m flight.bench --save bench_baseline.json
+    python -m flight.bench --compare bench_baseline.json
+    python -m flight.bench mission --script Waypoint_Avoid09.py --set safety_margin=0.3 --compare bench_baseline.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+
+import numpy as np
+
+from flight.batch_sim import ray_ranges
+from flight.bypass import BypassManeuver
+from flight.control_loop import ControlLoop
+from flight.monte_carlo import make_world, run_one
+from flight.occupancy import OccupancyGrid
+from flight.planner import DStarLite
+from flight.profiler import Histogram
+from flight.ranger_stream import FRONT, RIGHT, RangeSample, RangeStream
+from flight.sim import run_script
+from flight.ttc import CommandLatency, ObstacleReaction
+
+LOWER = "lower"
+HIGHER = "higher"
+
+# better: LOWER / HIGHER; exact: deterministic (simulator on fixed seeds),
+# compared without tolerance
+Metric = namedtuple("Metric", "value unit better exact")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SCRIPT = os.path.join(ROOT, "Waypoint_Avoid06.py")
+
+
+def timing(unit, better=LOWER):
+    return lambda value: Metric(value, unit, better, False)
+
+
+def percentiles(hist, prefix):
+    us = timing("us")
+    return {
+        f"{prefix}_p50_us": us(hist.percentile(50) / 1000.0),
+        f"{prefix}_p99_us": us(hist.percentile(99) / 1000.0),
+    }
+
+
+class _ConstantState:
+    """Pose estimate stand-in flying at a fixed velocity."""
+
+    def __init__(self, velocity):
+        self._velocity = velocity
+
+    def velocity(self):
+        return self._velocity
+
+
+class DecisionStep:
+    """
+    One avoidance decision as the scripts make it: front and right TTC
+    checks on the newest sample, plus a bypass tick while one is running.
+    The drone closes in on a wall, bypasses it, and starts over.
+    """
+
+    def __init__(self, speed=0.4):
+        self.stream = RangeStream()
+        self.reaction = ObstacleReaction(self.stream, _ConstantState((speed, 0.0, 0.0)), CommandLatency())
+        self.position = (0.0, 0.0, 0.4)
+        self.front = 2.0
+        self.speed = speed
+        self.bypass = None
+        self.k = 0
+
+    def sense(self):
+        """New ranger sample (on the log thread in flight, so not part of the decision)."""
+        self.k += 1
+        self.front = 2.0 if self.front < 0.1 else self.front - self.speed * 0.02
+        self.stream.push(self.k, self.front, None, 1.0, 1.0, None)
+
+    def decide(self):
+        sample = self.stream.latest()
+        if self.bypass is not None:
+            setpoint = self.bypass.tick(self.position, sample)
+            if setpoint is None:
+                self.bypass, self.front = None, 2.0
+            else:
+                self.position = setpoint
+            return
+        if self.reaction.check(FRONT, sample):
+            self.bypass = BypassManeuver(self.position, -0.5, 0.8)
+        self.reaction.check(RIGHT, sample)
+
+
+# ------------------------------
+# Benchmarks
+# ------------------------------
+
+def bench_decision(ticks=20000, **_):
+    step = DecisionStep()
+    hist = Histogram()
+    clock = time.perf_counter_ns
+    for _ in range(ticks):
+        step.sense()
+        started = clock()
+        step.decide()
+        hist.record(clock() - started)
+    return percentiles(hist, "decision")
+
+
+def bench_loop(rate_hz=500, seconds=1.0, **_):
+    step = DecisionStep()
+    loop = ControlLoop(rate_hz)
+    loop.start()
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        step.sense()
+        step.decide()
+        loop.wait()
+    r = loop.report()
+    return {
+        "achieved_hz": timing("Hz", HIGHER)(r["achieved_hz"]),
+        "missed_ratio": timing("")(r["missed"] / r["ticks"] if r["ticks"] else 0.0),
+        "jitter_p99_ms": timing("ms")(r["jitter_p99_ms"]),
+    }
+
+
+def bench_mission(script=DEFAULT_SCRIPT, seeds=20, overrides=None, **_):
+    results = []
+    started = time.perf_counter()
+    for seed in range(seeds):
+        results.append(run_one(script, seed, overrides=overrides))
+    wall = time.perf_counter() - started
+    completed = [r for r in results if r["completed"]]
+    return {
+        "completion_rate": Metric(len(completed) / seeds, "", HIGHER, True),
+        "collision_rate": Metric(sum(r["collided"] for r in results) / seeds, "", LOWER, True),
+        "min_clearance_m": Metric(min(r["min_clearance"] for r in results), "m", HIGHER, True),
+        "mission_time_s": Metric(float(np.mean([r["sim_time"] for r in results])), "s", LOWER, True),
+        "wall_per_flight_ms": timing("ms")(wall / seeds * 1000.0),
+    }
+
+
+def bench_planner(steps=200, **_):
+    """The drone creeps towards a wall between it and the goal, mapping and re-planning every step."""
+    lo = np.array([[[0.9, -0.4, 0.0], [1.6, 0.35, 0.0]]])
+    hi = np.array([[[1.1, 0.3, 2.0], [1.8, 0.55, 2.0]]])
+    grid = OccupancyGrid(resolution=0.05)
+    goal = (2.2, 0.0, 0.4)
+    clock = time.perf_counter_ns
+    started = clock()
+    planner = DStarLite(grid, (0.0, 0.0, 0.4), goal)
+    planner.compute()
+    initial = clock() - started
+    update, replan = Histogram(), Histogram()
+    for k, x in enumerate(np.linspace(0.0, 0.7, steps)):
+        pose = (float(x), 0.0, 0.4)
+        ranges = ray_ranges(np.array([pose]), lo, hi)[0]
+        sample = RangeSample(k, 0.0, k, *(None if math.isinf(d) else float(d) for d in ranges), None, None)
+        started = clock()
+        grid.update(pose, sample)
+        update.record(clock() - started)
+        started = clock()
+        planner.replan(pose)
+        replan.record(clock() - started)
+    out = {"initial_plan_ms": timing("ms")(initial / 1e6)}
+    out.update(percentiles(update, "map_update"))
+    out.update(percentiles(replan, "replan"))
+    out["grid_kib"] = Metric(grid.memory_bytes() / 1024.0, "KiB", LOWER, True)
+    out["path_found"] = Metric(float(planner.has_path()), "", HIGHER, True)
+    return out
+
+
+def bench_memory(script=DEFAULT_SCRIPT, overrides=None, **_):
+    run_script(script, make_world(0), overrides=overrides)     # imports and compile caches out of the way
+    tracemalloc.start()
+    try:
+        run_script(script, make_world(0), overrides=overrides)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"flight_peak_kib": timing("KiB")(peak / 1024.0)}
+
+
+BENCHMARKS = {
+    "decision": bench_decision,
+    "loop": bench_loop,
+    "mission": bench_mission,
+    "planner": bench_planner,
+    "memory": bench_memory,
+}
+
+
+def best(runs):
+    """Merge repeated runs of one benchmark: best value of each host timing, exact metrics as measured."""
+    out = {}
+    for key, metric in runs[0].items():
+        if not metric.exact:
+            values = [r[key].value for r in runs]
+            metric = metric._replace(value=min(values) if metric.better == LOWER else max(values))
+        out[key] = metric
+    return out
+
+
+def run(names=None, repeat=3, progress=None, **options):
+    """
+    Run the named benchmarks (all by default) in a scratch directory, so
+    the scripts' telemetry files do not land in the tree. Timing
+    benchmarks run `repeat` times. Returns {"bench.metric": Metric}.
+    """
+    metrics = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        try:
+            for name in names or BENCHMARKS:
+                if progress is not None:
+                    progress(name)
+                runs = [BENCHMARKS[name](**options) for _ in range(repeat)]
+                for key, metric in best(runs).items():
+                    metrics[f"{name}.{key}"] = metric
+        finally:
+            os.chdir(cwd)
+    return metrics
+
+
+# ------------------------------
+# Baselines
+# ------------------------------
+
+def save(path, metrics, options=None):
+    doc = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "options": options or {},
+        "metrics": {name: m._asdict() for name, m in metrics.items()},
+    }
+    with open(path, "w") as f:
+        json.dump(doc, f, indent=1)
+
+
+def load(path):
+    with open(path) as f:
+        doc = json.load(f)
+    return {name: Metric(**m) for name, m in doc["metrics"].items()}
+
+
+def compare(baseline, metrics, tolerance=0.2):
+    """
+    (name, baseline value, value, relative change, verdict) per metric.
+    verdict: "worse" / "better" past the tolerance (exact metrics: any
+    change), "same", or "new" for metrics the baseline lacks.
+    """
+    rows = []
+    for name, m in metrics.items():
+        base = baseline.get(name)
+        if base is None:
+            rows.append((name, None, m.value, None, "new"))
+            continue
+        delta = m.value - base.value
+        change = delta / abs(base.value) if base.value else (0.0 if delta == 0 else math.copysign(math.inf, delta))
+        allowed = 1e-9 if m.exact else tolerance
+        if abs(change) <= allowed:
+            verdict = "same"
+        else:
+            verdict = "better" if (delta < 0) == (m.better == LOWER) else "worse"
+        rows.append((name, base.value, m.value, change, verdict))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the avoidance stack offline")
+    parser.add_argument("benchmarks", nargs="*", metavar="BENCHMARK",
+                        help=f"subset to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("--script", default=DEFAULT_SCRIPT, help="script for mission and memory")
+    parser.add_argument("--seeds", type=int, default=20, help="simulated flights in the mission benchmark")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="NAME=VALUE",
+                        help="override a script or mission setting (repeatable)")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="baseline to compare against (exit 1 if worse)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark (best host timing kept)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative slack for host timings")
+    args = parser.parse_args()
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark {', '.join(unknown)} (choose from {', '.join(BENCHMARKS)})")
+
+    from flight.replay import parse_setting
+    try:
+        overrides = dict(parse_setting(s) for s in args.overrides)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    options = {"script": os.path.abspath(args.script), "seeds": args.seeds, "overrides": overrides}
+
+    metrics = run(args.benchmarks, args.repeat, progress=lambda name: print(f"running {name}...", file=sys.stderr),
+                  **options)
+    if args.save:
+        save(args.save, metrics, {**options, "script": os.path.basename(args.script)})
+
+    if not args.compare:
+        for name, m in metrics.items():
+            print(f"{name:<32} {m.value:>12.3f} {m.unit}")
+        return
+    rows = compare(load(args.compare), metrics, args.tolerance)
+    print(f"{'metric':<32} {'baseline':>12} {'now':>12} {'change':>8}")
+    for name, base, value, change, verdict in rows:
+        base_text = "-" if base is None else f"{base:.3f}"
+        change_text = "-" if change is None else f"{change:+.1%}"
+        flag = "" if verdict == "same" else f"  {verdict}"
+        print(f"{name:<32} {base_text:>12} {value:>12.3f} {change_text:>8}{flag}")
+    worse = [row[0] for row in rows if row[4] == "worse"]
+    print(f"{len(worse)} regression(s)" + (": " + ", ".join(worse) if worse else ""))
+    sys.exit(1 if worse else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# Incremental front-obstacle bypass (sidestep → forward → return)
+
+SIDESTEP = "sidestep"
+FORWARD = "forward"
+RETURN = "return"
+DONE = "done"
+ABORTED = "aborted"
+
+# horizontal ranger directions and the way each one looks (x forward, y left)
+HORIZONTAL = {"front": (1.0, 0.0), "back": (-1.0, 0.0), "left": (0.0, 1.0), "right": (0.0, -1.0)}
+
+
+def step_towards(position, target, step):
+    """Move each axis of position at most `step` towards target (same stepping as move_towards)."""
+    out = []
+    for c, t in zip(position, target):
+        if abs(t - c) > step:
+            c += step if t > c else -step
+        else:
+            c = t
+        out.append(c)
+    return tuple(out)
+
+
+def sensor_for(dx, dy):
+    """Multiranger direction that looks along a planar motion (x forward, y left)."""
+    if abs(dx) >= abs(dy):
+        return "front" if dx > 0 else "back"
+    return "left" if dy > 0 else "right"
+
+
+class BypassManeuver:
+    """
+    Front-obstacle bypass as a state machine ticked by the control loop.
+
+    The three legs of the old blocking bypass (sidestep, forward, return)
+    become phases. Each tick moves the setpoint at most `step` towards the
+    current leg end, and a phase finishes once the setpoint is there and the
+    measured position has converged on it (stepping from the previous
+    setpoint, not from the pose estimate, keeps the motion steady while the
+    drone lags behind). All four horizontal ranges are read on every tick.
+    The maneuver aborts, so the caller can re-plan (see replan()), when
+    something is closer than `clearance` in the direction of travel, or
+    closer than `clearance` in another direction and closing in since the
+    phase began. A wall the maneuver is sliding along does not abort it;
+    one coming at it from the side does. With filtered ranges, pass the
+    (x, y) flown during the sample's age as `lead`: each range is
+    shortened by the part of it flown towards that direction, so the
+    filter lag does not eat into the clearance.
+
+        bypass = BypassManeuver(get_pos(commander), -0.5, 0.5)
+        setpoint = bypass.tick(get_pos(commander), multiranger)
+        if setpoint is not None: commander.go_to(*setpoint)
+    """
+
+    def __init__(self, origin, side, forward, back=None, step=0.05,
+                 tolerance=0.02, clearance=0.25, max_phase_ticks=200,
+                 replans_left=2):
+        x, y, z = origin
+        back = side if back is None else back
+        self.side = side
+        self.forward = forward
+        self.step = step
+        self.tolerance = tolerance
+        self.clearance = clearance
+        self.max_phase_ticks = max_phase_ticks
+        self.replans_left = replans_left
+        self.legs = [
+            (SIDESTEP, (x, y + side, z)),
+            (FORWARD, (x + forward, y + side, z)),
+            (RETURN, (x + forward, y + side - back, z)),
+        ]
+        self.return_y = y + side - back
+        self._leg = 0
+        self._ticks = 0
+        self._setpoint = tuple(origin)
+        self._phase_ranges = None       # horizontal ranges on the first tick of the phase
+        self.state = SIDESTEP
+        self.abort_reason = None
+        self.aborted_in = None
+
+    @property
+    def active(self):
+        return self.state not in (DONE, ABORTED)
+
+    @property
+    def target(self):
+        """End point of the current leg."""
+        return self.legs[self._leg][1] if self.active else None
+
+    def _converged(self, position):
+        target = self.target
+        return self._setpoint == target and all(abs(c - t) <= self.tolerance for c, t in zip(position, target))
+
+    def _abort(self, reason):
+        self.aborted_in = self.state
+        self.state = ABORTED
+        self.abort_reason = reason
+        return None
+
+    def tick(self, position, ranges, scale=1.0, lead=(0.0, 0.0)):
+        """
+        Advance the maneuver one control tick.
+
+        position: current (x, y, z); ranges: anything with front/back/left/right
+        attributes (a Multiranger or a RangeSample); scale: fraction of `step`
+        to move this tick; lead: (x, y) metres flown since the ranges were
+        measured.
+        Returns the next setpoint, or None once the
+        maneuver is done or aborted.
+        """
+        if not self.active:
+            return None
+
+        while self._converged(position):
+            self._leg += 1
+            self._ticks = 0
+            self._phase_ranges = None
+            if self._leg == len(self.legs):
+                self.state = DONE
+                return None
+            self.state = self.legs[self._leg][0]
+
+        self._ticks += 1
+        if self._ticks > self.max_phase_ticks:
+            return self._abort(f"{self.state} did not converge")
+
+        tx, ty, _ = self.target
+        sx, sy = self._setpoint[:2] if self._setpoint != self.target else position[:2]
+        travel = sensor_for(tx - sx, ty - sy)
+        current = {d: getattr(ranges, d, None) for d in HORIZONTAL}
+        if self._phase_ranges is None:
+            self._phase_ranges = current
+        for direction, distance in current.items():
+            if distance is None:
+                continue
+            ux, uy = HORIZONTAL[direction]
+            if distance - max(0.0, ux * lead[0] + uy * lead[1]) >= self.clearance:
+                continue
+            before = self._phase_ranges[direction]
+            if direction == travel or before is None or distance < before - self.tolerance:
+                return self._abort(f"{direction} blocked during {self.state}")
+
+        self._setpoint = step_towards(self._setpoint, self.target, self.step * scale)
+        return self._setpoint
+
+    def replan(self, position):
+        """
+        New maneuver after an abort in the forward leg: sidestep further out
+        from here, finish the remaining forward distance and return to the
+        original line. None when the re-plan budget is used up or the abort
+        happened in another phase.
+        """
+        if self.aborted_in != FORWARD or self.replans_left <= 0:
+            return None
+        x, y, z = position
+        remaining = self.legs[1][1][0] - x     # end of the forward leg
+        return BypassManeuver(position, self.side, max(remaining, self.step),
+                              back=y + self.side - self.return_y, step=self.step,
+                              tolerance=self.tolerance, clearance=self.clearance,
+                              max_phase_ticks=self.max_phase_ticks,
+                              replans_left=self.replans_left - 1)
+
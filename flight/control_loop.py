@@ -0,0 +1,121 @@
+# Fixed-rate control loop scheduler
+import asyncio
+import time
+from collections import deque
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list (pct in 0..100)."""
+    if not values:
+        return 0.0
+    rank = max(0, min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1)))))
+    return values[rank]
+
+
+class ControlLoop:
+    """
+    Deadline-based scheduler for the avoidance loop.
+
+    Deadlines sit on a fixed grid (start + k * period) measured with a
+    monotonic clock, so time spent in go_to / sensor reads is absorbed
+    instead of being added on top of the sleep. When an iteration overruns
+    its deadline the loop does not burst to catch up: the missed slots are
+    skipped and counted. With a flight.profiler.Profiler as `profiler`, each
+    tick's work and sleep also go into its `work` / `sleep` stages.
+    """
+
+    def __init__(self, rate_hz, clock=time.monotonic, sleep=time.sleep, history=2000):
+        if rate_hz <= 0:
+            raise ValueError("rate_hz must be positive")
+        self.rate_hz = rate_hz
+        self.period = 1.0 / rate_hz
+        self._clock = clock
+        self._sleep = sleep
+        self._deadline = None
+        self._jitter = deque(maxlen=history)   # wake-up lateness (s)
+        self.ticks = 0
+        self.missed = 0
+        self.skipped = 0
+        self._busy = 0.0
+        self._slept = 0.0
+        self._last_wake = None
+        self.profiler = None
+
+    def start(self):
+        """(Re)anchor the deadline grid to now. Statistics are kept."""
+        now = self._clock()
+        self._deadline = now + self.period
+        self._last_wake = now
+
+    def wait(self):
+        """Sleep until the next deadline. Returns the lateness of the wake-up (s)."""
+        now, delay = self._tick()
+        if delay is None:
+            return self._jitter[-1]
+        self._sleep(delay)
+        return self._woke(now)
+
+    async def wait_async(self):
+        """wait() for an asyncio task: awaits the deadline instead of blocking the thread."""
+        now, delay = self._tick()
+        if delay is None:
+            return self._jitter[-1]
+        await asyncio.sleep(delay)
+        return self._woke(now)
+
+    def _tick(self):
+        """Close the current tick; (now, time to the next deadline), delay None when it overran."""
+        if self._deadline is None:
+            self.start()
+
+        now = self._clock()
+        self._busy += now - self._last_wake
+        self.ticks += 1
+        if self.profiler is not None:
+            self.profiler.record("work", (now - self._last_wake) * 1e9)
+
+        if now >= self._deadline:
+            # Overran: skip to the first deadline still in the future
+            self.missed += 1
+            behind = int((now - self._deadline) / self.period) + 1
+            self.skipped += behind - 1
+            self._deadline += behind * self.period
+            self._jitter.append(now - (self._deadline - self.period))
+            self._last_wake = now
+            return now, None
+        return now, self._deadline - now
+
+    def _woke(self, now):
+        woke = self._clock()
+        self._slept += woke - now
+        if self.profiler is not None:
+            self.profiler.record("sleep", (woke - now) * 1e9)
+        late = woke - self._deadline
+        self._jitter.append(late)
+        self._deadline += self.period
+        self._last_wake = woke
+        return late
+
+    def report(self):
+        """Loop statistics: rate achieved, missed deadlines and jitter percentiles (ms)."""
+        jitter = sorted(self._jitter)
+        elapsed = self._busy + self._slept
+        return {
+            "rate_hz": self.rate_hz,
+            "ticks": self.ticks,
+            "achieved_hz": self.ticks / elapsed if elapsed > 0 else 0.0,
+            "missed": self.missed,
+            "skipped": self.skipped,
+            "busy_s": self._busy,
+            "sleep_s": self._slept,
+            "jitter_p50_ms": percentile(jitter, 50) * 1000.0,
+            "jitter_p90_ms": percentile(jitter, 90) * 1000.0,
+            "jitter_p99_ms": percentile(jitter, 99) * 1000.0,
+            "jitter_max_ms": (jitter[-1] if jitter else 0.0) * 1000.0,
+        }
+
+    def summary(self):
+        r = self.report()
+        return (f"Loop {r['achieved_hz']:.1f}/{r['rate_hz']:.0f} Hz over {r['ticks']} ticks, "
+                f"missed {r['missed']} deadlines, jitter p50 {r['jitter_p50_ms']:.2f} ms "
+                f"p99 {r['jitter_p99_ms']:.2f} ms max {r['jitter_max_ms']:.2f} ms")
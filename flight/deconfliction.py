@@ -0,0 +1,289 @@
+# Inter-drone deconfliction over a uniform spatial hash
+"""
+Keep every drone's live pose in one place and tell a drone about the
+others before its Multiranger sees them as anonymous obstacles.
+
+Poses live in a uniform grid hashed by cell, so "who is within R of me"
+only visits the cells around the drone and "who is near my next segment"
+only the cells under the segment's padded bounding box, never the whole
+swarm. Conflicts are predicted from the closest point of approach under
+constant velocity, and one drone of each conflicting pair gives way:
+
+    service = Deconfliction(radius=0.35)
+    service.update(uri, state.position(), state.velocity())
+    conflict = service.give_way(uri, next_setpoint)
+    if conflict is not None: hold or sidestep
+
+From the shell (hundreds of agents, query timings):
+
+    python -m flight.deconfliction --agents 500
+"""
+import argparse
+import math
+import random
+import threading
+import time
+from collections import namedtuple
+
+# t: when the pose was reported (service clock)
+Agent = namedtuple("Agent", "id x y z vx vy vz t")
+
+# other: id of the other drone, position / velocity: its latest pose,
+# distance: now, t_cpa / d_cpa: time to and distance at the closest point of approach
+Conflict = namedtuple("Conflict", "other position velocity distance t_cpa d_cpa")
+
+
+def segment_distance(p, a, b):
+    """Distance from point p to segment a-b."""
+    ab = [e - s for s, e in zip(a, b)]
+    ap = [q - s for s, q in zip(a, p)]
+    length2 = sum(c * c for c in ab)
+    s = 0.0 if length2 == 0.0 else min(max(sum(u * v for u, v in zip(ap, ab)) / length2, 0.0), 1.0)
+    return math.sqrt(sum((q - (a0 + s * c)) ** 2 for q, a0, c in zip(p, a, ab)))
+
+
+def closest_approach(dp, dv, horizon):
+    """
+    Time in [0, horizon] and distance of the closest approach of two
+    constant-velocity points, given relative position dp and velocity dv.
+    """
+    dv2 = sum(c * c for c in dv)
+    t = 0.0 if dv2 == 0.0 else min(max(-sum(p * v for p, v in zip(dp, dv)) / dv2, 0.0), horizon)
+    return t, math.sqrt(sum((p + v * t) ** 2 for p, v in zip(dp, dv)))
+
+
+class SpatialHash:
+    """
+    Uniform 3D grid of agent ids. An update moves an agent between at most
+    two cells; a query looks at the cells covering its box, so its cost
+    depends on how crowded that neighbourhood is, not on the swarm size.
+    """
+
+    def __init__(self, cell=0.5):
+        self.cell = cell
+        self.agents = {}
+        self._cells = {}
+        self._where = {}
+
+    def key(self, point):
+        return tuple(int(math.floor(c / self.cell)) for c in point)
+
+    def update(self, agent):
+        key = self.key((agent.x, agent.y, agent.z))
+        old = self._where.get(agent.id)
+        if old != key:
+            if old is not None:
+                self._discard(old, agent.id)
+            self._cells.setdefault(key, set()).add(agent.id)
+            self._where[agent.id] = key
+        self.agents[agent.id] = agent
+
+    def remove(self, agent_id):
+        key = self._where.pop(agent_id, None)
+        if key is not None:
+            self._discard(key, agent_id)
+        self.agents.pop(agent_id, None)
+
+    def _discard(self, key, agent_id):
+        ids = self._cells[key]
+        ids.discard(agent_id)
+        if not ids:
+            del self._cells[key]
+
+    def in_box(self, lo, hi):
+        """Agents whose cell overlaps the axis-aligned box lo-hi."""
+        (x0, y0, z0), (x1, y1, z1) = self.key(lo), self.key(hi)
+        cells = self._cells
+        if (x1 - x0 + 1) * (y1 - y0 + 1) * (z1 - z0 + 1) > len(cells):
+            # box larger than the occupied part of the grid: walk the occupied cells
+            found = [ids for (x, y, z), ids in cells.items()
+                     if x0 <= x <= x1 and y0 <= y <= y1 and z0 <= z <= z1]
+        else:
+            found = [cells[k] for k in ((x, y, z)
+                                        for x in range(x0, x1 + 1)
+                                        for y in range(y0, y1 + 1)
+                                        for z in range(z0, z1 + 1)) if k in cells]
+        return [self.agents[i] for ids in found for i in ids]
+
+    def within(self, point, radius):
+        """(agent, distance) for every agent within radius of point."""
+        lo = [c - radius for c in point]
+        hi = [c + radius for c in point]
+        out = []
+        for a in self.in_box(lo, hi):
+            d = math.sqrt((a.x - point[0]) ** 2 + (a.y - point[1]) ** 2 + (a.z - point[2]) ** 2)
+            if d <= radius:
+                out.append((a, d))
+        return out
+
+    def near_segment(self, start, end, radius):
+        """(agent, distance to the segment) for every agent within radius of start-end."""
+        lo = [min(s, e) - radius for s, e in zip(start, end)]
+        hi = [max(s, e) + radius for s, e in zip(start, end)]
+        out = []
+        for a in self.in_box(lo, hi):
+            d = segment_distance((a.x, a.y, a.z), start, end)
+            if d <= radius:
+                out.append((a, d))
+        return out
+
+
+class Deconfliction:
+    """
+    Central pose table for a swarm, shared by all link threads.
+
+    radius: separation two drones must keep (m). horizon (s) and v_max
+    (m/s) bound how far ahead conflicts are predicted and how far another
+    drone can travel meanwhile. Poses older than max_age (a dropped link)
+    are ignored. Of two conflicting drones the one with the larger id gives
+    way, so exactly one of them reacts.
+    """
+
+    def __init__(self, radius=0.35, horizon=1.0, v_max=1.0, max_age=0.5, cell=None,
+                 clock=time.monotonic):
+        self.radius = radius
+        self.horizon = horizon
+        self.v_max = v_max
+        self.max_age = max_age
+        self.reach = radius + v_max * horizon
+        self.index = SpatialHash(cell if cell is not None else self.reach)
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def update(self, drone_id, position, velocity=None):
+        vx, vy, vz = velocity if velocity is not None else (0.0, 0.0, 0.0)
+        agent = Agent(drone_id, *position, vx, vy, vz, self._clock())
+        with self._lock:
+            self.index.update(agent)
+
+    def remove(self, drone_id):
+        """Take a drone out (landed, link closed)."""
+        with self._lock:
+            self.index.remove(drone_id)
+
+    def get(self, drone_id):
+        return self.index.agents.get(drone_id)
+
+    def _fresh(self, agents, me, now):
+        return [(a, d) for a, d in agents if a.id != me and now - a.t <= self.max_age]
+
+    def neighbours(self, drone_id, radius=None):
+        """(id, distance) of every other drone within radius (default: the separation)."""
+        me = self.get(drone_id)
+        if me is None:
+            return []
+        with self._lock:
+            found = self.index.within((me.x, me.y, me.z), self.radius if radius is None else radius)
+        return [(a.id, d) for a, d in self._fresh(found, drone_id, self._clock())]
+
+    def conflicts(self, drone_id, target=None):
+        """
+        Predicted conflicts for a drone, soonest first: another drone that
+        comes closer than the separation within the horizon (both flying at
+        their current velocity), or that sits within the separation of the
+        segment from here to target.
+        """
+        me = self.get(drone_id)
+        if me is None:
+            return []
+        here = (me.x, me.y, me.z)
+        end = here if target is None else tuple(target)
+        with self._lock:
+            found = self.index.near_segment(here, end, self.reach)
+        out = []
+        for a, _ in self._fresh(found, drone_id, self._clock()):
+            dp = (a.x - me.x, a.y - me.y, a.z - me.z)
+            t_cpa, d_cpa = closest_approach(dp, (a.vx - me.vx, a.vy - me.vy, a.vz - me.vz), self.horizon)
+            if d_cpa >= self.radius and segment_distance((a.x, a.y, a.z), here, end) < self.radius:
+                t_cpa, d_cpa = 0.0, segment_distance((a.x, a.y, a.z), here, end)
+            if d_cpa < self.radius:
+                distance = math.sqrt(sum(c * c for c in dp))
+                out.append(Conflict(a.id, (a.x, a.y, a.z), (a.vx, a.vy, a.vz), distance, t_cpa, d_cpa))
+        out.sort(key=lambda c: (c.t_cpa, c.distance))
+        return out
+
+    @staticmethod
+    def has_right_of_way(drone_id, other):
+        return drone_id < other
+
+    def give_way(self, drone_id, target=None):
+        """Soonest conflict with a drone that has right of way over this one, or None."""
+        for c in self.conflicts(drone_id, target):
+            if not self.has_right_of_way(drone_id, c.other):
+                return c
+        return None
+
+
+# ------------------------------
+# Benchmark
+# ------------------------------
+
+def brute_force_within(agents, point, radius):
+    return [(a, d) for a in agents
+            for d in [math.sqrt((a.x - point[0]) ** 2 + (a.y - point[1]) ** 2 + (a.z - point[2]) ** 2)]
+            if d <= radius]
+
+
+def benchmark(n_agents, area=1.0, height=2.0, queries=2000, seed=0, radius=0.35):
+    """
+    Timings (µs) for pose updates and both query kinds with n_agents random
+    drones, `area` m² of floor each (the room grows with the swarm).
+    """
+    side = math.sqrt(n_agents * area)
+    room = (side, side, height)
+    rng = random.Random(seed)
+    clock = [0.0]
+    service = Deconfliction(radius=radius, clock=lambda: clock[0])
+
+    def random_pose():
+        position = tuple(rng.uniform(0.0, s) for s in room)
+        velocity = tuple(rng.uniform(-0.5, 0.5) for _ in room[:2]) + (0.0,)
+        return position, velocity
+
+    ids = [f"cf{i:04d}" for i in range(n_agents)]
+    for i in ids:
+        service.update(i, *random_pose())
+
+    def timed(fn):
+        samples = []
+        for _ in range(queries):
+            i = rng.choice(ids)
+            started = time.perf_counter_ns()
+            fn(i)
+            samples.append((time.perf_counter_ns() - started) / 1000.0)
+        samples.sort()
+        return {"mean_us": sum(samples) / len(samples), "p99_us": samples[int(0.99 * (len(samples) - 1))]}
+
+    def step_target(i):
+        a = service.get(i)
+        return a.x + a.vx * service.horizon, a.y + a.vy * service.horizon, a.z
+
+    agents = list(service.index.agents.values())
+    return {
+        "agents": n_agents,
+        "update": timed(lambda i: service.update(i, *random_pose())),
+        "within": timed(lambda i: service.neighbours(i)),
+        "give_way": timed(lambda i: service.give_way(i, step_target(i))),
+        "brute_within": timed(lambda i: brute_force_within(agents, (service.get(i).x, service.get(i).y,
+                                                                    service.get(i).z), radius)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark deconfliction queries")
+    parser.add_argument("--agents", type=int, nargs="+", default=[100, 300, 1000])
+    parser.add_argument("--area", type=float, default=1.0, help="floor area per drone (m²)")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(" agents   " + "  ".join(f"{k:>20}" for k in ("update", "within", "give_way", "brute_within")))
+    for n in args.agents:
+        r = benchmark(n, area=args.area, queries=args.queries, seed=args.seed)
+        print(f"{n:7d}   " + "  ".join(f"{r[k]['mean_us']:8.1f} (p99 {r[k]['p99_us']:6.1f})"
+                                       for k in ("update", "within", "give_way", "brute_within")))
+    print("(µs per call, mean and p99)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# Setpoint dispatcher: deduplication, coalescing and a packet budget per link
+"""
+Sits between the mission logic and PositionHlCommander and decides which
+go_to calls actually go on the air.
+
+- deduplication: a setpoint within `deadband` of the last one sent
+  (default: the same one) is dropped, e.g. the waypoint that direct
+  cruising sends every tick, or the tiny steps at the end of a leg with
+  a deadband of a few millimetres;
+- a packet budget: routine go_to's spend tokens from a bucket refilled at
+  `rate_hz` (up to `burst`); without a token the call is held back, and a
+  newer one replaces it (coalescing), so only the latest target goes out
+  once the budget allows. It goes out with the travel time of the latest
+  request, not at that request's velocity over the whole distance: the
+  drone stays on the route's schedule and a blocking go_to does not hold
+  the loop up for the setpoints that were skipped;
+- priorities: SAFETY commands (avoidance setpoints, land) never wait.
+  They go out at once, take what is left of the budget (without running
+  it into debt that would stall cruising afterwards) and cancel a
+  held-back routine setpoint, so routine progress makes room for them.
+
+It forwards everything else to the commander, so it replaces it in place:
+
+    commander = CommandDispatcher(PositionHlCommander(scf), rate_hz=10)
+    commander.go_to(x, y, z, velocity=velocity)             # routine
+    commander.go_to(*setpoint, priority=SAFETY)
+    commander.flush()                                       # held-back setpoint, budget allowing
+    print(commander.summary())
+"""
+import math
+import time
+
+ROUTINE = 0
+SAFETY = 1
+
+
+def distance(a, b):
+    return math.sqrt(sum((p - q) ** 2 for p, q in zip(a, b)))
+
+
+class CommandDispatcher:
+    """
+    Dispatcher for one link. rate_hz: go_to packets per second (None: no
+    budget); burst: packets that may go out back to back; deadband (m):
+    setpoints closer than this to the last one sent are dropped. `send`
+    puts a go_to on the air, go_to(x, y, z, velocity), by default the
+    commander's own (blocking) go_to.
+    """
+
+    def __init__(self, commander, rate_hz=None, burst=2, deadband=0.0, send=None, clock=time.monotonic):
+        if rate_hz is not None and rate_hz <= 0:
+            raise ValueError("rate_hz must be positive")
+        self.commander = commander
+        self.rate_hz = rate_hz
+        self.burst = burst
+        self.deadband = deadband
+        self.send = send or commander.go_to
+        self._clock = clock
+        self._tokens = float(burst)
+        self._refilled = clock()
+        self.last = None            # last setpoint sent (x, y, z)
+        self.target = None          # last setpoint requested
+        self.pending = None         # held-back routine setpoint (x, y, z, velocity, travel)
+        self.requested = 0
+        self.sent = 0
+        self.duplicates = 0
+        self.coalesced = 0
+        self.safety = 0
+
+    def __getattr__(self, name):
+        return getattr(self.commander, name)
+
+    # ---- budget ----
+
+    def _refill(self):
+        now = self._clock()
+        if self.rate_hz is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate_hz)
+        self._refilled = now
+
+    def delay(self):
+        """Seconds until a routine packet may go out (0 without a budget)."""
+        if self.rate_hz is None:
+            return 0.0
+        self._refill()
+        short = 1.0 - self._tokens
+        return short / self.rate_hz if short > 1e-9 else 0.0     # no waiting on rounding error
+
+    # ---- commands ----
+
+    def go_to(self, x, y, z=None, velocity=None, priority=ROUTINE):
+        """Queue a setpoint; returns True when it went out now."""
+        self.requested += 1
+        z = self.commander._default_height if z is None else z
+        previous, self.target = self.target, (x, y, z)
+        travel = distance(previous or self.commander.get_position(), self.target) / \
+            (velocity or self.commander._default_velocity)
+        held = self.pending is not None
+        if held:
+            self.pending = None
+            self.coalesced += 1         # superseded before it went out
+        if self.last is not None and max(abs(a - b) for a, b in zip(self.last, self.target)) <= self.deadband:
+            self.duplicates += 1
+            return False
+        if priority >= SAFETY:
+            self.safety += 1
+        elif self.delay() > 0.0:
+            self.pending = (x, y, z, velocity, travel)
+            return False
+        self._send(x, y, z, velocity, travel if held else None)
+        return True
+
+    def flush(self):
+        """Send the held-back setpoint if the budget allows; True when it went out."""
+        if self.pending is None or self.delay() > 0.0:
+            return False
+        x, y, z, velocity, travel = self.pending
+        self.pending = None
+        self._send(x, y, z, velocity, travel)
+        return True
+
+    def land(self, *args, **kwargs):
+        if self.pending is not None:
+            self.pending = None
+            self.coalesced += 1
+        self.safety += 1
+        self.commander.land(*args, **kwargs)
+
+    def _send(self, x, y, z, velocity, travel=None):
+        """travel: seconds the move may take when it stands for held-back setpoints."""
+        if travel and self.last is not None:
+            velocity = max(distance(self.last, (x, y, z)) / travel, velocity or 0.0)
+        self._refill()
+        self._tokens = max(0.0, self._tokens - 1.0)
+        self.last = (x, y, z)
+        self.sent += 1
+        if velocity is None:
+            self.send(x, y, z)
+        else:
+            self.send(x, y, z, velocity=velocity)
+
+    # ---- reporting ----
+
+    @property
+    def saved(self):
+        return self.duplicates + self.coalesced
+
+    def report(self):
+        return {
+            "requested": self.requested,
+            "sent": self.sent,
+            "saved": self.saved,
+            "duplicates": self.duplicates,
+            "coalesced": self.coalesced,
+            "safety": self.safety,
+        }
+
+    def summary(self):
+        share = 100.0 * self.saved / self.requested if self.requested else 0.0
+        return (f"Commands: {self.sent} of {self.requested} go_to sent, {self.saved} packets saved ({share:.0f}%: "
+                f"{self.duplicates} duplicate, {self.coalesced} coalesced), {self.safety} safety")
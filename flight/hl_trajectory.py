@@ -0,0 +1,126 @@
+# On-board trajectory execution through the high-level commander
+"""
+Run the precomputed legs on the Crazyflie instead of streaming go_to.
+
+Every leg of a Trajectory is compiled into Poly4D pieces, all legs are
+written to the trajectory memory in one bulk write and each leg is
+registered under its own trajectory id. Starting a leg is then a single
+start_trajectory packet; the host only tracks where the leg puts the drone
+and sends go_to overrides when the avoidance logic fires (a go_to pre-empts
+the running trajectory on board):
+
+    onboard = OnboardTrajectory(scf.cf, trajectory)
+    onboard.upload()
+    commander = CommandDispatcher(PositionHlCommander(scf), send=onboard.go_to)
+    segment = onboard.start(i, onboard.position() or get_pos(commander))
+    # every tick
+    onboard.track(segment, k)
+"""
+import math
+import time
+
+from cflib.crazyflie.mem import MemoryElement, Poly, Poly4D
+
+# Poly4D piece as stored on board: 4 axes x 8 float coefficients + duration
+POLY4D_BYTES = 132
+TRAJECTORY_MEMORY_BYTES = 4096
+
+
+def check_fits(trajectory):
+    """ValueError when the legs of a Trajectory do not fit in the trajectory memory (no link needed)."""
+    _check_size(sum(len(segment.pieces()) for segment in trajectory.segments))
+
+
+def _check_size(n_pieces):
+    if n_pieces * POLY4D_BYTES > TRAJECTORY_MEMORY_BYTES:
+        raise ValueError(f"{n_pieces} trajectory pieces do not fit in {TRAJECTORY_MEMORY_BYTES} bytes")
+
+
+class OnboardTrajectory:
+    """
+    Upload and start the legs of a flight.trajectory.Trajectory on one
+    Crazyflie. velocity (m/s) paces go_to overrides sent without one, like
+    PositionHlCommander's default_velocity.
+    """
+
+    def __init__(self, cf, trajectory, first_id=1, velocity=0.5):
+        self._cf = cf
+        self.trajectory = trajectory
+        self.first_id = first_id
+        self.velocity = velocity
+        self.legs = []              # (trajectory id, byte offset, n pieces) per leg
+        self.uploaded = False
+        self.expected = None        # where the running leg or the last override puts the drone
+
+    def compile(self):
+        """All legs as one Poly4D list, recording where each leg starts."""
+        pieces = []
+        self.legs = []
+        for i, segment in enumerate(self.trajectory.segments):
+            leg = segment.pieces()
+            self.legs.append((self.first_id + i, len(pieces) * POLY4D_BYTES, len(leg)))
+            for duration, x, y, z in leg:
+                pieces.append(Poly4D(duration, Poly(x), Poly(y), Poly(z), Poly([0.0] * 8)))
+        _check_size(len(pieces))
+        return pieces
+
+    def upload(self):
+        """One bulk memory write, then define every leg. Raises RuntimeError if the write fails."""
+        pieces = self.compile()
+        mems = self._cf.mem.get_mems(MemoryElement.TYPE_TRAJ)
+        if not mems:
+            raise RuntimeError("No trajectory memory on this Crazyflie")
+        mem = mems[0]
+        mem.trajectory = pieces
+        if not mem.write_data_sync():
+            raise RuntimeError("Trajectory upload failed")
+        hl = self._cf.high_level_commander
+        for trajectory_id, offset, n_pieces in self.legs:
+            if n_pieces:
+                hl.define_trajectory(trajectory_id, offset, n_pieces)
+        self.uploaded = True
+
+    def start(self, i, position):
+        """
+        Start leg i and return the Segment now being flown. A leg that is
+        already on board is one start_trajectory packet; when the drone is
+        off the planned start (after a bypass) a single go_to with the
+        profile's duration takes it to the waypoint instead.
+        """
+        if not self.uploaded:
+            raise RuntimeError("upload() the trajectory before starting legs")
+        segment = self.trajectory.segment(i, position)
+        hl = self._cf.high_level_commander
+        if segment is self.trajectory.segments[i]:
+            trajectory_id, _offset, n_pieces = self.legs[i]
+            if n_pieces:
+                hl.start_trajectory(trajectory_id, 1.0, False)
+        elif segment.distance > 0.0:
+            x, y, z = (float(c) for c in segment.end)
+            hl.go_to(x, y, z, 0.0, segment.duration)
+        self.expected = tuple(float(c) for c in segment.start)
+        return segment
+
+    def track(self, segment, k):
+        """
+        Follow the on-board leg k ticks after it started (no radio traffic),
+        so overrides and the next leg start from where the drone is meant to be.
+        """
+        x, y, z = segment.setpoint(k - 1)[:3] if k > 0 else segment.start
+        self.expected = (float(x), float(y), float(z))
+
+    def position(self):
+        """Where the drone is meant to be (None before the first leg)."""
+        return self.expected
+
+    def go_to(self, x, y, z, velocity=None):
+        """
+        Override the running leg: a high-level go_to from the expected
+        position, blocking for its duration like PositionHlCommander.go_to.
+        """
+        start = self.expected if self.expected is not None else (x, y, z)
+        duration = math.dist(start, (x, y, z)) / (velocity or self.velocity)
+        if duration > 0.0:
+            self._cf.high_level_commander.go_to(x, y, z, 0.0, duration)
+            time.sleep(duration)
+        self.expected = (x, y, z)
@@ -0,0 +1,248 @@
+# Link-health monitor: RSSI, packet loss, ack latency and sensor-data age in sliding windows
+"""
+How much the mission can trust what it sees, and so how far it may move
+per tick.
+
+Every attached log block is watched as its packets arrive. The monitor
+records the age of the newest packet and the gaps in the Crazyflie's log
+timestamps: one missing period counts as one lost packet. cflib's link
+statistics add the ping round trip (ack latency), the link quality and
+the uplink RSSI where the installed cflib reports them. Everything goes
+into windows of the last `window_s` seconds. Once per control tick,
+update() turns them into:
+
+- delay: the worst round trip in the window plus the mean age of the
+  sensor data. This is how old a decision's view is once its command
+  takes effect.
+- scale: nominal_delay / delay, clamped to [min_scale, 1]. It is the
+  fraction of the normal step to move this tick, 1 on a clean link.
+- margin(speed): extra trigger distance for what the drone flies at
+  `speed` over the delay beyond nominal.
+- stale: the newest packet of an attached block is older than stale_s.
+  The mission hovers until data is fresh again.
+
+    link = LinkHealth(stale_s=0.3)
+    link.attach_link(scf)
+    link.attach(multiranger)
+    link.attach(state_estimate)
+    link.update()
+    if link.stale: ...                  # hold position
+    step = 0.05 * link.scale
+"""
+import threading
+import time
+from collections import deque
+
+
+class LinkLost(RuntimeError):
+    """No fresh sensor data for longer than the monitor's max_hold_s."""
+
+
+class Window:
+    """(time, value) samples of the last `seconds`, oldest first."""
+
+    def __init__(self, seconds, clock=time.monotonic):
+        self.seconds = seconds
+        self._clock = clock
+        self._items = deque()
+
+    def __len__(self):
+        self._prune(self._clock())
+        return len(self._items)
+
+    def add(self, value, t=None):
+        t = self._clock() if t is None else t
+        self._items.append((t, value))
+        self._prune(t)
+
+    def _prune(self, now):
+        items, since = self._items, now - self.seconds
+        while items and items[0][0] < since:
+            items.popleft()
+
+    def values(self):
+        self._prune(self._clock())
+        return [value for _, value in self._items]
+
+    def mean(self, default=None):
+        values = self.values()
+        return sum(values) / len(values) if values else default
+
+    def maximum(self, default=None):
+        values = self.values()
+        return max(values) if values else default
+
+    def minimum(self, default=None):
+        values = self.values()
+        return min(values) if values else default
+
+    def total(self):
+        return sum(self.values())
+
+
+class _Arrivals:
+    """Packet arrivals of one log block: newest arrival, received and lost packets."""
+
+    def __init__(self, period, window_s, clock, now):
+        self.period = period            # ms between packets (Crazyflie clock)
+        self.stamp = None               # log timestamp of the newest packet
+        self.t = now                    # its arrival (host clock); attach time before the first
+        self.received = Window(window_s, clock)
+        self.lost = Window(window_s, clock)
+        self.total_received = 0
+        self.total_lost = 0
+
+    def packet(self, stamp, now):
+        if self.stamp is not None and self.period:
+            missing = round((stamp - self.stamp) / self.period) - 1
+            if missing > 0:
+                self.lost.add(missing, now)
+                self.total_lost += missing
+        self.received.add(1, now)
+        self.total_received += 1
+        self.stamp, self.t = stamp, now
+
+
+class LinkHealth:
+    """
+    Link monitor of one Crazyflie. window_s: length of the windows (s);
+    nominal_delay (s): the delay the normal step is tuned for, so anything
+    up to it flies at full speed; min_scale: the smallest step fraction;
+    stale_s: the sensor-data age above which the mission holds position;
+    max_hold_s: how long it may hold before update() raises LinkLost;
+    default_rtt (s): the round trip assumed before the first ping.
+    """
+
+    def __init__(self, window_s=2.0, nominal_delay=0.2, min_scale=0.3, stale_s=0.3, max_hold_s=5.0,
+                 default_rtt=0.03, clock=time.monotonic):
+        if not 0.0 < min_scale <= 1.0:
+            raise ValueError("min_scale must be in (0, 1]")
+        self.window_s = window_s
+        self.nominal_delay = nominal_delay
+        self.min_scale = min_scale
+        self.stale_s = stale_s
+        self.max_hold_s = max_hold_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._arrivals = {}                 # log block name -> _Arrivals
+        self.rtt = Window(window_s, clock)
+        self.rssi = Window(window_s, clock)
+        self.quality = Window(window_s, clock)
+        self.ages = Window(window_s, clock)
+        self.last_rtt = default_rtt
+        # what update() derived
+        self.age = 0.0
+        self.delay = 0.0
+        self.scale = 1.0
+        self.stale = False
+        self._held_since = None
+        # flight totals
+        self.ticks = 0
+        self.slowed = 0
+        self.min_seen_scale = 1.0
+        self.max_delay = 0.0
+        self.holds = 0
+        self.held_s = 0.0
+        self.min_rssi = None
+
+    # ---- wiring ----
+
+    def attach(self, source):
+        """Watch the packets of a Multiranger, StateEstimate or anything else with a `_log_config`."""
+        logconf = source._log_config
+        self._arrivals[logconf.name] = _Arrivals(logconf.period_in_ms, self.window_s, self._clock, self._clock())
+        logconf.data_received_cb.add_callback(self._on_packet)
+
+    def attach_link(self, crazyflie):
+        """Subscribe to cflib's link statistics, as far as the installed cflib has them."""
+        cf = getattr(crazyflie, "cf", crazyflie)
+        stats = getattr(cf, "link_statistics", None)
+        latency = getattr(stats, "latency", None)
+        for caller, callback in ((getattr(latency, "latency_updated", None), self._on_latency),
+                                 (getattr(stats, "link_quality_updated", None), self._on_quality),
+                                 (getattr(stats, "uplink_rssi_updated", None), self._on_rssi)):
+            if caller is not None:
+                caller.add_callback(callback)
+
+    def _on_packet(self, timestamp, data, logconf):
+        with self._lock:
+            self._arrivals[logconf.name].packet(timestamp, self._clock())
+
+    def _on_latency(self, latency_ms):
+        with self._lock:
+            self.last_rtt = latency_ms / 1000.0
+            self.rtt.add(self.last_rtt)
+
+    def _on_quality(self, quality):
+        with self._lock:
+            self.quality.add(quality)
+
+    def _on_rssi(self, rssi):
+        with self._lock:
+            self.rssi.add(rssi)
+            self.min_rssi = rssi if self.min_rssi is None else min(self.min_rssi, rssi)
+
+    # ---- per tick ----
+
+    def update(self):
+        """Re-derive delay, scale and stale from the windows (once per control tick)."""
+        now = self._clock()
+        with self._lock:
+            self.age = max((now - a.t for a in self._arrivals.values()), default=0.0)
+            self.ages.add(self.age, now)
+            self.delay = self.rtt.maximum(self.last_rtt) + self.ages.mean()
+        self.scale = min(1.0, max(self.min_scale, self.nominal_delay / self.delay)) if self.delay > 0.0 else 1.0
+        self.ticks += 1
+        self.slowed += self.scale < 1.0
+        self.min_seen_scale = min(self.min_seen_scale, self.scale)
+        self.max_delay = max(self.max_delay, self.delay)
+
+        stale = self.age > self.stale_s
+        if stale and not self.stale:
+            self.holds += 1
+            self._held_since = now
+        elif self.stale and not stale:
+            self.held_s += now - self._held_since
+            self._held_since = None
+        self.stale = stale
+        if stale and now - self._held_since > self.max_hold_s:
+            raise LinkLost(f"No sensor data for {self.age:.1f} s")
+        return self.scale
+
+    def margin(self, speed):
+        """Extra trigger distance (m) at `speed` (m/s) for the delay beyond nominal."""
+        return speed * max(0.0, self.delay - self.nominal_delay)
+
+    def loss(self):
+        """Share of log packets lost in the window (from timestamp gaps and the link quality)."""
+        with self._lock:
+            lost = sum(a.lost.total() for a in self._arrivals.values())
+            received = sum(a.received.total() for a in self._arrivals.values())
+            quality = self.quality.minimum()
+        gaps = lost / (lost + received) if lost + received else 0.0
+        return gaps if quality is None else max(gaps, 1.0 - quality / 100.0)
+
+    # ---- reporting ----
+
+    def report(self):
+        with self._lock:
+            lost = sum(a.total_lost for a in self._arrivals.values())
+            received = sum(a.total_received for a in self._arrivals.values())
+        return {
+            "ticks": self.ticks,
+            "slowed": self.slowed,
+            "min_scale": self.min_seen_scale,
+            "max_delay": self.max_delay,
+            "holds": self.holds,
+            "held_s": self.held_s,
+            "loss": lost / (lost + received) if lost + received else 0.0,
+            "min_rssi": self.min_rssi,
+        }
+
+    def summary(self):
+        r = self.report()
+        share = 100.0 * r["slowed"] / r["ticks"] if r["ticks"] else 0.0
+        rssi = "" if r["min_rssi"] is None else f", RSSI down to {r['min_rssi']:.0f} dBm"
+        return (f"Link: delay up to {r['max_delay'] * 1000:.0f} ms, {100.0 * r['loss']:.1f}% packets lost{rssi}; "
+                f"slowed {share:.0f}% of ticks (step x{r['min_scale']:.2f} at least), "
+                f"held {r['holds']} times ({r['held_s']:.1f} s)")
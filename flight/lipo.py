@@ -0,0 +1,5 @@
+# 1S LiPo discharge curve, shared by the battery monitor and the simulator
+
+# Open-circuit voltage of a 1S LiPo by state of charge, a typical discharge curve
+LIPO_CURVE = ((0.0, 3.0), (0.05, 3.45), (0.1, 3.6), (0.2, 3.7), (0.3, 3.74), (0.4, 3.78), (0.5, 3.82),
+              (0.6, 3.87), (0.7, 3.93), (0.8, 4.0), (0.9, 4.08), (1.0, 4.2))
@@ -0,0 +1,25 @@
+"""
+Mission engine: one implementation of the Waypoint_Avoid flight, with the
+avoidance behaviour as a pluggable policy and each mission's settings in
+missions.json.
+
+    from flight.mission import fly
+    fly("Waypoint_Avoid06", {"safety_margin": 0.3})
+
+From the shell (list, inspect, A/B in the simulator, fly):
+
+    python -m flight.mission list
+    python -m flight.mission compare Waypoint_Avoid06 Waypoint_Avoid09 --runs 500
+"""
+from flight.mission.config import DEFAULT_CONFIG, SETTINGS, load, mission_settings
+from flight.mission.policies import (POLICIES, AvoidancePolicy, BypassPolicy, DetourPolicy, Leg, PlannerPolicy,
+                                    make_policy)
+
+
+def fly(mission, settings=None, config=None):
+    """Fly one mission of the config file, settings overriding its own (needs cflib)."""
+    if mission_settings(mission, settings, config)["runtime"] == "asyncio":
+        from flight.mission.runtime import AsyncMission as Mission
+    else:
+        from flight.mission.engine import Mission
+    Mission(mission, settings, config).fly()
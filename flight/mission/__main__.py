@@ -0,0 +1,174 @@
+# Mission command line: list, inspect, compare in the simulator, fly
+"""
+    python -m flight.mission list
+    python -m flight.mission show Waypoint_Avoid09
+    python -m flight.mission compare Waypoint_Avoid06 Waypoint_Avoid09 --runs 500 --set safety_margin=0.3
+    python -m flight.mission fly Waypoint_Avoid06 --set policy.forward=0.8
+
+compare flies every mission on the same seeded scenarios (flight/monte_carlo.py)
+and pairs the runs seed by seed against the first mission: the collisions
+only one side had, the mean time difference with its 95% interval, and
+the differences in obstacle reactions and distance flown. A mission can carry its own settings
+after colons, and --outliers / --dropouts inject range faults, e.g. to
+count the false bypasses the range filter removes:
+
+    python -m flight.mission compare Waypoint_Avoid06:range_filter=None Waypoint_Avoid06 --outliers 0.02
+
+--loss / --outages degrade the radio link instead (lost log packets, outages),
+and --charge starts every flight on a partly charged battery.
+"""
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from flight.mission import fly
+from flight.mission.config import ROOT, load, mission_settings
+from flight.monte_carlo import SCENARIO, Z95, Summary, faulty, format_report, run_chunk
+from flight.replay import parse_setting
+
+FLY_SCRIPT = os.path.join(ROOT, "Fly_Mission.py")
+
+
+def parse_arm(spec):
+    """"NAME:key=value:..." -> (NAME, {key: value})."""
+    name, *settings = spec.split(":")
+    return name, dict(parse_setting(text) for text in settings)
+
+
+def compare(arms, runs, seed=0, workers=None, chunk=50, overrides=None, config=None, scenario=SCENARIO,
+            progress=None):
+    """
+    Fly every arm (a mission, optionally with settings, see parse_arm) on
+    seeds seed .. seed + runs - 1 in a process pool. Returns
+    {arm: {seed: result}}. Telemetry is off unless overridden.
+    """
+    jobs = {}
+    for spec in arms:
+        name, own = parse_arm(spec)
+        settings = {"telemetry_file": None, **(overrides or {}), **own}
+        mission_settings(name, settings, config)        # bad names and settings fail before the pool starts
+        jobs[spec] = {"MISSION": name, "SETTINGS": settings}
+        if config:
+            jobs[spec]["CONFIG"] = os.path.abspath(config)
+    results = {spec: {} for spec in jobs}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_chunk, FLY_SCRIPT, range(start, min(start + chunk, seed + runs)), scenario,
+                               job): spec
+                   for spec, job in jobs.items()
+                   for start in range(seed, seed + runs, chunk)}
+        done = 0
+        for future in as_completed(futures):
+            for result in future.result():
+                results[futures[future]][result["seed"]] = result
+            done += 1
+            if progress is not None:
+                progress(done, len(futures))
+    return results
+
+
+def paired(base, other):
+    """Seed-by-seed comparison of two missions' results."""
+    seeds = sorted(base.keys() & other.keys())
+    diffs = [other[s]["sim_time"] - base[s]["sim_time"] for s in seeds]
+    n = len(diffs)
+    mean = sum(diffs) / n if n else 0.0
+    var = sum((d - mean) ** 2 for d in diffs) / (n - 1) if n > 1 else 0.0
+    half = Z95 * math.sqrt(var / n) if n else 0.0
+    return {
+        "runs": n,
+        "new_collisions": sum(other[s]["collided"] and not base[s]["collided"] for s in seeds),
+        "fixed_collisions": sum(base[s]["collided"] and not other[s]["collided"] for s in seeds),
+        "time_diff": mean,
+        "time_diff_ci95": (mean - half, mean + half),
+        "reactions_diff": sum(other[s]["reactions"] - base[s]["reactions"] for s in seeds) / n if n else 0.0,
+        "distance_diff": sum(other[s]["distance"] - base[s]["distance"] for s in seeds) / n if n else 0.0,
+    }
+
+
+# ------------------------------
+# CLI
+# ------------------------------
+
+def cmd_list(args):
+    config = load(args.config)
+    for name in config["missions"]:
+        s = mission_settings(name, config=config)
+        params = ", ".join(f"{k}={v}" for k, v in s["policy"].items() if k != "name")
+        print(f"{name}: {s['policy']['name']}({params}), trigger {s['trigger']}, cruise {s['cruise']}, "
+              f"{s['loop_rate_hz']} Hz, {s['controller']} controller")
+
+
+def cmd_show(args):
+    print(json.dumps(mission_settings(args.mission, dict(args.overrides), args.config), indent=2))
+
+
+def cmd_fly(args):
+    fly(args.mission, dict(args.overrides), args.config)
+
+
+def cmd_compare(args):
+    started = time.perf_counter()
+
+    def progress(done, total):
+        print(f"\r{done}/{total} chunks", end="", flush=True)
+
+    scenario = faulty(SCENARIO, args.outliers, args.dropouts, args.loss, args.outages, args.charge)
+    results = compare(args.missions, args.runs, args.seed, args.workers, args.chunk, dict(args.overrides),
+                      args.config, scenario, progress)
+    print(f"\nFinished in {time.perf_counter() - started:.1f}s")
+    for name, runs in results.items():
+        summary = Summary()
+        for result in runs.values():
+            summary.add(result)
+        print(format_report(name, summary.report()))
+    base = args.missions[0]
+    for name in args.missions[1:]:
+        p = paired(results[base], results[name])
+        lo, hi = p["time_diff_ci95"]
+        print(f"{name} vs {base}: {p['new_collisions']} new / {p['fixed_collisions']} fixed collisions "
+              f"over {p['runs']} seeds, time {p['time_diff']:+.2f}s [{lo:+.2f}, {hi:+.2f}], "
+              f"{p['reactions_diff']:+.2f} reactions/run, {p['distance_diff']:+.2f} m flown/run")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m flight.mission", description="Configured missions")
+    parser.add_argument("--config", default=None, help="mission file (default: missions.json)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list", help="missions and their policies").set_defaults(run=cmd_list)
+
+    for name, run, help in (("show", cmd_show, "merged settings of a mission"),
+                            ("fly", cmd_fly, "fly a mission (needs cflib and a Crazyflie)")):
+        command = commands.add_parser(name, help=help)
+        command.add_argument("mission")
+        command.set_defaults(run=run)
+
+    command = commands.add_parser("compare", help="A/B missions in the simulator on the same seeds")
+    command.add_argument("missions", nargs="+", metavar="MISSION[:NAME=VALUE...]")
+    command.add_argument("--runs", type=int, default=200, help="scenarios per mission")
+    command.add_argument("--seed", type=int, default=0)
+    command.add_argument("--workers", type=int, default=None)
+    command.add_argument("--chunk", type=int, default=50, help="runs per worker task")
+    command.add_argument("--outliers", type=float, default=0.0, help="probability of a spurious short range")
+    command.add_argument("--dropouts", type=float, default=0.0, help="probability of a missing range")
+    command.add_argument("--loss", type=float, default=0.0, help="probability of a lost log packet")
+    command.add_argument("--outages", type=float, default=0.0, help="radio outages per second (0.5 s on average)")
+    command.add_argument("--charge", type=float, default=1.0, help="battery charge at take-off (0 .. 1)")
+    command.set_defaults(run=cmd_compare)
+
+    for name in ("show", "fly", "compare"):
+        commands.choices[name].add_argument("--set", dest="overrides", type=parse_setting, action="append", default=[],
+                             metavar="NAME=VALUE", help="override a mission setting (repeatable)")
+
+    args = parser.parse_args()
+    try:
+        args.run(args)
+    except (ValueError, FileNotFoundError, argparse.ArgumentTypeError) as e:
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    main()
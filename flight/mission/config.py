@@ -0,0 +1,152 @@
+# Mission profiles: shared defaults plus named missions in one JSON file
+"""
+Every setting a mission can have, with its default, and the loader that
+merges them with a config file:
+
+    {
+      "defaults": {"loop_rate_hz": 20},
+      "missions": {
+        "Waypoint_Avoid06": {"policy": {"name": "bypass", "side": -0.5, "forward": 0.5}},
+        "Waypoint_Avoid09": {"extends": "Waypoint_Avoid06", "policy": {"side": 0.5, "forward": 0.8, "back": 0.5}}
+      }
+    }
+
+A mission is SETTINGS, then the file's defaults, then the mission it
+extends, then its own entry, then overrides. The policy, range_filter,
+link_health, battery, occupancy and route_optimizer entries merge key by
+key (the policy as long as its name stays the same, "policy.name" too).
+"""
+import copy
+import json
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_CONFIG = os.path.join(ROOT, "missions.json")
+
+SETTINGS = {
+    "uri": "radio://0/80/2M/E7E7E7E702",    # CFLIB_URI in the environment wins
+    "controller": "pid",                    # PositionHlCommander controller: "pid" or "default"
+    "height": 0.4,                          # take-off height (m)
+    "loop_rate_hz": 20,
+    "runtime": "thread",                    # "thread": engine.Mission, "asyncio": runtime.AsyncMission
+    "command_rate_hz": None,                # go_to packet budget of the link (flight/dispatch.py); None: no limit
+    "command_deadband": 0.0,                # setpoints this close to the last one sent are not sent (m)
+    "route": [[0.0, 0.0, 0.4, 3.0], [1.0, 0.0, 0.4, 3.0], [1.0, -0.4, 0.4, 3.0], [0.0, -0.4, 0.4, 3.0],
+              [-1.0, -0.4, 0.4, 3.0], [-1.0, 0.0, 0.4, 3.0], [0.0, 0.0, 0.4, 3.0]],   # (x, y, z, s)
+    "route_optimizer": None,                # flight/route_optimizer.py, e.g. {"fix_end": false}; None: route as given
+    "cruise": "trajectory",                 # "trajectory": precomputed legs, "direct": go_to the waypoint
+    "onboard_trajectory": False,            # run the legs on board (cruise "trajectory" only)
+    "trigger": "ttc",                       # "ttc": flight/ttc.py, "threshold": raw range below threshold
+    "safety_margin": 0.25,                  # ttc trigger (m)
+    "threshold": 0.25,                      # threshold trigger (m)
+    "range_filter": {"window": 3, "alpha": 1.0, "spike": 0.3, "confirm": 1},   # flight/range_filter.py; None: raw
+    "hysteresis": 0.05,                     # an obstacle state is left this much further out than entered (m)
+    "link_health": None,                    # flight/link_health.py, e.g. {"stale_s": 0.3}; None: off
+    "battery": None,                        # flight/battery.py scheduler, e.g. {"reserve": 0.05}; None: off
+    "occupancy": {"resolution": 0.05, "max_range": 2.0},    # flight/occupancy.py grid fed every tick; None: off
+    "policy": {"name": "bypass"},           # avoidance policy and its parameters (flight/mission/policies.py)
+    "takeoff_s": 3.0,
+    "pause_s": 0.3,                         # hover between legs
+    "hover_s": 5.0,                         # hover before landing
+    "max_flight_s": None,                   # land when a leg starts later than this after take-off
+    "telemetry_file": None,                 # e.g. "{mission}.cftl": record telemetry (about 20 MB ring file)
+    "profile": False,                       # loop stage timers (flight/profiler.py)
+    "profile_file": "{mission}.profile.json",
+}
+
+CRUISE = ("trajectory", "direct")
+TRIGGERS = ("ttc", "threshold")
+CONTROLLERS = ("pid", "default")
+RUNTIMES = ("thread", "asyncio")
+# settings that are objects of parameters
+NESTED = ("policy", "range_filter", "link_health", "battery", "occupancy", "route_optimizer")
+FILTER_PARAMS = ("window", "alpha", "spike", "confirm")
+LINK_PARAMS = ("window_s", "nominal_delay", "min_scale", "stale_s", "max_hold_s", "default_rtt")
+BATTERY_PARAMS = ("capacity_wh", "resistance", "rate_ms", "per_s", "per_m", "reserve", "landing_s")
+OCCUPANCY_PARAMS = ("resolution", "dims", "tile", "max_range", "l_occ", "l_free", "l_min", "l_max")
+ROUTE_PARAMS = ("fix_start", "fix_end", "v_z", "a_max", "neighbours", "settle_s")
+
+
+def load(path=None):
+    """Raw config file: {"defaults": {...}, "missions": {name: {...}}}."""
+    with open(path or DEFAULT_CONFIG, encoding="utf-8") as f:
+        config = json.load(f)
+    config.setdefault("defaults", {})
+    config.setdefault("missions", {})
+    return config
+
+
+def merge(settings, changes, where):
+    """Apply one layer of settings; dotted keys ("policy.forward") set one parameter of an entry."""
+    for key, value in changes.items():
+        if key == "extends":
+            continue
+        head, _, param = key.partition(".")
+        if head not in SETTINGS or (param and head not in NESTED):
+            raise ValueError(f"{where}: unknown setting {key!r}")
+        if head == "policy" and param == "name" and value != settings["policy"].get("name"):
+            settings["policy"] = {"name": value}        # another policy: its own parameters, not the old one's
+        elif param:
+            settings[head] = {**(settings[head] or {}), param: value}
+        elif key in ("range_filter", "link_health", "battery", "occupancy", "route_optimizer"):
+            settings[key] = None if value is None else {**(settings[key] or {}), **value}
+        elif key == "policy":
+            if not isinstance(value, dict):
+                raise ValueError(f"{where}: policy must be an object with a name")
+            same = value.get("name", settings["policy"].get("name")) == settings["policy"].get("name")
+            settings["policy"] = {**settings["policy"], **value} if same else dict(value)
+        else:
+            settings[key] = value
+    return settings
+
+
+def mission_settings(name, overrides=None, config=None):
+    """Merged settings of one mission, validated. config: a loaded config or a path."""
+    if not isinstance(config, dict):
+        config = load(config)
+    missions = config["missions"]
+    if name not in missions:
+        raise ValueError(f"no mission {name!r} (have {', '.join(sorted(missions))})")
+    chain, entry = [], name
+    while entry is not None:
+        if entry in chain:
+            raise ValueError(f"mission {name!r}: circular extends through {entry!r}")
+        if entry not in missions:
+            raise ValueError(f"mission {chain[-1]!r} extends unknown mission {entry!r}")
+        chain.append(entry)
+        entry = missions[entry].get("extends")
+
+    settings = merge(copy.deepcopy(SETTINGS), config["defaults"], "defaults")
+    for entry in reversed(chain):
+        merge(settings, missions[entry], entry)
+    merge(settings, overrides or {}, "overrides")
+    validate(settings, name)
+    settings["mission"] = name
+    return settings
+
+
+def validate(settings, name):
+    for key, allowed in (("cruise", CRUISE), ("trigger", TRIGGERS), ("controller", CONTROLLERS),
+                         ("runtime", RUNTIMES)):
+        if settings[key] not in allowed:
+            raise ValueError(f"mission {name!r}: {key} must be one of {', '.join(allowed)}")
+    if settings["loop_rate_hz"] <= 0:
+        raise ValueError(f"mission {name!r}: loop_rate_hz must be positive")
+    if settings["command_rate_hz"] is not None and settings["command_rate_hz"] <= 0:
+        raise ValueError(f"mission {name!r}: command_rate_hz must be positive or null")
+    if settings["command_deadband"] < 0:
+        raise ValueError(f"mission {name!r}: command_deadband must not be negative")
+    if not settings["route"] or any(len(wp) != 4 for wp in settings["route"]):
+        raise ValueError(f"mission {name!r}: route must be a list of (x, y, z, duration)")
+    if settings["runtime"] == "asyncio" and settings["onboard_trajectory"]:
+        raise ValueError(f"mission {name!r}: onboard_trajectory needs the thread runtime")
+    if settings["policy"].get("name") == "planner" and settings["occupancy"] is None:
+        raise ValueError(f"mission {name!r}: the planner policy needs the occupancy grid")
+    if "name" not in settings["policy"]:
+        raise ValueError(f"mission {name!r}: policy has no name")
+    for key, params in (("range_filter", FILTER_PARAMS), ("link_health", LINK_PARAMS),
+                        ("battery", BATTERY_PARAMS), ("occupancy", OCCUPANCY_PARAMS),
+                        ("route_optimizer", ROUTE_PARAMS)):
+        unknown = set(settings[key] or ()) - set(params)
+        if unknown:
+            raise ValueError(f"mission {name!r}: unknown {key} parameter {', '.join(sorted(unknown))}")
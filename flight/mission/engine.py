@@ -0,0 +1,459 @@
+# Mission engine: one flight of a configured mission on one Crazyflie
+"""
+Everything the Waypoint_Avoid scripts had in common, written once: link
+and commander setup, Multiranger + state-estimate subscriptions, the
+obstacle trigger, cruising along the route (precomputed trajectory, on
+board or direct go_to), command dispatch, link health, battery scheduling,
+the occupancy grid, telemetry, profiling, the leg loop on the deadline-scheduled ControlLoop, landing and the error paths. What happens
+when an obstacle shows up is the mission's AvoidancePolicy:
+
+    Mission("Waypoint_Avoid06", {"safety_margin": 0.3}).fly()
+"""
+import contextlib
+import logging
+import time
+
+import cflib.crtp
+from cflib.crazyflie import Crazyflie
+from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
+from cflib.positioning.position_hl_commander import PositionHlCommander
+from cflib.utils import uri_helper
+from cflib.utils.multiranger import Multiranger
+
+from flight.battery import BatteryMonitor, BatteryScheduler, EnergyModel
+from flight.control_loop import ControlLoop
+from flight.dispatch import SAFETY, CommandDispatcher
+from flight.hl_trajectory import OnboardTrajectory, check_fits
+from flight.link_health import LinkHealth, LinkLost
+from flight.mission.config import mission_settings
+from flight.mission.policies import Leg, make_policy
+from flight.occupancy import OccupancyGrid
+from flight.profiler import Profiler
+from flight.range_filter import FilteredRangeStream, Hysteresis
+from flight.route_optimizer import optimize
+from flight.ranger_stream import RangeStream
+from flight.state_estimate import StateEstimate
+from flight.telemetry import ARRIVED, CRUISE, HOLD, TRACK, TelemetryRecorder
+from flight.trajectory import Trajectory
+from flight.ttc import FIELDS, CommandLatency, ObstacleReaction
+
+
+class MissionAborted(Exception):
+    """The mission landed before the end of its route (the max_flight_s failsafe)."""
+
+
+def _pick(params, *keys):
+    """The entries of a settings object that one class takes."""
+    return {k: params[k] for k in keys if k in params}
+
+
+class Mission:
+    """
+    One configured mission (see flight/mission/config.py for the settings).
+    Settings are merged and checked here, before anything connects, so a
+    bad config or override raises ValueError instead of flying. origin is
+    where the drone sits before take-off.
+    """
+
+    def __init__(self, name, overrides=None, config=None, origin=(0.0, 0.0, 0.0)):
+        self.name = name
+        self.settings = s = mission_settings(name, overrides, config)
+        self.uri = uri_helper.uri_from_env(default=s["uri"])
+        self.origin = tuple(origin)
+        self.route = [tuple(wp) for wp in s["route"]]
+        if s["route_optimizer"] is not None:
+            self.route = optimize(self.route, **s["route_optimizer"])
+        # legs by index: the route, then (with the battery scheduler) the way home
+        self.waypoints = list(self.route)
+        if s["battery"] is not None:
+            x0, y0, _ = self.origin
+            self.waypoints.append((x0, y0, s["height"], max(wp[3] for wp in self.route)))
+        self.policy = make_policy(s["policy"])
+        self.control_loop = ControlLoop(s["loop_rate_hz"])
+        self.grid = OccupancyGrid(**s["occupancy"]) if s["occupancy"] is not None else None
+        self.trajectory = None
+        if s["cruise"] == "trajectory":
+            self.trajectory = Trajectory(self.waypoints, start=self.route[0][:3], rate_hz=s["loop_rate_hz"])
+            if s["onboard_trajectory"]:
+                try:
+                    check_fits(self.trajectory)     # upload() would only find out after take-off
+                except ValueError as e:
+                    raise ValueError(f"mission {name!r}: {e}") from None
+        self.threshold = None
+        if s["trigger"] == "threshold":
+            self.threshold = {d: Hysteresis(s["threshold"], s["threshold"] + s["hysteresis"]) for d in FIELDS}
+        self.commander = None
+        self.dispatcher = None
+        self.multiranger = None
+        self.state_estimate = None
+        self.range_stream = None
+        self.reaction = None
+        self.link = None
+        self.battery = None
+        self.scheduler = None
+        self.telemetry = None
+        self.onboard = None
+        self.profiler = None
+
+    def _path(self, key):
+        path = self.settings[key]
+        return None if path is None else path.format(mission=self.name)
+
+    # ---- per-tick helpers (used by the policies) ----
+
+    def get_pos(self):
+        """Estimated X,Y,Z (state-estimate log); the commanded setpoint until the first sample."""
+        if self.state_estimate is not None:
+            position = self.state_estimate.position()
+            if position is not None:
+                return position
+        return self.setpoint()
+
+    def setpoint(self):
+        """Where the drone was sent: the on-board leg's expected position, or the commander's."""
+        if self.onboard is not None and self.onboard.position() is not None:
+            return self.onboard.position()
+        return self.commander.get_position()
+
+    def ranges(self):
+        """What the avoidance logic sees: the newest filtered sample, or the Multiranger itself."""
+        if isinstance(self.range_stream, FilteredRangeStream):
+            return self.range_stream.latest() or self.multiranger
+        return self.multiranger
+
+    def range_lead(self):
+        """(x, y) flown since the filtered ranges were measured (arrival age plus filter lag)."""
+        if not isinstance(self.range_stream, FilteredRangeStream) or self.state_estimate is None:
+            return (0.0, 0.0)
+        age = self.range_stream.age()
+        velocity = self.state_estimate.velocity()
+        if velocity is None or age == float("inf"):
+            return (0.0, 0.0)
+        return (velocity[0] * age, velocity[1] * age)
+
+    def is_close(self, direction):
+        """Obstacle trigger: latency-compensated TTC check, or the range below the threshold."""
+        if self.threshold is not None:
+            trigger = self.threshold[direction]
+            if self.link is not None:
+                self._widen(trigger)
+            return trigger.update(getattr(self.ranges(), FIELDS[direction]))
+        return self.reaction is not None and self.reaction.check(direction)
+
+    def _widen(self, trigger):
+        """Threshold plus what the drone flies in the link's delay beyond nominal (the TTC trigger has it built in)."""
+        s = self.settings
+        velocity = self.state_estimate.velocity() if self.state_estimate is not None else None
+        speed = 0.0 if velocity is None else (velocity[0] ** 2 + velocity[1] ** 2) ** 0.5
+        trigger.enter = s["threshold"] + self.link.margin(speed)
+        trigger.exit = trigger.enter + s["hysteresis"]
+
+    def step_scale(self):
+        """Fraction of the normal step to move this tick: below 1 while the link is slow."""
+        return 1.0 if self.link is None else self.link.scale
+
+    def pace(self):
+        """Wait for the next control tick."""
+        self.control_loop.wait()
+
+    def hold(self, seconds):
+        """Pause the decision (a maneuver settling)."""
+        time.sleep(seconds)
+
+    def log_tick(self, branch, setpoint=None):
+        """Queue this tick's telemetry record (never blocks the loop)."""
+        if self.telemetry is not None:
+            velocity = self.state_estimate.velocity() if self.state_estimate is not None else None
+            self.telemetry.record(branch, self.get_pos(), self.multiranger, setpoint, velocity)
+
+    def cruise(self, leg):
+        """No-obstacle tick: next setpoint of the leg. False once the waypoint is reached."""
+        if leg.segment is None:
+            self.commander.go_to(*leg.target)
+            self.log_tick(CRUISE, leg.target)
+            self.pace()
+            return True
+        if leg.segment.done(leg.k):
+            self.log_tick(ARRIVED)
+            return False        # on the waypoint: stop sending go_to
+        if self.onboard is not None:
+            self.onboard.track(leg.segment, leg.k)      # leg runs on board: nothing to send
+            self.log_tick(TRACK, leg.segment[leg.k][:3])
+            leg.k += 1
+        else:
+            scale = self.step_scale()
+            leg.k += scale
+            x, y, z, velocity = leg.segment.at(leg.k)
+            self.commander.go_to(x, y, z, velocity=velocity * scale)      # same duty cycle, shorter step
+            self.log_tick(CRUISE, (x, y, z))
+        self.pace()
+        return True
+
+    def watch(self, leg):
+        """
+        Per-tick checks before the policy's: battery sample, link health,
+        then (on fresh data) the ranges into the occupancy grid. True when
+        this tick held.
+        """
+        if self.scheduler is not None:
+            self.scheduler.sample(self.get_pos())
+        if self.link_hold(leg):
+            return True
+        self.map_ranges()
+        return False
+
+    def map_ranges(self):
+        """Fuse what the avoidance logic sees this tick into the occupancy grid, at the estimated position."""
+        if self.grid is not None:
+            self.grid.update(self.get_pos(), self.ranges())
+
+    def link_hold(self, leg):
+        """
+        Check the link once per tick; while the sensor data is stale, hover
+        with the leg's clock stopped. Entering the hold sends a go_to to the
+        last estimated position, which also pre-empts an on-board leg or a
+        go_to still in flight; after it nothing is sent until the data is
+        fresh. The leg's trajectory then restarts from where the drone held.
+        True when this tick held.
+        """
+        if self.link is None:
+            return False
+        held = self.link.stale
+        self.link.update()
+        if not self.link.stale:
+            if held:
+                print(f"Link back — resuming (step x{self.link.scale:.2f})")
+                if leg.segment is not None and leg.bypass is None:
+                    self.restart_segment(leg)
+            leg.resume()
+            return False
+        setpoint = None
+        if not held:
+            print(f"Sensor data {self.link.age:.2f} s old — holding position")
+            setpoint = self.get_pos()
+            self.commander.go_to(*setpoint, priority=SAFETY)
+        leg.pause()
+        self.log_tick(HOLD, setpoint)
+        self.pace()
+        return True
+
+    def restart_segment(self, leg):
+        """Rebuild the leg's trajectory from the last setpoint, the hold position (on board: start it there)."""
+        position = self.setpoint()
+        if self.onboard is not None:
+            leg.segment = self.onboard.start(leg.index, position)
+        else:
+            leg.segment = self.trajectory.segment(leg.index, position)
+        leg.k = 0
+
+    # ---- flight ----
+
+    def mark_leg(self, i):
+        if self.telemetry is not None:
+            self.telemetry.leg = i
+
+    def start_leg(self, i):
+        tx, ty, tz, duration = self.waypoints[i]
+        if i < len(self.route):
+            print(f"Waypoint {i+1}/{len(self.route)}: ({tx}, {ty}, {tz})")
+        else:
+            print(f"Returning home: ({tx}, {ty}, {tz})")
+        self.mark_leg(i)
+        segment = None
+        if self.onboard is not None:
+            segment = self.onboard.start(i, self.setpoint())
+        elif self.trajectory is not None:
+            segment = self.trajectory.segment(i, self.setpoint())
+        leg = Leg(i, (tx, ty, tz), duration, segment)
+        self.control_loop.start()
+        print(f">>> Moving to ({tx}, {ty}, {tz}) for {duration}s")
+        return leg
+
+    def end_leg(self):
+        """
+        The leg's last setpoint goes out even when the packet budget held it
+        back (within the leg, the next tick's setpoint replaces it).
+        """
+        if self.dispatcher.pending is not None:
+            time.sleep(self.dispatcher.delay())
+            self.dispatcher.flush()
+
+    def fly_leg(self, i):
+        leg = self.start_leg(i)
+        while leg.bypass is not None or not leg.expired():
+            if not (self.watch(leg) or self.policy.tick(self, leg)):
+                break
+        self.end_leg()
+
+    def _start_sensors(self, scf):
+        s = self.settings
+        if s["range_filter"] is not None:
+            self.range_stream = FilteredRangeStream(**s["range_filter"])
+        elif s["trigger"] == "ttc":
+            self.range_stream = RangeStream()
+        if self.range_stream is not None:
+            self.range_stream.attach(self.multiranger)
+        if s["trigger"] == "ttc":
+            self.reaction = ObstacleReaction(self.range_stream, self.state_estimate, CommandLatency(scf),
+                                             margin=s["safety_margin"], hysteresis=s["hysteresis"])
+        if s["link_health"] is not None:
+            self.link = LinkHealth(**s["link_health"])
+            self.link.attach_link(scf)
+            self.link.attach(self.multiranger)
+            self.link.attach(self.state_estimate)
+        if self.battery is not None:
+            b = s["battery"]
+            leg_time = self.trajectory.leg_duration if self.trajectory is not None else None
+            self.scheduler = BatteryScheduler(self.battery, EnergyModel(**_pick(b, "per_s", "per_m")), self.route,
+                                              self.waypoints[-1], pause_s=s["pause_s"], hover_s=s["hover_s"],
+                                              leg_time=leg_time, **_pick(b, "reserve", "landing_s"))
+        if self.telemetry is not None:
+            self.telemetry.attach(self.multiranger)
+            self.telemetry.attach(self.state_estimate)
+        if s["profile"]:
+            self.profiler = Profiler()
+            self.profiler.instrument(self, "get_pos", "is_close", "map_ranges", "log_tick")
+            self.profiler.instrument(self.commander, "go_to")
+            self.control_loop.profiler = self.profiler
+
+    def _start_route(self, scf):
+        if self.settings["onboard_trajectory"] and self.trajectory is not None:
+            self.onboard = OnboardTrajectory(scf.cf, self.trajectory)
+            self.onboard.upload()
+        self.policy.start_mission(self)
+
+    def _failsafe(self, started):
+        """True once a leg would start later than max_flight_s after take-off."""
+        limit = self.settings["max_flight_s"]
+        return limit is not None and time.time() - started > limit
+
+    def _land_failsafe(self):
+        print("Failsafe: max flight time exceeded — landing.")
+        self.commander.land()
+        raise MissionAborted("max flight time exceeded")
+
+    def _end_route(self):
+        print(self.control_loop.summary())
+        print(self.dispatcher.summary())
+        if self.link is not None:
+            print(self.link.summary())
+        if self.scheduler is not None:
+            print(self.scheduler.summary())
+        if self.profiler is not None:
+            print(self.profiler.summary())
+            self.profiler.dump(self._path("profile_file"))
+
+    def legs(self):
+        """Leg indices in flying order: the route, or what the battery scheduler picks before each leg."""
+        if self.scheduler is None:
+            yield from range(len(self.route))
+            return
+        while (i := self.scheduler.next_leg(self.get_pos())) is not None:
+            yield i
+
+    def _final_hover(self):
+        """Seconds to hover before landing: none when the battery scheduler cut the route or the hover."""
+        if self.scheduler is not None and self.scheduler.cut_short:
+            print("Route cut short by the battery — landing")
+            return 0.0
+        if self.scheduler is not None and not self.scheduler.hover:
+            print("Sequence complete — battery low, landing without hovering")
+            return 0.0
+        print("Sequence complete — hovering...")
+        return self.settings["hover_s"]
+
+    def _fly_route(self, scf):
+        self._start_route(scf)
+        started = time.time()
+        for i in self.legs():
+            if self._failsafe(started):
+                self._land_failsafe()
+            self.fly_leg(i)
+            time.sleep(self.settings["pause_s"])
+        self._end_route()
+
+    def _mission(self, scf):
+        """Everything between take-off and landing."""
+        s = self.settings
+        print("Takeoff...")
+        time.sleep(s["takeoff_s"])
+        self._fly_route(scf)
+        time.sleep(self._final_hover())
+
+    def _dispatch(self, commander):
+        """The command path: the settings' packet budget and deadband in front of the commander."""
+        s = self.settings
+        return CommandDispatcher(commander, s["command_rate_hz"], deadband=s["command_deadband"], send=self._send)
+
+    def _send(self, *args, **kwargs):
+        """Put a go_to on the air: an override from where the on-board leg is, or the commander's."""
+        if self.onboard is not None:
+            self.onboard.go_to(*args, **kwargs)
+        else:
+            self.dispatcher.commander.go_to(*args, **kwargs)
+
+    def fly_link(self, scf):
+        """The flight on an open link: arm, take off, fly the mission, land."""
+        s = self.settings
+        telemetry_file = self._path("telemetry_file")
+        controller = {"controller": PositionHlCommander.CONTROLLER_PID} if s["controller"] == "pid" else {}
+        x0, y0, z0 = self.origin
+        scf.cf.platform.send_arming_request(True)
+        time.sleep(1.0)
+
+        with PositionHlCommander(scf, x=x0, y=y0, z=z0, default_height=s["height"], **controller) as commander:
+            self.commander = self.dispatcher = self._dispatch(commander)
+
+            with Multiranger(scf) as multiranger, StateEstimate(scf) as state_estimate, \
+                    (TelemetryRecorder(telemetry_file) if telemetry_file else
+                     contextlib.nullcontext()) as telemetry, \
+                    (BatteryMonitor(scf, **_pick(s["battery"], "capacity_wh", "resistance", "rate_ms"))
+                     if s["battery"] is not None else contextlib.nullcontext()) as battery:
+                self.multiranger = multiranger
+                self.state_estimate = state_estimate
+                self.telemetry = telemetry
+                self.battery = battery
+                self._start_sensors(scf)
+                self._mission(scf)
+
+                print("Landing...")
+                self.commander.land()
+                time.sleep(3)
+                print("Mission completed successfully")
+
+    def fly(self):
+        logging.basicConfig(level=logging.ERROR)
+        try:
+            cflib.crtp.init_drivers()
+            cf = Crazyflie(rw_cache="./cache")
+
+            with SyncCrazyflie(self.uri, cf=cf) as scf:
+                self.fly_link(scf)
+
+        except MissionAborted as e:
+            print(f"Mission aborted: {e}")      # already landed
+
+        except LinkLost as e:
+            print(f"{e} — landing.")
+            try:
+                self.commander.land()
+            except Exception as land_error:
+                print("Landing failed:", land_error)
+            time.sleep(2)
+
+        except KeyboardInterrupt:
+            print("Manual abort — landing.")
+            try:
+                self.commander.land()
+            except Exception as land_error:
+                print("Landing failed:", land_error)
+            time.sleep(2)
+
+        except Exception as e:
+            print("Unexpected error:", e)
+            try:
+                self.commander.land()
+            except Exception as land_error:
+                print("Landing failed:", land_error)
+            time.sleep(2)
+            print("Drone disarmed safely.")
@@ -0,0 +1,268 @@
+# Avoidance policies: what a mission does on each control tick of a leg
+"""
+The engine owns the link, the sensors, the obstacle trigger, cruising
+along the route and the loop timing; a policy only decides what to do
+when the trigger fires. A new policy subclasses AvoidancePolicy, takes
+its parameters as keyword arguments and is registered in POLICIES, after
+which a mission selects it from the config file:
+
+    "policy": {"name": "bypass", "side": 0.5, "forward": 0.8, "back": 0.5}
+"""
+import time
+
+from flight.bypass import ABORTED, BypassManeuver, step_towards
+from flight.dispatch import SAFETY
+from flight.planner import DStarLite
+from flight.ranger_stream import FRONT, RIGHT
+from flight.telemetry import ABORT, ARRIVED, BYPASS, FRONT_OBSTACLE, HOLD, RIGHT_OBSTACLE
+
+
+class Leg:
+    """One leg of the route being flown: its waypoint and whatever maneuver is running on it."""
+
+    def __init__(self, index, target, duration, segment=None):
+        self.index = index
+        self.target = tuple(target)
+        self.duration = duration
+        self.segment = segment          # precomputed setpoints (cruise "trajectory")
+        self.k = 0                      # setpoints of the segment sent (fractional on a slow link)
+        self.bypass = None
+        self.started = time.time()
+        self.paused = None              # when the mission started holding on a stale link
+
+    def expired(self):
+        return self.paused is None and time.time() - self.started >= self.duration
+
+    def pause(self):
+        """Stop the leg's clock (the mission holds position)."""
+        if self.paused is None:
+            self.paused = time.time()
+
+    def resume(self):
+        if self.paused is not None:
+            self.started += time.time() - self.paused
+            self.paused = None
+
+
+class AvoidancePolicy:
+    """
+    Base class. tick() runs one control tick of a leg and returns False
+    once the leg is over; mission.cruise(leg) is the no-obstacle tick.
+    A policy never sleeps itself: mission.pace() waits for the next tick
+    and mission.hold(seconds) pauses the decision, so the same policy runs
+    on the threaded engine and on the asyncio runtime. Avoidance setpoints
+    go out with priority=SAFETY, ahead of routine cruising (flight/dispatch.py).
+    """
+
+    name = None
+
+    def start_mission(self, mission):
+        pass
+
+    def tick(self, mission, leg):
+        raise NotImplementedError
+
+
+class BypassPolicy(AvoidancePolicy):
+    """
+    Front obstacle: ticked BypassManeuver (sidestep by `side`, `forward`,
+    back by `back`), re-planned further out if it aborts. Right obstacle:
+    shift by `shift` in y, let it settle for `settle_s` while still
+    watching ahead (a front obstacle starts a bypass from there), then end
+    the leg. one_shot: react to one obstacle per mission only, like the
+    old single-obstacle script.
+    """
+
+    name = "bypass"
+
+    def __init__(self, side=-0.5, forward=0.5, back=None, shift=-0.5, settle_s=1.0, one_shot=False):
+        self.side = side
+        self.forward = forward
+        self.back = back
+        self.shift = shift
+        self.settle_s = settle_s
+        self.one_shot = one_shot
+        self.handled = False
+        self.settling = None            # (leg, end time) after a right shift; no end until it is under way
+
+    def start_mission(self, mission):
+        self.handled = False
+        self.settling = None
+
+    def tick(self, mission, leg):
+        if leg.bypass is not None:
+            return self._tick_bypass(mission, leg)
+        if self.settling is not None and self.settling[0] is leg:
+            return self._tick_settle(mission, leg)
+
+        armed = not (self.one_shot and self.handled)
+        if armed and mission.is_close(FRONT):
+            self._start_bypass(mission, leg)
+            return True
+
+        if mission.is_close(RIGHT) and armed:
+            print(f"Obstacle on RIGHT → shift {self.shift:+.1f} m")
+            cx, cy, cz = mission.get_pos()
+            setpoint = (cx, cy + self.shift, cz)
+            mission.commander.go_to(*setpoint, priority=SAFETY)
+            mission.log_tick(RIGHT_OBSTACLE, setpoint)
+            self.settling = (leg, None)
+            mission.pace()
+            return True
+
+        return mission.cruise(leg)
+
+    def _start_bypass(self, mission, leg):
+        mission.log_tick(FRONT_OBSTACLE)
+        print("Obstacle detected in FRONT → executing bypass")
+        leg.bypass = BypassManeuver(mission.get_pos(), self.side, self.forward, back=self.back)
+
+    def _tick_settle(self, mission, leg):
+        """
+        One tick of the settle after a right shift: the shift setpoint
+        stands, the front is still watched. The clock starts once the
+        shift is sent (on the asyncio runtime, after its travel time).
+        """
+        if self.settling[1] is None:
+            self.settling = (leg, time.time() + self.settle_s)
+        if time.time() >= self.settling[1]:
+            self.settling = None
+            return False
+        if not (self.one_shot and self.handled) and mission.is_close(FRONT):
+            self.settling = None
+            self._start_bypass(mission, leg)
+            return True
+        mission.log_tick(HOLD)
+        mission.pace()
+        return True
+
+    def _tick_bypass(self, mission, leg):
+        setpoint = leg.bypass.tick(mission.get_pos(), mission.ranges(), mission.step_scale(),
+                                   mission.range_lead())
+        if setpoint is None:
+            if leg.bypass.state == ABORTED:
+                mission.log_tick(ABORT)
+                print(f"Bypass aborted: {leg.bypass.abort_reason}")
+                leg.bypass = leg.bypass.replan(mission.get_pos())
+                if leg.bypass is not None:
+                    print("Re-planning bypass further out")
+                    return True
+                return False
+            mission.log_tick(ARRIVED)
+            print("Bypass complete")
+            leg.bypass = None
+            self.handled = True
+            return False
+        mission.commander.go_to(*setpoint, priority=SAFETY)
+        mission.log_tick(BYPASS, setpoint)
+        mission.pace()
+        return True
+
+
+class DetourPolicy(AvoidancePolicy):
+    """
+    The first script's reaction: on a front or right obstacle, aim at the
+    waypoint shifted by `shift` in y for `hold_s`, then carry on.
+    """
+
+    name = "detour"
+
+    def __init__(self, shift=-0.5, hold_s=1.0):
+        self.shift = shift
+        self.hold_s = hold_s
+
+    def tick(self, mission, leg):
+        for direction, branch, side in ((FRONT, FRONT_OBSTACLE, "ahead"), (RIGHT, RIGHT_OBSTACLE, "on right")):
+            if mission.is_close(direction):
+                print(f"Obstacle {side} — detouring {self.shift:+.1f} m")
+                tx, ty, tz = leg.target
+                setpoint = (tx, ty + self.shift, tz)
+                mission.commander.go_to(*setpoint, priority=SAFETY)
+                mission.log_tick(branch, setpoint)
+                mission.hold(self.hold_s)
+                return True
+        return mission.cruise(leg)
+
+
+class PlannerPolicy(AvoidancePolicy):
+    """
+    D* Lite (flight/planner.py) over the mission's occupancy grid, from the
+    drone to the leg's waypoint, re-planned on every tick within `budget_s`
+    from the cells the new readings flipped. The leg cruises while the
+    straight line to the waypoint is clear; once the map has something in
+    the way, or the trigger fires, the setpoint steps at most `step` a tick
+    towards the path's next corner until the drone is within `reach` of the
+    waypoint. Obstacles are inflated by `inflation`; the leg ends when no
+    path turns up for `max_blocked` ticks.
+    """
+
+    name = "planner"
+
+    def __init__(self, step=0.05, inflation=0.2, margin=1.0, budget_s=0.004, reach=0.05, max_blocked=40):
+        self.step = step
+        self.inflation = inflation
+        self.margin = margin
+        self.budget_s = budget_s
+        self.reach = reach
+        self.max_blocked = max_blocked
+        self.leg = None
+        self.planner = None
+        self.setpoint = None
+        self.blocked = 0
+
+    def start_mission(self, mission):
+        self.leg = None
+
+    def tick(self, mission, leg):
+        position = mission.get_pos()
+        if leg is not self.leg:
+            self.leg = leg
+            self.planner = DStarLite(mission.grid, position, leg.target, self.inflation, self.margin)
+        self.planner.replan(position, self.budget_s)
+
+        if leg.bypass is None:
+            if self.planner.straight() and not mission.is_close(FRONT):
+                return mission.cruise(leg)
+            mission.log_tick(FRONT_OBSTACLE)
+            print("Obstacle on the way → flying the planned path")
+            leg.bypass = self.planner          # the leg now runs until the waypoint, past its duration
+            self.setpoint = position
+            self.blocked = 0
+
+        if all(abs(c - t) <= self.reach for c, t in zip(position, leg.target)):
+            mission.log_tick(ARRIVED)
+            print("Planned path complete")
+            leg.bypass = None
+            return False
+        point = self.planner.next_point()
+        if point is None:
+            self.blocked += 1
+            if self.blocked > self.max_blocked:
+                mission.log_tick(ABORT)
+                print("No path to the waypoint — giving up the leg")
+                leg.bypass = None
+                return False
+            mission.log_tick(HOLD)
+            mission.pace()
+            return True
+        self.blocked = 0
+        self.setpoint = step_towards(self.setpoint, point, self.step * mission.step_scale())
+        mission.commander.go_to(*self.setpoint, priority=SAFETY)
+        mission.log_tick(BYPASS, self.setpoint)
+        mission.pace()
+        return True
+
+
+POLICIES = {cls.name: cls for cls in (BypassPolicy, DetourPolicy, PlannerPolicy)}
+
+
+def make_policy(params):
+    """Policy instance from a config entry {"name": ..., **parameters}."""
+    params = dict(params)
+    name = params.pop("name")
+    if name not in POLICIES:
+        raise ValueError(f"unknown avoidance policy {name!r} (have {', '.join(sorted(POLICIES))})")
+    try:
+        return POLICIES[name](**params)
+    except TypeError as e:
+        raise ValueError(f"policy {name!r}: {e}") from None
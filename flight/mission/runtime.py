@@ -0,0 +1,339 @@
+# Asyncio mission runtime: sensors, estimator, policy, commands and telemetry as tasks
+"""
+The same missions as engine.Mission, on one asyncio event loop instead of
+one thread that polls, decides, sends and sleeps in turn:
+
+    ranges ──▶ sensors ───┐
+    poses  ──▶ estimator ─┴─▶ policy ──setpoints──▶ commands ──▶ radio
+                                 └────ticks───────▶ telemetry ──▶ TelemetryRecorder
+
+cflib's log callbacks only hand their packet to the loop; filtering the
+ranges and updating the pose happen in the sensors / estimator tasks. The
+policy task ticks at the mission's loop rate and waits only on time (its
+deadline, and a move's travel time as the blocking PositionHlCommander
+would): a setpoint goes into a one-slot channel and the commands task
+passes it through the mission's CommandDispatcher (flight/dispatch.py)
+without blocking the loop (high-level go_to in the radio executor), so
+a radio hiccup leaves the decision running and only the
+newest setpoint goes out once the link is back.
+
+Every channel is bounded and sheds instead of blocking its producer:
+sensor packets and setpoints drop the oldest item, telemetry drops the
+newest. Back-pressure runs from the sinks towards the decision and stops
+there: while the recorder's writer is behind, the telemetry task waits
+and its channel fills up, then ticks are dropped and counted.
+
+    AsyncMission("Waypoint_Avoid06").fly()      # or the setting "runtime": "asyncio"
+
+The simulator runs the loop on its virtual clock (flight/sim.py), so
+`python -m flight.sim` and the Monte Carlo tools fly it as well.
+"""
+import asyncio
+import math
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from flight.dispatch import ROUTINE
+from flight.mission.engine import Mission
+
+# Multiranger reading at decision time, as the telemetry task records it
+RangeSnapshot = namedtuple("RangeSnapshot", "front back left right up down")
+
+
+class Channel:
+    """
+    Bounded queue between tasks of one event loop. A full channel sheds
+    rather than making the producer wait: shed="oldest" keeps the newest
+    items, shed="newest" keeps what is already queued. Drops are counted.
+    """
+
+    def __init__(self, size, shed="oldest"):
+        self.size = size
+        self.shed = shed
+        self._items = deque()
+        self._ready = asyncio.Event()
+        self.dropped = 0
+        self.high_water = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def offer(self, item):
+        """Queue an item without waiting; False when it was shed."""
+        if len(self._items) >= self.size:
+            self.dropped += 1
+            if self.shed == "newest":
+                return False
+            self._items.popleft()
+        self._items.append(item)
+        self.high_water = max(self.high_water, len(self._items))
+        self._ready.set()
+        return True
+
+    async def get(self):
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._items.popleft()
+
+    def take(self):
+        """Oldest item without waiting (the channel must not be empty)."""
+        return self._items.popleft()
+
+
+class CommandSender:
+    """
+    Stands in for the PositionHlCommander while the loop runs. go_to()
+    only queues the setpoint; the commands task sends it with send() as a
+    high-level go_to (`hl`, the Crazyflie's high_level_commander) that
+    does not wait for the drone to get there. The travel time
+    PositionHlCommander would have slept is left in `travel` for the
+    policy task to await, so maneuvers keep their pace while the radio
+    call itself stays off the decision path. height and velocity stand
+    in for the commander's defaults.
+    """
+
+    def __init__(self, commander, hl, state_estimate, channel, height, velocity=0.5):
+        self.commander = commander
+        self.hl = hl
+        self.state_estimate = state_estimate
+        self.channel = channel
+        self.height = height
+        self.velocity = velocity
+        self.target = None          # newest setpoint queued
+        self.last = None            # last setpoint sent
+        self.travel = 0.0           # seconds of flight the queued setpoints take
+        self.sent = 0
+
+    def go_to(self, x, y, z=None, velocity=None, priority=ROUTINE):
+        z = self.height if z is None else z
+        distance = math.dist(self.get_position(), (x, y, z))
+        if distance == 0.0:
+            return
+        self.travel += distance / (velocity or self.velocity)
+        self.target = (x, y, z)
+        self.channel.offer((x, y, z, velocity, priority))
+
+    def get_position(self):
+        return self.target if self.target is not None else self.commander.get_position()
+
+    def send(self, x, y, z, velocity=None):
+        """
+        Runs in the radio executor. The drone's high-level planner starts a
+        go_to from its current setpoint, so the move is timed from the last
+        one sent; the first from the estimated position.
+        """
+        start = self.last or self.state_estimate.position() or self.commander.get_position()
+        distance = math.dist(start, (x, y, z))
+        if distance == 0.0:
+            return
+        self.hl.go_to(x, y, z, 0.0, distance / (velocity or self.velocity))
+        self.last = (x, y, z)
+        self.sent += 1
+
+
+class AsyncMission(Mission):
+    """
+    Mission on the asyncio runtime. Connection, take-off and landing are
+    the engine's; everything in between runs as tasks (see the module
+    docstring). Channel sizes: `sensor_queue` packets per log block,
+    `telemetry_queue` ticks.
+    """
+
+    sensor_queue = 16
+    telemetry_queue = 256
+
+    def __init__(self, name, overrides=None, config=None, origin=(0.0, 0.0, 0.0)):
+        super().__init__(name, overrides, config, origin)
+        self.channels = {}
+        self.sender = None
+        self._pace = False
+        self._hold = 0.0
+
+    # ---- what the policy sees ----
+
+    def pace(self):
+        self._pace = True
+
+    def hold(self, seconds):
+        self._hold += seconds
+
+    def mark_leg(self, i):
+        """Record the queued ticks of the last leg, then the marker (replay aligns on it right away)."""
+        if self.telemetry is not None:
+            self._drain()
+            self.telemetry.start_leg(i)
+
+    def log_tick(self, branch, setpoint=None):
+        if self.telemetry is not None:
+            m = self.multiranger
+            ranges = RangeSnapshot(m.front, m.back, m.left, m.right, m.up, m.down)
+            velocity = self.state_estimate.velocity() if self.state_estimate is not None else None
+            self.channels["telemetry"].offer((branch, time.monotonic(), self.get_pos(), ranges, setpoint, velocity))
+
+    # ---- tasks ----
+
+    def _route(self, loop, source, handler, channel):
+        """
+        Deliver a log block's packets to `handler` in a task instead of on
+        the link thread; returns the function that puts `handler` back.
+        """
+        loop_thread = threading.get_ident()
+
+        def received(timestamp, data, logconf):
+            if threading.get_ident() == loop_thread:
+                channel.offer((timestamp, data, logconf))       # simulator / replay: already on the loop
+            else:
+                loop.call_soon_threadsafe(channel.offer, (timestamp, data, logconf))
+
+        callbacks = source._log_config.data_received_cb
+        callbacks.remove_callback(handler)
+        callbacks.add_callback(received)
+
+        def restore():
+            callbacks.remove_callback(received)
+            callbacks.add_callback(handler)
+        return restore
+
+    async def _ingest(self, channel, handler):
+        """sensors / estimator: apply each packet (range filter, pose double buffer)."""
+        while True:
+            handler(*await channel.get())
+
+    async def _commands(self, radio):
+        """Setpoints through the dispatcher; one held back by the packet budget goes out unless a newer one came."""
+        loop = asyncio.get_running_loop()
+        channel, dispatcher = self.channels["setpoints"], self.dispatcher
+        while True:
+            setpoint = await channel.get()
+            await loop.run_in_executor(radio, dispatcher.go_to, *setpoint)
+            while dispatcher.pending is not None and not len(channel):
+                await asyncio.sleep(dispatcher.delay())
+                if not len(channel):
+                    await loop.run_in_executor(radio, dispatcher.flush)
+
+    async def _telemetry(self):
+        recorder = self.telemetry
+        channel = self.channels["telemetry"]
+        while True:
+            while recorder.backlog >= recorder.max_pending // 2:
+                await asyncio.sleep(recorder.flush_interval)    # writer behind: let the channel take the slack
+            self._record(*await channel.get())
+
+    def _record(self, branch, t, *tick):
+        self.telemetry.record(branch, *tick, t=t)
+
+    def _drain(self):
+        channel = self.channels["telemetry"]
+        while len(channel):
+            self._record(*channel.take())
+
+    async def _fly_leg(self, i):
+        leg = self.start_leg(i)
+        await asyncio.sleep(0)      # packets the leg start delivered (replay alignment) reach the sensors first
+        while leg.bypass is not None or not leg.expired():
+            self._pace, self._hold = False, 0.0
+            going = self.watch(leg) or self.policy.tick(self, leg)
+            if self.sender.travel:
+                await self._travel()
+            if self._hold:
+                await asyncio.sleep(self._hold)
+            if not going:
+                return
+            if self._pace:
+                await self.control_loop.wait_async()
+
+    async def _travel(self):
+        """Wait out the queued moves, as PositionHlCommander.go_to would have."""
+        started = time.perf_counter_ns()
+        await asyncio.sleep(self.sender.travel)
+        self.sender.travel = 0.0
+        if self.profiler is not None:
+            self.profiler.record("travel", time.perf_counter_ns() - started)
+
+    def _end_route(self):
+        shed = self.channels["setpoints"].dropped      # coalesced in the channel, before the dispatcher saw them
+        self.dispatcher.requested += shed
+        self.dispatcher.coalesced += shed
+        super()._end_route()
+
+    async def _decide(self, scf):
+        """The policy task: take-off hold, every leg, hover. True when the failsafe cut the route short."""
+        s = self.settings
+        print("Takeoff...")
+        await asyncio.sleep(s["takeoff_s"])
+        self._start_route(scf)
+        started = time.time()
+        for i in self.legs():
+            if self._failsafe(started):
+                return True
+            await self._fly_leg(i)
+            await asyncio.sleep(s["pause_s"])
+        self._end_route()
+        await asyncio.sleep(self._final_hover())
+        return False
+
+    async def _run(self, scf, radio):
+        loop = asyncio.get_running_loop()
+        self.channels = {
+            "ranges": Channel(self.sensor_queue),
+            "poses": Channel(self.sensor_queue),
+            "setpoints": Channel(1),
+            "telemetry": Channel(self.telemetry_queue, shed="newest"),
+        }
+        self.sender.channel = self.channels["setpoints"]
+        tasks, restores = [], []
+        try:
+            async with asyncio.TaskGroup() as group:
+                if self.range_stream is not None:
+                    restores.append(self._route(loop, self.multiranger, self.range_stream._on_log,
+                                                self.channels["ranges"]))
+                    tasks.append(group.create_task(self._ingest(self.channels["ranges"], self.range_stream._on_log),
+                                                   name="sensors"))
+                restores.append(self._route(loop, self.state_estimate, self.state_estimate._data_received,
+                                            self.channels["poses"]))
+                tasks.append(group.create_task(self._ingest(self.channels["poses"], self.state_estimate._data_received),
+                                               name="estimator"))
+                tasks.append(group.create_task(self._commands(radio), name="commands"))
+                if self.telemetry is not None:
+                    tasks.append(group.create_task(self._telemetry(), name="telemetry"))
+                try:
+                    cut_short = await self._decide(scf)
+                    await asyncio.sleep(0)      # let the last setpoint and ticks through
+                finally:
+                    for task in tasks:
+                        task.cancel()
+        finally:
+            for restore in restores:
+                restore()                       # landing runs on the link thread again
+        if self.telemetry is not None:
+            self._drain()
+        print(self.channel_summary())
+        return cut_short
+
+    def _mission(self, scf):
+        dispatcher = self.dispatcher
+        send = dispatcher.send
+        self.sender = CommandSender(dispatcher.commander, scf.cf.high_level_commander, self.state_estimate, None,
+                                    self.settings["height"])
+        if self.profiler is not None:
+            self.profiler.instrument(self.sender, "go_to", "send")
+        dispatcher.send = self.sender.send          # the dispatcher now sends without blocking
+        self.commander = self.sender
+        try:
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="radio") as radio:
+                cut_short = asyncio.run(self._run(scf, radio))
+        except ExceptionGroup as errors:
+            raise errors.exceptions[0] from None        # what failed, not the task group
+        finally:
+            self.commander = dispatcher
+            dispatcher.send = send
+        if cut_short:
+            self._land_failsafe()
+
+    def channel_summary(self):
+        """High-water mark and drops per channel."""
+        return "Channels: " + ", ".join(f"{name} {c.high_water}/{c.size} (dropped {c.dropped})"
+                                        for name, c in self.channels.items())
@@ -0,0 +1,229 @@
+# Process-pool Monte Carlo runner for avoidance policy evaluation
+"""
+Fly Waypoint_Avoid scripts in the simulator over many seeded scenarios,
+spread across all cores.
+
+Each seed fixes an obstacle layout, a range-noise level and a radio
+latency, so every script sees the same scenarios. Per-run results are
+appended to a JSON-lines file as chunks finish; the summary gives the
+collision rate (Wilson 95% interval) and time-to-complete (95% interval
+of the mean) per script.
+
+    python -m flight.monte_carlo Waypoint_Avoid07.py Waypoint_Avoid09.py --runs 100000
+"""
+import argparse
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from flight.sim import World, box, run_script
+
+# Waypoints of the scripts' newsequence, kept clear of obstacles
+ROUTE_XY = [(0.0, 0.0), (1.0, 0.0), (1.0, -0.4), (0.0, -0.4), (-1.0, -0.4), (-1.0, 0.0)]
+
+SCENARIO = {
+    "boxes": (1, 3),            # obstacles per layout
+    "size": (0.1, 0.4),         # obstacle footprint side (m)
+    "area": ((-1.4, 1.4), (-0.9, 0.5)),
+    "keep_out": 0.3,            # free margin around every waypoint (m)
+    "noise": (0.0, 0.03),       # range noise std-dev (m)
+    "latency": (0.0, 0.05),     # radio latency (s)
+    "latency_jitter": 0.02,     # extra uniform latency (s)
+    "outliers": (0.0, 0.0),     # probability of a spurious short range reading
+    "dropouts": (0.0, 0.0),     # probability of a missing range reading
+    "loss": (0.0, 0.0),         # probability of a lost log packet
+    "outages": 0.0,             # radio outages per second (0.5 s on average)
+    "charge": (1.0, 1.0),       # battery charge at take-off (0 .. 1)
+    "dt": 0.01,                 # physics step (s)
+}
+
+Z95 = 1.959964
+
+
+def faulty(scenario, outliers=0.0, dropouts=0.0, loss=0.0, outages=0.0, charge=1.0):
+    """
+    Scenario with fixed range outlier, dropout and packet loss probabilities,
+    an outage rate and a battery charge.
+    """
+    return {**scenario, "outliers": (outliers, outliers), "dropouts": (dropouts, dropouts),
+            "loss": (loss, loss), "outages": outages, "charge": (charge, charge)}
+
+
+def make_world(seed, scenario=SCENARIO):
+    """Seeded world: obstacle layout, sensor noise and radio latency."""
+    rng = random.Random(seed)
+    obstacles = []
+    for _ in range(rng.randint(*scenario["boxes"])):
+        for _attempt in range(20):
+            sx, sy = rng.uniform(*scenario["size"]), rng.uniform(*scenario["size"])
+            cx, cy = rng.uniform(*scenario["area"][0]), rng.uniform(*scenario["area"][1])
+            if all(abs(cx - wx) - sx / 2 > scenario["keep_out"] or abs(cy - wy) - sy / 2 > scenario["keep_out"]
+                   for wx, wy in ROUTE_XY):
+                obstacles.append(box(cx, cy, sx, sy))
+                break
+    return World(obstacles, dt=scenario["dt"],
+                 range_noise=rng.uniform(*scenario["noise"]),
+                 latency=rng.uniform(*scenario["latency"]),
+                 latency_jitter=scenario["latency_jitter"], seed=seed,
+                 range_outliers=rng.uniform(*scenario.get("outliers", (0.0, 0.0))),
+                 range_dropouts=rng.uniform(*scenario.get("dropouts", (0.0, 0.0))),
+                 packet_loss=rng.uniform(*scenario.get("loss", (0.0, 0.0))),
+                 outage_rate=scenario.get("outages", 0.0),
+                 charge=rng.uniform(*scenario.get("charge", (1.0, 1.0))))
+
+
+def run_one(script, seed, scenario=SCENARIO, overrides=None):
+    """One seeded flight; overrides: {setting: value} for the script's module-level settings."""
+    world = make_world(seed, scenario)
+    report = run_script(script, world, overrides=overrides)
+    return {
+        "script": os.path.basename(script),
+        "seed": seed,
+        "collided": report["collisions"] > 0,
+        "collisions": report["collisions"],
+        "min_clearance": report["min_clearance"],
+        "sim_time": report["sim_time"],
+        "completed": "Sequence complete" in report["output"],
+        "reactions": report["output"].count("Obstacle "),
+        "brownout": report["brownout"] is not None,
+        "distance": report["distance"],
+        "noise": world.range_noise,
+        "latency": world.latency,
+        "obstacles": len(world.obstacles),
+    }
+
+
+def run_chunk(script, seeds, scenario=SCENARIO, overrides=None):
+    return [run_one(script, seed, scenario, overrides) for seed in seeds]
+
+
+# ------------------------------
+# Aggregation
+# ------------------------------
+
+def wilson(successes, n, z=Z95):
+    """Wilson score interval for a proportion."""
+    if n == 0:
+        return 0.0, 1.0
+    p = successes / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+class Summary:
+    """Streaming per-script statistics."""
+
+    def __init__(self):
+        self.n = 0
+        self.collided = 0
+        self.completed = 0
+        self.reactions = 0
+        self.brownouts = 0
+        self.t_sum = 0.0
+        self.t_sq = 0.0
+        self.min_clearance = math.inf
+
+    def add(self, result):
+        self.n += 1
+        self.collided += result["collided"]
+        self.completed += result["completed"]
+        self.reactions += result.get("reactions", 0)
+        self.brownouts += result.get("brownout", False)
+        self.t_sum += result["sim_time"]
+        self.t_sq += result["sim_time"] ** 2
+        self.min_clearance = min(self.min_clearance, result["min_clearance"])
+
+    def report(self):
+        mean = self.t_sum / self.n if self.n else 0.0
+        var = max(0.0, self.t_sq / self.n - mean * mean) * self.n / (self.n - 1) if self.n > 1 else 0.0
+        half = Z95 * math.sqrt(var / self.n) if self.n else 0.0
+        lo, hi = wilson(self.collided, self.n)
+        return {
+            "runs": self.n,
+            "collision_rate": self.collided / self.n if self.n else 0.0,
+            "collision_ci95": (lo, hi),
+            "completion_rate": self.completed / self.n if self.n else 0.0,
+            "reactions_mean": self.reactions / self.n if self.n else 0.0,
+            "brownouts": self.brownouts,
+            "time_mean": mean,
+            "time_ci95": (mean - half, mean + half),
+            "min_clearance": self.min_clearance,
+        }
+
+
+def summarize(path):
+    """Re-aggregate a results file written by run()."""
+    summaries = {}
+    with open(path) as f:
+        for line in f:
+            result = json.loads(line)
+            summaries.setdefault(result["script"], Summary()).add(result)
+    return {script: s.report() for script, s in summaries.items()}
+
+
+def run(scripts, runs, seed=0, workers=None, chunk=50, out="monte_carlo.jsonl", scenario=SCENARIO,
+        progress=None):
+    """
+    Fly every script on seeds seed .. seed + runs - 1 in a process pool,
+    streaming results to `out`. Returns {script: summary}.
+    """
+    summaries = {os.path.basename(s): Summary() for s in scripts}
+    with ProcessPoolExecutor(max_workers=workers) as pool, open(out, "w") as f:
+        futures = [pool.submit(run_chunk, script, range(start, min(start + chunk, seed + runs)), scenario)
+                   for script in scripts
+                   for start in range(seed, seed + runs, chunk)]
+        done = 0
+        for future in as_completed(futures):
+            for result in future.result():
+                f.write(json.dumps(result) + "\n")
+                summaries[result["script"]].add(result)
+            f.flush()
+            done += 1
+            if progress is not None:
+                progress(done, len(futures))
+    return {script: s.report() for script, s in summaries.items()}
+
+
+def format_report(name, r):
+    lo, hi = r["collision_ci95"]
+    tlo, thi = r["time_ci95"]
+    return (f"{name}: {r['runs']} runs, collision {r['collision_rate']:.3%} [{lo:.3%}, {hi:.3%}], "
+            f"completed {r['completion_rate']:.1%}, time {r['time_mean']:.2f}s [{tlo:.2f}, {thi:.2f}], "
+            f"min clearance {r['min_clearance']:.3f} m, {r['reactions_mean']:.2f} reactions/run"
+            + (f", {r['brownouts']} brownouts" if r.get("brownouts") else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo evaluation of Waypoint_Avoid scripts")
+    parser.add_argument("scripts", nargs="+")
+    parser.add_argument("--runs", type=int, default=1000, help="scenarios per script")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk", type=int, default=50, help="runs per worker task")
+    parser.add_argument("--out", default="monte_carlo.jsonl")
+    parser.add_argument("--outliers", type=float, default=0.0, help="probability of a spurious short range")
+    parser.add_argument("--dropouts", type=float, default=0.0, help="probability of a missing range")
+    parser.add_argument("--loss", type=float, default=0.0, help="probability of a lost log packet")
+    parser.add_argument("--outages", type=float, default=0.0, help="radio outages per second (0.5 s on average)")
+    parser.add_argument("--charge", type=float, default=1.0, help="battery charge at take-off (0 .. 1)")
+    args = parser.parse_args()
+    scenario = faulty(SCENARIO, args.outliers, args.dropouts, args.loss, args.outages, args.charge)
+
+    started = time.perf_counter()
+
+    def progress(done, total):
+        print(f"\r{done}/{total} chunks", end="", flush=True)
+
+    results = run(args.scripts, args.runs, args.seed, args.workers, args.chunk, args.out, scenario, progress)
+    print(f"\nFinished in {time.perf_counter() - started:.1f}s, results in {args.out}")
+    for script, r in results.items():
+        print(format_report(script, r))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# Incremental log-odds occupancy grid from Multiranger readings
+"""
+Fuse every Multiranger ray with the drone pose into a 2D or 3D occupancy grid.
+
+Cells are stored in fixed-size NumPy tiles that are created on first touch,
+so memory follows the explored area and an update only visits the cells on
+each ray (a Bresenham-style line traversal). The cost of one reading
+depends on the ray length, never on how large the map has grown, which
+keeps it cheap enough to call on every sensor sample:
+
+    grid = OccupancyGrid(resolution=0.05)
+    grid.update(get_pos(commander), multiranger)
+    if grid.is_occupied_at((x, y, z)): ...
+"""
+import math
+
+import numpy as np
+
+# Multiranger ray directions in the body frame (x forward, y left, z up)
+RAYS = {
+    "front": (1.0, 0.0, 0.0),
+    "back": (-1.0, 0.0, 0.0),
+    "left": (0.0, 1.0, 0.0),
+    "right": (0.0, -1.0, 0.0),
+    "up": (0.0, 0.0, 1.0),
+    "down": (0.0, 0.0, -1.0),
+}
+PLANAR_RAYS = ("front", "back", "left", "right")
+
+
+def line_cells(start, end):
+    """
+    Integer cells from start to end (inclusive), one per step along the
+    dominant axis, as an (n, dims) array. Same cells as N-D Bresenham.
+    """
+    start = np.asarray(start, np.int64)
+    delta = np.asarray(end, np.int64) - start
+    n = int(np.abs(delta).max())
+    if n == 0:
+        return start[None, :]
+    k = np.arange(n + 1)[:, None]
+    return start + np.floor(k * delta / n + 0.5).astype(np.int64)
+
+
+class OccupancyGrid:
+    """
+    Sparse log-odds grid. dims=2 maps the horizontal plane (up/down rays are
+    ignored); dims=3 keeps height too.
+    """
+
+    def __init__(self, resolution=0.05, dims=2, tile=16, max_range=4.0,
+                 l_occ=0.85, l_free=-0.4, l_min=-2.0, l_max=3.5):
+        if dims not in (2, 3):
+            raise ValueError("dims must be 2 or 3")
+        self.resolution = resolution
+        self.dims = dims
+        self.tile = tile
+        self.max_range = max_range
+        self.l_occ = l_occ
+        self.l_free = l_free
+        self.l_min = l_min
+        self.l_max = l_max
+        self.tiles = {}
+        self.version = 0                # bumped on every update (for planners)
+        self.changed = set()            # cells whose occupancy flipped since last drain
+
+    # ---- coordinates ----
+
+    def cell(self, point):
+        return tuple(int(math.floor(c / self.resolution)) for c in point[:self.dims])
+
+    def center(self, cell):
+        return tuple((c + 0.5) * self.resolution for c in cell)
+
+    def _tile(self, key):
+        arr = self.tiles.get(key)
+        if arr is None:
+            arr = np.zeros((self.tile,) * self.dims, np.float32)
+            self.tiles[key] = arr
+        return arr
+
+    # ---- updates ----
+
+    def _apply(self, cells, value):
+        """Add `value` once to the log-odds of each cell in (n, dims), tile by tile."""
+        keys = cells // self.tile
+        order = np.lexsort(keys.T[::-1])
+        cells, keys = cells[order], keys[order]
+        local = cells - keys * self.tile
+        bounds = [0, *(np.flatnonzero((keys[1:] != keys[:-1]).any(axis=1)) + 1).tolist(), len(cells)]
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            sel = slice(lo, hi)
+            key = tuple(keys[lo].tolist())
+            arr = self._tile(key)
+            idx = tuple(local[sel].T)
+            old = arr[idx]
+            new = np.minimum(np.maximum(old + value, self.l_min), self.l_max)
+            arr[idx] = new
+            flipped = (old > 0.0) != (new > 0.0)
+            if flipped.any():
+                self.changed.update(map(tuple, cells[sel][flipped].tolist()))
+
+    def _ray(self, origin, direction, distance):
+        """
+        Cells of one range reading: (cells it passed through, the cell it
+        hit or None). distance None means nothing within max_range.
+        """
+        hit = distance is not None and distance < self.max_range
+        length = distance if hit else self.max_range
+        o = np.asarray(origin[:self.dims], float)
+        d = np.asarray(direction[:self.dims], float)
+        cells = line_cells(self.cell(o), self.cell(o + d * length))
+        if hit:
+            return cells[:-1], cells[-1:]
+        return cells, None
+
+    def _integrate(self, free, hits):
+        if len(free):
+            self._apply(free, self.l_free)
+        if len(hits):
+            self._apply(hits, self.l_occ)
+        self.version += 1
+
+    def update_ray(self, origin, direction, distance):
+        """
+        Integrate one range reading. distance None means nothing within
+        max_range: the whole ray is marked free.
+        """
+        free, hit = self._ray(origin, direction, distance)
+        self._integrate(free, hit if hit is not None else free[:0])
+
+    def update(self, pose, ranges, yaw=0.0):
+        """
+        Integrate all Multiranger directions for one pose. pose is (x, y, z);
+        ranges is anything with front/back/left/right/up attributes (a
+        Multiranger or a RangeSample). yaw in radians rotates the body rays.
+        All rays go in as one batch; a cell several rays cross (the drone's
+        own) counts once, since every copy reads the same old value.
+        """
+        c, s = math.cos(yaw), math.sin(yaw)
+        names = PLANAR_RAYS if self.dims == 2 else tuple(RAYS)
+        free, hits = [], []
+        for name in names:
+            if not hasattr(ranges, name):
+                continue
+            bx, by, bz = RAYS[name]
+            direction = (c * bx - s * by, s * bx + c * by, bz)
+            passed, hit = self._ray(pose, direction, getattr(ranges, name))
+            free.append(passed)
+            if hit is not None:
+                hits.append(hit)
+        if not free:
+            return
+        self._integrate(np.concatenate(free), np.concatenate(hits) if hits else free[0][:0])
+
+    def drain_changes(self):
+        """Cells whose occupied/free state flipped since the last call."""
+        changed, self.changed = self.changed, set()
+        return changed
+
+    # ---- queries ----
+
+    def log_odds(self, cell):
+        key = tuple(c // self.tile for c in cell)
+        arr = self.tiles.get(key)
+        if arr is None:
+            return 0.0
+        return float(arr[tuple(c - k * self.tile for c, k in zip(cell, key))])
+
+    def probability(self, cell):
+        return 1.0 / (1.0 + math.exp(-self.log_odds(cell)))
+
+    def is_occupied(self, cell):
+        return self.log_odds(cell) > 0.0
+
+    def is_occupied_at(self, point):
+        return self.is_occupied(self.cell(point))
+
+    def occupied_cells(self):
+        """All cells currently believed occupied."""
+        for key, arr in self.tiles.items():
+            base = np.asarray(key) * self.tile
+            for local in np.argwhere(arr > 0.0):
+                yield tuple((local + base).tolist())
+
+    def memory_bytes(self):
+        return sum(arr.nbytes for arr in self.tiles.values())
@@ -0,0 +1,243 @@
+# Incremental grid path planner (D* Lite) over the occupancy grid
+"""
+Re-plan from the drone to the next waypoint around whatever the occupancy
+grid has seen so far.
+
+D* Lite searches backwards from the goal and keeps its search tree between
+calls. When new cells turn occupied, only the vertices whose edge costs
+actually changed are re-opened, so a re-plan costs roughly the size of the
+affected region, not of the whole grid. compute() takes a time budget and
+resumes where it stopped on the next tick, so it always fits inside one
+control period:
+
+    planner = DStarLite(grid, get_pos(commander), (tx, ty, tz))
+    # every tick
+    planner.replan(get_pos(commander), budget_s=0.004)
+    nxt = planner.next_point()
+"""
+import heapq
+import math
+import time
+
+from flight.occupancy import line_cells
+
+INF = math.inf
+SQRT2 = math.sqrt(2.0)
+NEIGHBOURS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+
+
+class DStarLite:
+    """
+    8-connected D* Lite on a 2D OccupancyGrid (a 3D grid is sliced at height z).
+
+    Cells within `inflation` metres of an occupied cell are blocked, unknown
+    cells are treated as free, diagonal moves may not cut blocked corners,
+    and the search is confined to the start/goal bounding box plus `margin`.
+    """
+
+    def __init__(self, grid, start, goal, inflation=0.15, margin=1.0, clock=time.perf_counter):
+        self.grid = grid
+        self.z = start[2] if len(start) > 2 else 0.0
+        self._zcell = grid.cell((0.0, 0.0, self.z))[2] if grid.dims == 3 else None
+        self._clock = clock
+        r = int(math.ceil(inflation / grid.resolution))
+        self._offsets = [(i, j) for i in range(-r, r + 1) for j in range(-r, r + 1)
+                         if (i * i + j * j) * grid.resolution ** 2 <= inflation ** 2 + 1e-12]
+        self.start = self._cell(start)
+        self.goal = self._cell(goal)
+        self.goal_point = tuple(goal)
+        m = int(math.ceil(margin / grid.resolution))
+        self._window = (min(self.start[0], self.goal[0]) - m, min(self.start[1], self.goal[1]) - m,
+                        max(self.start[0], self.goal[0]) + m, max(self.start[1], self.goal[1]) + m)
+        self._occ = {}
+        self._blocked = {}
+        self.g = {}
+        self.rhs = {self.goal: 0.0}
+        self.km = 0.0
+        self._open = {}
+        self._heap = []
+        self._last = self.start
+        self.expansions = 0
+        self._push(self.goal, (self._h(self.start, self.goal), 0.0))
+        grid.drain_changes()        # everything seen so far is already in _blocked lazily
+
+    # ---- grid ----
+
+    def _cell(self, point):
+        return self.grid.cell(point[:2] if self.grid.dims == 2 else (point[0], point[1], self.z))[:2]
+
+    def _occupied(self, x, y):
+        occ = self._occ.get((x, y))
+        if occ is None:
+            occ = self.grid.is_occupied((x, y) if self._zcell is None else (x, y, self._zcell))
+            self._occ[(x, y)] = occ
+        return occ
+
+    def blocked(self, cell):
+        b = self._blocked.get(cell)
+        if b is None:
+            x0, y0, x1, y1 = self._window
+            x, y = cell
+            b = not (x0 <= x <= x1 and y0 <= y <= y1) or \
+                any(self._occupied(x + i, y + j) for i, j in self._offsets)
+            self._blocked[cell] = b
+        return b
+
+    def cost(self, u, v):
+        if self.blocked(u) or self.blocked(v):
+            return INF
+        dx, dy = v[0] - u[0], v[1] - u[1]
+        if dx and dy:
+            if self.blocked((u[0] + dx, u[1])) or self.blocked((u[0], u[1] + dy)):
+                return INF
+            return SQRT2
+        return 1.0
+
+    @staticmethod
+    def _h(a, b):
+        dx, dy = abs(a[0] - b[0]), abs(a[1] - b[1])
+        return max(dx, dy) + (SQRT2 - 1.0) * min(dx, dy)
+
+    # ---- priority queue (lazy deletion) ----
+
+    def _key(self, s):
+        m = min(self.g.get(s, INF), self.rhs.get(s, INF))
+        return (m + self._h(self.start, s) + self.km, m)
+
+    def _push(self, s, key):
+        self._open[s] = key
+        heapq.heappush(self._heap, (key, s))
+
+    def _top_key(self):
+        heap = self._heap
+        while heap and self._open.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else (INF, INF)
+
+    def _update_vertex(self, u):
+        if u != self.goal:
+            best = INF
+            for dx, dy in NEIGHBOURS:
+                s = (u[0] + dx, u[1] + dy)
+                c = self.cost(u, s)
+                if c < INF:
+                    best = min(best, c + self.g.get(s, INF))
+            self.rhs[u] = best
+        self._open.pop(u, None)
+        if self.g.get(u, INF) != self.rhs.get(u, INF):
+            self._push(u, self._key(u))
+
+    # ---- planning ----
+
+    def compute(self, budget_s=None, max_expansions=None):
+        """
+        Expand until the start is consistent. Returns False when the budget
+        ran out first; calling again resumes the same search.
+        """
+        deadline = None if budget_s is None else self._clock() + budget_s
+        expanded = 0
+        while True:
+            top = self._top_key()
+            start_key = self._key(self.start)
+            if not (top < start_key or self.rhs.get(self.start, INF) > self.g.get(self.start, INF)):
+                return True
+            if top == (INF, INF):
+                return True         # queue exhausted: no path
+            if max_expansions is not None and expanded >= max_expansions:
+                return False
+            if deadline is not None and (expanded & 15) == 0 and self._clock() > deadline:
+                return False
+
+            k_old, u = heapq.heappop(self._heap)
+            del self._open[u]
+            expanded += 1
+            self.expansions += 1
+            k_new = self._key(u)
+            g_u, rhs_u = self.g.get(u, INF), self.rhs.get(u, INF)
+            if k_old < k_new:
+                self._push(u, k_new)
+            elif g_u > rhs_u:
+                self.g[u] = rhs_u
+                for dx, dy in NEIGHBOURS:
+                    self._update_vertex((u[0] + dx, u[1] + dy))
+            else:
+                self.g[u] = INF
+                self._update_vertex(u)
+                for dx, dy in NEIGHBOURS:
+                    self._update_vertex((u[0] + dx, u[1] + dy))
+
+    def update_start(self, point):
+        cell = self._cell(point)
+        if cell != self.start:
+            self.km += self._h(self._last, cell)
+            self._last = cell
+            self.start = cell
+
+    def update_cells(self, cells):
+        """Re-open the vertices whose edge costs changed because `cells` flipped occupancy."""
+        for c in cells:
+            self._occ.pop(c, None)
+        affected = {(c[0] + i, c[1] + j) for c in cells for i, j in self._offsets}
+        flipped = []
+        for cell in affected:
+            old = self._blocked.pop(cell, None)
+            if old is not None and old != self.blocked(cell):
+                flipped.append(cell)
+        touched = {(c[0] + dx, c[1] + dy) for c in flipped for dx, dy in NEIGHBOURS}
+        touched.update(flipped)
+        for u in touched:
+            self._update_vertex(u)
+        return len(flipped)
+
+    def replan(self, position, budget_s=None):
+        """Per-tick entry point: new start, fresh map changes, bounded search."""
+        self.update_start(position)
+        changes = self.grid.drain_changes()
+        if changes:
+            self.update_cells([c[:2] for c in changes if self._zcell is None or c[2] == self._zcell])
+        return self.compute(budget_s)
+
+    # ---- results ----
+
+    def straight(self):
+        """True when the straight line from the start to the goal crosses no blocked cell."""
+        return not any(self.blocked(tuple(c)) for c in line_cells(self.start, self.goal).tolist())
+
+    def has_path(self):
+        return self.g.get(self.start, INF) < INF or self.rhs.get(self.start, INF) < INF
+
+    def path(self, limit=10000):
+        """Cells from start to goal following the current g-values ([] when blocked)."""
+        if not self.has_path():
+            return []
+        cell, out = self.start, [self.start]
+        while cell != self.goal and len(out) < limit:
+            best, nxt = INF, None
+            for dx, dy in NEIGHBOURS:
+                s = (cell[0] + dx, cell[1] + dy)
+                c = self.cost(cell, s)
+                if c < INF and c + self.g.get(s, INF) < best:
+                    best, nxt = c + self.g.get(s, INF), s
+            if nxt is None:
+                return []
+            cell = nxt
+            out.append(cell)
+        return out
+
+    def waypoints(self):
+        """Path as world points with straight runs merged; ends on the exact goal."""
+        cells = self.path()
+        if not cells:
+            return []
+        points = []
+        for a, b, c in zip(cells, cells[1:], cells[2:]):
+            if (b[0] - a[0], b[1] - a[1]) != (c[0] - b[0], c[1] - b[1]):
+                x, y = self.grid.center(b)[:2]
+                points.append((x, y, self.z))
+        points.append(self.goal_point)
+        return points
+
+    def next_point(self):
+        """First corner of the current path (the goal when the way is straight), None when blocked."""
+        points = self.waypoints()
+        return points[0] if points else None
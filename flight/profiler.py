@@ -0,0 +1,226 @@
+# Nanosecond stage timers for the avoidance loop, aggregated in HDR-style histograms
+"""
+Where a loop iteration's time actually goes: sensor reads, get_pos,
+is_close, go_to dispatch, sleeping.
+
+Each stage is a function wrapped with a perf_counter_ns timer. The sample
+lands in a log-linear histogram (HDR style: 32 linear sub-buckets per
+power of two, so ~3% value precision over ns..minutes in about a thousand
+counters), so recording is O(1) with no allocation and no sample list to
+sort. A disabled profiler hands the original function back, which costs
+nothing at all:
+
+    profiler = Profiler(enabled=settings["profile"])
+    profiler.instrument(globals(), "get_pos", "is_close")
+    profiler.instrument(commander, "go_to")
+    control_loop.profiler = profiler        # work vs sleep per tick
+    ...
+    print(profiler.summary())
+    profiler.dump("flight.profile.json")
+
+From the shell (a saved flight, or the timer overhead on this machine):
+
+    python -m flight.profiler Waypoint_Avoid06.profile.json
+    python -m flight.profiler --overhead
+
+In the simulator perf_counter_ns is the virtual clock, so code costs no
+time there and only sleeps and simulated waits show up.
+"""
+import argparse
+import functools
+import json
+import time
+
+SUB_BITS = 5
+_SUB = 1 << SUB_BITS            # linear sub-buckets per power of two
+_LINEAR = 2 * _SUB              # values below this get one bucket each
+MAX_SHIFT = 40                  # up to ~2**46 ns (about 19 hours)
+
+
+def bucket(value):
+    """Histogram bucket of a non-negative integer."""
+    if value < _LINEAR:
+        return value
+    shift = value.bit_length() - SUB_BITS - 1
+    return _SUB * shift + (value >> shift)
+
+
+def bucket_value(index):
+    """Largest value that falls in a bucket (what percentiles report)."""
+    if index < _LINEAR:
+        return index
+    shift = index // _SUB - 1
+    return ((index - _SUB * shift + 1) << shift) - 1
+
+
+class Histogram:
+    """Log-linear histogram of integer samples (ns); count, total, min and max are exact."""
+
+    def __init__(self):
+        self.counts = [0] * (_SUB * (MAX_SHIFT + 2))
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, value):
+        value = max(int(value), 0)
+        index = bucket(value)
+        if index >= len(self.counts):
+            index = len(self.counts) - 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if self.min is None or value < self.min:
+            self.min = value
+
+    def percentile(self, pct):
+        """Value at pct (0..100), to bucket precision and never above the exact max."""
+        if self.count == 0:
+            return 0
+        rank = max(1, int(round(pct / 100.0 * self.count)))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bucket_value(index), self.max)
+        return self.max
+
+    def merge(self, other):
+        for index, n in enumerate(other.counts):
+            self.counts[index] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+
+
+class Profiler:
+    """
+    Named stage histograms for one flight. `work` and `sleep` are filled by
+    a ControlLoop the profiler is attached to; every other stage by
+    wrap() / instrument() or record().
+    """
+
+    def __init__(self, enabled=True, clock=time.perf_counter_ns):
+        self.enabled = enabled
+        self._clock = clock
+        self.stages = {}
+
+    def histogram(self, name):
+        hist = self.stages.get(name)
+        if hist is None:
+            hist = self.stages[name] = Histogram()
+        return hist
+
+    def record(self, name, ns):
+        if self.enabled:
+            self.histogram(name).record(ns)
+
+    def wrap(self, fn, name=None):
+        """fn timed into stage `name` (default: its name); fn itself when disabled."""
+        if not self.enabled:
+            return fn
+        record = self.histogram(name or fn.__name__).record
+        clock = self._clock
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            started = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(clock() - started)
+        return timed
+
+    def instrument(self, target, *names):
+        """Replace functions of a namespace dict (globals()) or methods of an object by timed ones."""
+        if not self.enabled:
+            return
+        for name in names:
+            if isinstance(target, dict):
+                target[name] = self.wrap(target[name], name)
+            else:
+                setattr(target, name, self.wrap(getattr(target, name), name))
+
+    # ---- export ----
+
+    def report(self):
+        """Per-stage count / p50 / p99 / max (µs), share of the loop time, and the loop rate."""
+        work, sleep = self.stages.get("work"), self.stages.get("sleep")
+        loop_ns = (work.total if work else 0) + (sleep.total if sleep else 0)
+        stages = {}
+        for name, h in sorted(self.stages.items(), key=lambda item: -item[1].total):
+            stages[name] = {
+                "count": h.count,
+                "p50_us": h.percentile(50) / 1000.0,
+                "p99_us": h.percentile(99) / 1000.0,
+                "max_us": h.max / 1000.0,
+                "total_ms": h.total / 1e6,
+                "share": h.total / loop_ns if loop_ns else 0.0,
+            }
+        return {
+            "loop_hz": work.count / (loop_ns / 1e9) if work and loop_ns else 0.0,
+            "work_s": work.total / 1e9 if work else 0.0,
+            "sleep_s": sleep.total / 1e9 if sleep else 0.0,
+            "stages": stages,
+        }
+
+    def summary(self):
+        return format_report(self.report())
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=1)
+
+
+def format_report(report):
+    lines = [f"Loop {report['loop_hz']:.1f} Hz, working {report['work_s']:.3f} s, "
+             f"sleeping {report['sleep_s']:.3f} s",
+             f"{'stage':<14} {'count':>7} {'p50 us':>9} {'p99 us':>9} {'max us':>10} {'total ms':>10} {'share':>6}"]
+    for name, s in report["stages"].items():
+        lines.append(f"{name:<14} {s['count']:>7} {s['p50_us']:>9.1f} {s['p99_us']:>9.1f} {s['max_us']:>10.1f}"
+                     f" {s['total_ms']:>10.2f} {s['share']:>6.1%}")
+    return "\n".join(lines)
+
+
+def overhead(calls=200000):
+    """ns added per call by a wrapped (enabled) and a disabled profiler, on this machine."""
+    def stage():
+        pass
+
+    out = {}
+    for enabled in (True, False):
+        fn = Profiler(enabled=enabled).wrap(stage)
+        started = time.perf_counter_ns()
+        for _ in range(calls):
+            fn()
+        timed = time.perf_counter_ns() - started
+        started = time.perf_counter_ns()
+        for _ in range(calls):
+            stage()
+        bare = time.perf_counter_ns() - started
+        out["enabled_ns" if enabled else "disabled_ns"] = max(timed - bare, 0) / calls
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show a saved loop profile or measure the timer overhead")
+    parser.add_argument("path", nargs="?", help="profile written by Profiler.dump (.profile.json)")
+    parser.add_argument("--overhead", action="store_true", help="measure ns per timed call")
+    args = parser.parse_args()
+    if args.path is None and not args.overhead:
+        parser.error("give a profile file or --overhead")
+    if args.path is not None:
+        with open(args.path) as f:
+            print(format_report(json.load(f)))
+    if args.overhead:
+        r = overhead()
+        print(f"timer overhead: {r['enabled_ns']:.0f} ns per call enabled, {r['disabled_ns']:.0f} ns disabled")
+
+
+if __name__ == "__main__":
+    main()
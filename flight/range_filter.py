@@ -0,0 +1,147 @@
+# Streaming noise filter and outlier rejection for Multiranger ranges
+"""
+Clean up the ranges before the obstacle trigger sees them.
+
+The VL53 rangers now and then report a single short reading with nothing
+there, or drop a reading (None, which the trigger took as clear). Per
+direction, every reading goes through three O(1) stages on fixed-size
+buffers:
+
+- spike rejection: a reading that jumps more than `spike` m from the
+  filtered range is held back until `confirm` further readings agree
+  with it, so a lone outlier never reaches the trigger while a real
+  obstacle only costs `confirm` samples;
+- a running median over the last `window` readings;
+- an EWMA with gain `alpha` on the median (1.0: off).
+
+A missing reading counts as FAR, so one dropout cannot clear an obstacle
+either. FilteredRangeStream is a RangeStream whose samples are already
+filtered, so it drops in wherever a RangeStream goes (ObstacleReaction,
+BypassManeuver), and it adds its own lag to the sample age so the TTC
+trigger still compensates for the full delay:
+
+    ranges = FilteredRangeStream(window=3, spike=0.3)
+    ranges.attach(multiranger)
+    reaction = ObstacleReaction(ranges, state_estimate, CommandLatency(scf), hysteresis=0.05)
+
+Hysteresis gives the threshold trigger separate enter and exit ranges,
+so a reading dithering around the threshold does not flip it every tick.
+"""
+import time
+
+from flight.ranger_stream import RangeStream
+
+FAR = 8.0       # what a missing (out of range) reading counts as (m), like to_distance's cutoff
+
+DIRECTIONS = ("front", "back", "left", "right", "up", "down")
+
+
+class DirectionFilter:
+    """Spike rejection, running median and EWMA for one ranger direction."""
+
+    def __init__(self, window=3, alpha=1.0, spike=0.3, confirm=1, far=FAR):
+        if window < 1 or not 0.0 < alpha <= 1.0:
+            raise ValueError("window must be >= 1 and alpha in (0, 1]")
+        self.window = window
+        self.alpha = alpha
+        self.spike = spike
+        self.confirm = confirm
+        self.far = far
+        self._ring = []
+        self._next = 0
+        self._pending = None        # held-back jump and how many readings agreed with it
+        self._agree = 0
+        self.median = None
+        self.value = None           # filtered range (m), None when out of range or nothing yet
+        self.samples = 0
+        self.rejected = 0
+
+    def update(self, distance):
+        """Feed one reading (m or None); returns the filtered range (None: out of range)."""
+        self.samples += 1
+        x = self.far if distance is None else distance
+        if self.spike is not None and self.median is not None and abs(x - self.median) > self.spike:
+            if self._pending is not None and abs(x - self._pending) <= self.spike:
+                self._agree += 1
+            else:
+                self._pending, self._agree = x, 0
+            if self._agree < self.confirm:
+                self.rejected += 1
+                return self.value
+            self._ring = [x] * len(self._ring)      # confirmed step: restart the window on it
+        self._pending = None
+
+        if len(self._ring) < self.window:
+            self._ring.append(x)
+        else:
+            self._ring[self._next] = x
+            self._next = (self._next + 1) % self.window
+        ordered = sorted(self._ring)                # window is a handful of readings: constant work
+        self.median = ordered[len(ordered) // 2]
+
+        if self.median >= self.far:
+            self.value = None
+        elif self.value is None:
+            self.value = self.median
+        else:
+            self.value += self.alpha * (self.median - self.value)
+        return self.value
+
+    def lag(self):
+        """Delay of a step through median and EWMA, in samples."""
+        return (self.window - 1) / 2.0 + (1.0 - self.alpha) / self.alpha
+
+
+class FilteredRangeStream(RangeStream):
+    """
+    RangeStream of filtered samples (see DirectionFilter for the
+    parameters). Raw readings come in through attach() or push() as usual;
+    rejected counts the readings held back as spikes.
+    """
+
+    def __init__(self, window=3, alpha=1.0, spike=0.3, confirm=1, size=64, clock=time.monotonic):
+        super().__init__(size, clock)
+        self.filters = {d: DirectionFilter(window, alpha, spike, confirm) for d in DIRECTIONS}
+        self.interval = None        # smoothed time between samples (s)
+        self._last_arrival = None
+
+    def push(self, stamp, front, back, left, right, up, down=None):
+        now = self._clock()
+        if self._last_arrival is not None:
+            gap = now - self._last_arrival
+            self.interval = gap if self.interval is None else self.interval + 0.125 * (gap - self.interval)
+        self._last_arrival = now
+        f = self.filters
+        return super().push(stamp, f["front"].update(front), f["back"].update(back),
+                            f["left"].update(left), f["right"].update(right),
+                            f["up"].update(up), f["down"].update(down))
+
+    @property
+    def rejected(self):
+        return sum(f.rejected for f in self.filters.values())
+
+    def lag(self):
+        """Seconds the filter holds a change back (0 until the sample rate is known)."""
+        return self.filters["front"].lag() * (self.interval or 0.0)
+
+    def age(self, sample=None):
+        """Age of the underlying readings: time since arrival plus the filter lag."""
+        return super().age(sample) + self.lag()
+
+
+class Hysteresis:
+    """Obstacle state with an entry range and a larger exit range (m)."""
+
+    def __init__(self, enter, exit=None):
+        self.enter = enter
+        self.exit = enter if exit is None else exit
+        self.close = False
+
+    def update(self, distance):
+        if distance is None:
+            self.close = False
+        elif self.close:
+            self.close = distance < self.exit
+        else:
+            self.close = distance < self.enter
+        return self.close
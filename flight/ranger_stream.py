@@ -0,0 +1,137 @@
+# Event-driven Multiranger ingestion
+import asyncio
+import threading
+import time
+from collections import deque, namedtuple
+
+# Same log variable names as cflib.utils.multiranger.Multiranger
+FRONT = 'range.front'
+BACK = 'range.back'
+LEFT = 'range.left'
+RIGHT = 'range.right'
+UP = 'range.up'
+DOWN = 'range.zrange'
+
+# seq: running sample number, t: host arrival time (monotonic s),
+# stamp: Crazyflie log timestamp (ms), ranges in metres or None
+RangeSample = namedtuple("RangeSample", "seq t stamp front back left right up down")
+
+
+def to_distance(raw):
+    """Convert a raw ranging value (mm) like Multiranger does: >= 8000 is out of range."""
+    if raw is None or raw >= 8000:
+        return None
+    return raw / 1000.0
+
+
+class RangeStream:
+    """
+    Timestamped ring buffer of Multiranger log blocks.
+
+    Hook it on an existing Multiranger with attach(): every log packet is
+    stamped on arrival, appended to a bounded buffer and pushed to
+    subscribers, so the avoidance logic wakes on fresh data instead of
+    polling the properties at its own pace.
+
+        stream = RangeStream()
+        stream.attach(multiranger)
+        sample = stream.wait_newer(last_seq, timeout=0.2)
+        if sample is not None and stream.age(sample) < 0.15: ...
+    """
+
+    def __init__(self, size=64, clock=time.monotonic):
+        self._clock = clock
+        self._buffer = deque(maxlen=size)
+        self._cond = threading.Condition()
+        self._callbacks = []
+        self._waiters = []          # (asyncio loop, asyncio.Event)
+        self._source = None
+        self.seq = 0
+
+    # ---- wiring ----
+
+    def attach(self, multiranger):
+        """Receive every log block of a (started or not yet started) Multiranger."""
+        multiranger._log_config.data_received_cb.add_callback(self._on_log)
+        self._source = multiranger
+
+    def detach(self):
+        if self._source is not None:
+            self._source._log_config.data_received_cb.remove_callback(self._on_log)
+            self._source = None
+
+    def subscribe(self, callback):
+        """callback(sample) runs on the receiving thread for every new sample."""
+        self._callbacks.append(callback)
+
+    def unsubscribe(self, callback):
+        self._callbacks.remove(callback)
+
+    def _on_log(self, timestamp, data, logconf):
+        self.push(timestamp,
+                  to_distance(data.get(FRONT)), to_distance(data.get(BACK)),
+                  to_distance(data.get(LEFT)), to_distance(data.get(RIGHT)),
+                  to_distance(data.get(UP)), to_distance(data.get(DOWN)))
+
+    def push(self, stamp, front, back, left, right, up, down=None):
+        """Add one reading (metres / None) and wake everyone waiting on it."""
+        with self._cond:
+            self.seq += 1
+            sample = RangeSample(self.seq, self._clock(), stamp,
+                                 front, back, left, right, up, down)
+            self._buffer.append(sample)
+            self._cond.notify_all()
+            waiters, self._waiters = self._waiters, []
+
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass    # waiter's event loop already closed
+        for callback in list(self._callbacks):
+            callback(sample)
+        return sample
+
+    # ---- reading ----
+
+    def latest(self):
+        """Newest sample or None if nothing arrived yet."""
+        buffer = self._buffer
+        return buffer[-1] if buffer else None
+
+    def age(self, sample=None):
+        """Seconds since the sample (default: newest) arrived; inf when there is none."""
+        if sample is None:
+            sample = self.latest()
+        if sample is None:
+            return float("inf")
+        return self._clock() - sample.t
+
+    def fresh(self, max_age):
+        """Newest sample if it is at most max_age seconds old, otherwise None."""
+        sample = self.latest()
+        if sample is None or self._clock() - sample.t > max_age:
+            return None
+        return sample
+
+    def history(self):
+        """Copy of the buffered samples, oldest first."""
+        with self._cond:
+            return list(self._buffer)
+
+    def wait_newer(self, seq, timeout=None):
+        """Block until a sample with seq greater than `seq` arrives; None on timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.seq > seq, timeout):
+                return None
+            return self._buffer[-1]
+
+    async def next_sample(self, seq):
+        """Asyncio counterpart of wait_newer (no timeout; wrap in asyncio.wait_for)."""
+        while True:
+            with self._cond:
+                if self.seq > seq:
+                    return self._buffer[-1]
+                event = asyncio.Event()
+                self._waiters.append((asyncio.get_running_loop(), event))
+            await event.wait()
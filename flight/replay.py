@@ -0,0 +1,297 @@
+# Deterministic replay of recorded flights through the unchanged avoidance logic
+"""
+Re-run a Waypoint_Avoid script against a flight recorded by its telemetry.
+
+The script runs unchanged in the simulator sandbox, but the drone has no
+physics: the Multiranger and stateEstimate log packets recorded during the
+flight (TelemetryRecorder.attach) are delivered again at their original
+arrival times. Each leg is re-aligned to the recording when the script
+starts it (its LEG_START marker), so host-side delays of the real flight
+do not accumulate. The script's own telemetry calls are captured in
+memory and diffed tick by tick against the original decisions. Everything
+runs on the virtual clock, so a replay is deterministic and much faster
+than the flight:
+
+    result = replay("Waypoint_Avoid09.py", "Waypoint_Avoid09.cftl", overrides={"safety_margin": 0.3})
+    print(result["diff"]["mismatches"], result["diff"]["first_divergence"])
+
+The replay is open loop: once a decision differs, the drone would have
+flown elsewhere than the recording, so only the first divergence is
+exact. Bulk regression over a library of flights, e.g. after changing a
+threshold:
+
+    python -m flight.replay Waypoint_Avoid09.py flights/*.cftl --set safety_margin=0.3
+"""
+import argparse
+import ast
+import math
+import os
+import sys
+import time
+import types
+
+import numpy as np
+
+from flight import telemetry
+from flight.sim import OUT_OF_RANGE_MM, LogConfig, World, run_script
+
+RANGE_VARS = {
+    'range.front': "front",
+    'range.back': "back",
+    'range.left': "left",
+    'range.right': "right",
+    'range.up': "up",
+    'range.zrange': "down",
+}
+POSE_VARS = {
+    'stateEstimate.x': "x",
+    'stateEstimate.y': "y",
+    'stateEstimate.z': "z",
+    'stateEstimate.vx': "vx",
+    'stateEstimate.vy': "vy",
+    'stateEstimate.vz': "vz",
+}
+# the mission's telemetry file during a replay: never written, the replay recorder keeps its rows in memory
+REPLAY_FILE = "{mission}.cftl"
+
+
+def records_from(rows):
+    """telemetry.RECORD array from (t, leg, branch, pose, velocity, ranges, setpoint) rows."""
+    nan3 = (math.nan,) * 3
+    out = np.zeros(len(rows), telemetry.RECORD)
+    for i, (t, leg, branch, pose, velocity, ranges, setpoint) in enumerate(rows):
+        out[i] = (t, i, leg, branch, 0, *pose[:3], *(velocity[:3] if velocity is not None else nan3),
+                  *(math.nan if r is None else r for r in ranges),
+                  *(setpoint[:3] if setpoint is not None else nan3), 0)
+    return out
+
+
+def packet_data(row, variables):
+    """Log data dict for a LogConfig from a recorded packet, or None if the packet is not for it."""
+    if row["branch"] == telemetry.RANGE_PACKET and all(v in RANGE_VARS for v in variables):
+        values = {v: float(row[RANGE_VARS[v]]) for v in variables}
+        return {v: OUT_OF_RANGE_MM if math.isnan(m) else int(round(m * 1000.0)) for v, m in values.items()}
+    if row["branch"] == telemetry.POSE_PACKET and all(v in POSE_VARS for v in variables):
+        return {v: float(row[POSE_VARS[v]]) for v in variables}
+    return None
+
+
+class ReplayWorld(World):
+    """
+    World that plays back one recorded flight instead of simulating one.
+    There is no physics: recorded log packets are handed to the started log
+    configs when the replay reaches their arrival time. now + offset is the
+    recording's time; align(leg) moves the offset so that the leg starts
+    where it started in the recording.
+    """
+
+    def __init__(self, records, dt=0.01, latency=0.0):
+        super().__init__(dt=dt, latency=latency)
+        self.ticks = telemetry.ticks(records)
+        if len(self.ticks) == 0:
+            raise ValueError("recording has no control-loop ticks")
+        packet = (records["branch"] == telemetry.RANGE_PACKET) | (records["branch"] == telemetry.POSE_PACKET)
+        self.packets = records[packet]
+        self.leg_starts = records[records["branch"] == telemetry.LEG_START]
+        self._next_packet = 0
+        self.offset = None
+        self.recorder = None
+
+    def recorded_time(self):
+        return self.now + self.offset if self.offset is not None else float(self.ticks["t"][0])
+
+    def align(self, leg):
+        for rows in (self.leg_starts, self.ticks):
+            starts = np.flatnonzero(rows["leg"] == leg)
+            if len(starts):
+                self.offset = float(rows["t"][starts[0]]) - self.now
+                self._deliver()
+                return
+
+    def advance(self, until):
+        while self.now < until - 1e-12:
+            self.now += min(self.dt, until - self.now)
+            self._deliver()
+            for drone in self.drones.values():
+                for conf in list(drone.log_configs):
+                    if not isinstance(conf, LogConfig):
+                        conf._poll(self.now)        # link statistics
+
+    def _deliver(self):
+        """Hand every recorded packet up to the current replay time to its log configs."""
+        if self.offset is None:
+            return
+        until = self.recorded_time() + 1e-9
+        packets = self.packets
+        while self._next_packet < len(packets) and packets["t"][self._next_packet] <= until:
+            row = packets[self._next_packet]
+            self._next_packet += 1
+            for drone in self.drones.values():
+                for conf in list(drone.log_configs):
+                    if isinstance(conf, LogConfig) and conf.started:
+                        data = packet_data(row, conf.variables)
+                        if data is not None:
+                            conf.data_received_cb.call(int(row["t"] * 1000), data, conf)
+
+
+def telemetry_module(world):
+    """Stand-in for flight.telemetry: same constants, recorder captured in memory."""
+
+    class ReplayRecorder:
+        backlog = 0                 # rows are kept in memory: never behind
+        max_pending = 8192
+        flush_interval = 0.05
+
+        def __init__(self, path, *args, **kwargs):
+            self.path = path
+            self.rows = []
+            self._leg = 0
+            self.written = 0
+            self.dropped = 0
+            world.recorder = self
+
+        @property
+        def leg(self):
+            return self._leg
+
+        @leg.setter
+        def leg(self, value):
+            self.start_leg(value)
+
+        def start_leg(self, leg):
+            self._leg = leg
+            world.align(leg)
+
+        def attach(self, source):
+            pass            # the packets come from the recording
+
+        def open(self):
+            pass
+
+        def close(self):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc_val, exc_tb):
+            pass
+
+        def record(self, branch, pose, ranges=None, setpoint=None, velocity=None, t=None):
+            r = (None,) * 6 if ranges is None else (ranges.front, ranges.back, ranges.left,
+                                                     ranges.right, ranges.up, ranges.down)
+            when = world.recorded_time() if t is None or world.offset is None else t + world.offset
+            self.rows.append((when, self._leg, branch, pose, velocity, r, setpoint))
+            self.written += 1
+
+    mod = types.ModuleType('flight.telemetry')
+    mod.__dict__.update({k: v for k, v in vars(telemetry).items() if not k.startswith('__')})
+    mod.TelemetryRecorder = ReplayRecorder
+    return mod
+
+
+def diff(original, replayed):
+    """
+    Tick-by-tick decision diff, leg by leg (ticks are matched by their
+    position within the leg). first_divergence: (leg, tick in leg, recorded
+    time, original branch, replayed branch) of the earliest difference.
+    """
+    out = {
+        "ticks": len(original),
+        "replayed": len(replayed),
+        "mismatches": 0,
+        "first_divergence": None,
+        "max_setpoint_error": 0.0,
+    }
+    legs = sorted(set(original["leg"].tolist()) | set(replayed["leg"].tolist()))
+    for leg in legs:
+        a = original[original["leg"] == leg]
+        b = replayed[replayed["leg"] == leg]
+        n = min(len(a), len(b))
+        differs = np.flatnonzero(a["branch"][:n] != b["branch"][:n])
+        out["mismatches"] += len(differs) + abs(len(a) - len(b))
+        first = differs[0] if len(differs) else (n if len(a) != len(b) else None)
+        if first is not None and out["first_divergence"] is None:
+            name = lambda rows: telemetry.BRANCHES[rows["branch"][first]] if first < len(rows) else None
+            t = a["t"][first] if first < len(a) else b["t"][first]
+            out["first_divergence"] = (leg, int(first), float(t), name(a), name(b))
+        sa = np.stack([a["sx"][:n], a["sy"][:n], a["sz"][:n]], axis=1)
+        sb = np.stack([b["sx"][:n], b["sy"][:n], b["sz"][:n]], axis=1)
+        both = ~(np.isnan(sa).any(axis=1) | np.isnan(sb).any(axis=1))
+        if both.any():
+            error = float(np.linalg.norm(sa[both] - sb[both], axis=1).max())
+            out["max_setpoint_error"] = max(out["max_setpoint_error"], error)
+    return out
+
+
+def replay(script, recording, overrides=None, dt=0.01, latency=0.0):
+    """
+    Replay one recorded flight (a telemetry file or RECORD array) through a
+    script. latency: radio latency (s) the link statistics report, for the
+    latency-compensated trigger. Returns the replayed ticks, the diff
+    against the recorded ones and the timings.
+    """
+    recorded = telemetry.read(recording) if isinstance(recording, (str, os.PathLike)) else recording
+    world = ReplayWorld(recorded, dt=dt, latency=latency)
+    original = world.ticks
+    overrides = {**(overrides or {}), "telemetry_file": REPLAY_FILE}
+    started = time.perf_counter()
+    report = run_script(script, world, extra_modules={'flight.telemetry': telemetry_module(world)},
+                        overrides=overrides)
+    if world.recorder is None:
+        raise ValueError(f"{os.path.basename(script)} does not record telemetry")
+    replayed = records_from(world.recorder.rows)
+    wall = time.perf_counter() - started
+    flown = float(original["t"][-1] - original["t"][0])
+    return {
+        "records": replayed,
+        "diff": diff(original, replayed),
+        "sim_time": report["sim_time"],
+        "wall_time": wall,
+        "speedup": flown / wall if wall > 0 else math.inf,
+        "output": report["output"],
+    }
+
+
+def parse_setting(text):
+    name, _, value = text.partition("=")
+    if not name or not value:
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE, got {text!r}")
+    try:
+        return name, ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        raise argparse.ArgumentTypeError(f"{value!r} is not a Python literal") from None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded flights through a Waypoint_Avoid script")
+    parser.add_argument("script")
+    parser.add_argument("recordings", nargs="+", help="telemetry files (.cftl)")
+    parser.add_argument("--set", dest="overrides", type=parse_setting, action="append", default=[],
+                        metavar="NAME=VALUE", help="override a script or mission setting (repeatable)")
+    parser.add_argument("--max-mismatches", type=int, default=0,
+                        help="mismatching ticks a flight may have and still pass")
+    args = parser.parse_args()
+
+    overrides = dict(args.overrides)
+    failed = 0
+    print(f"{'flight':<32} {'ticks':>6} {'replayed':>8} {'mismatch':>8} {'speedup':>8}  first divergence")
+    for path in args.recordings:
+        try:
+            result = replay(args.script, path, overrides)
+        except ValueError as e:
+            parser.error(str(e))
+        d = result["diff"]
+        first = "-"
+        if d["first_divergence"] is not None:
+            leg, tick, t, was, now = d["first_divergence"]
+            first = f"leg {leg} tick {tick} (t={t:.2f}s): {was} -> {now}"
+        print(f"{os.path.basename(path):<32} {d['ticks']:>6} {d['replayed']:>8} {d['mismatches']:>8}"
+              f" {result['speedup']:>7.0f}x  {first}")
+        failed += d["mismatches"] > args.max_mismatches
+    print(f"{len(args.recordings) - failed}/{len(args.recordings)} flights replayed within tolerance")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+# Route optimizer: reorder large waypoint sets for the shortest flight time
+"""
+Put the waypoints of an inspection sweep, from a handful to thousands, in
+the order that is quickest to fly before the mission starts.
+
+- Leg times come from the same minimum-jerk profile the trajectories fly
+  (flight/trajectory.py). Climbing and descending run at v_z instead of
+  v_max, so altitude changes cost what they take. All pairs go into one
+  NumPy matrix.
+- A nearest-neighbour tour is the seed. It is improved with 2-opt
+  (reverse a stretch) and Or-opt (move one to three waypoints elsewhere,
+  either way round). Only moves that join a waypoint to one of its
+  `neighbours` nearest waypoints are tried. Each round evaluates them all
+  as arrays and applies every improving move that does not overlap a
+  better one, until none is left.
+- The first and last waypoints stay in place (fix_start / fix_end);
+  either end can be left free.
+
+The result is (x, y, z, duration) waypoints again. The duration is the
+leg time from the previous waypoint plus settle_s, so the route feeds
+straight into a mission:
+
+    route = optimize(sweep)                             # or the mission setting "route_optimizer": {}
+    python -m flight.route_optimizer --points 100 1000 3000
+"""
+import argparse
+import json
+import math
+import time
+
+import numpy as np
+
+from flight.trajectory import MIN_JERK_PEAK_A, MIN_JERK_PEAK_V
+
+EPS = 1e-4          # s: smaller gains are float32 rounding
+
+
+def travel_times(points, v_max=1.0, v_z=0.5, a_max=2.0):
+    """Leg time (s) between every pair of (x, y, z) points, vertical at v_z."""
+    p = np.asarray(points, float)[:, :3] * np.array([1.0, 1.0, v_max / v_z])
+    p = (p - p.mean(axis=0)).astype(np.float32)         # float32: half the memory traffic of the n x n work
+    sq = np.einsum("ij,ij->i", p, p)
+    d = sq[:, None] + sq[None, :]
+    d -= 2.0 * (p @ p.T)
+    np.maximum(d, 0.0, out=d)
+    np.sqrt(d, out=d)
+    np.fill_diagonal(d, 0.0)
+    # minimum-jerk leg time: the velocity limit, or the acceleration limit on short legs
+    return np.maximum(d * np.float32(MIN_JERK_PEAK_V / v_max), np.sqrt(d * np.float32(MIN_JERK_PEAK_A / a_max)))
+
+
+def tour_time(times, tour):
+    tour = np.asarray(tour)
+    return float(times[tour[:-1], tour[1:]].sum())
+
+
+def nearest_neighbour(times, first, last=None):
+    """Tour from `first` that always flies to the nearest unvisited point, ending on `last` if given."""
+    n = len(times)
+    free = np.ones(n, bool)
+    free[first] = False
+    if last is not None:
+        free[last] = False
+    tour = [first]
+    for _ in range(int(free.sum())):
+        current = int(np.argmin(np.where(free, times[tour[-1]], np.inf)))
+        free[current] = False
+        tour.append(current)
+    if last is not None:
+        tour.append(last)
+    return np.array(tour)
+
+
+def nearest(times, k):
+    """The k nearest other points of every point (n x k indices)."""
+    n = len(times)
+    k = min(k, n - 1)
+    masked = times + np.diag(np.full(n, np.inf))
+    return np.argpartition(masked, k - 1, axis=1)[:, :k] if k > 0 else np.zeros((n, 0), int)
+
+
+# ------------------------------
+# Local search
+# ------------------------------
+
+# Move kinds; a move is (delta, kind, a, b, c) with tour positions a, b, c
+TWO_OPT = 0     # reverse tour[a + 1 .. b]
+OR_OPT = 1      # move tour[a .. a + |b| - 1] between tour[c] and tour[c + 1] (b < 0: reversed)
+
+
+def _best(delta, *choices):
+    """Per row: the smallest delta and what it chose."""
+    best = np.argmin(delta, axis=1)
+    rows = np.arange(len(delta))
+    return (delta[rows, best], *(c[rows, best] for c in choices))
+
+
+def _two_opt(times, tour, pos, neighbours, i):
+    """Best 2-opt move for the edges starting at positions i: new edges (t[lo], t[hi]) and (t[lo + 1], t[hi + 1])."""
+    n = len(tour)
+    i = i[:, None]
+    j = pos[neighbours[tour[i[:, 0]]]]
+    lo, hi = np.minimum(i, j), np.maximum(i, j)
+    valid = (hi - lo >= 2) & (hi <= n - 2)
+    hi = np.where(valid, hi, lo)
+    delta = (times[tour[lo], tour[hi]] + times[tour[lo + 1], tour[hi + 1]]
+             - times[tour[lo], tour[lo + 1]] - times[tour[hi], tour[hi + 1]])
+    delta, lo, hi = _best(np.where(valid, delta, np.inf), lo, hi)
+    return delta, lo, hi, np.zeros(len(lo), int)
+
+
+def _or_opt(times, tour, pos, neighbours, s, length):
+    """Best Or-opt move for the segments of `length` waypoints starting at positions s."""
+    n = len(tour)
+    first, last = tour[s], tour[s + length - 1]
+    before, after = tour[s - 1], tour[s + length]
+    gain = times[before, first] + times[last, after] - times[before, after]
+    deltas, edges, ways = [], [], []
+    # (anchor, edge offset, forward): the segment end that ends up next to its neighbour
+    for anchor, offset, forward in ((first, 0, True), (first, -1, False), (last, -1, True), (last, 0, False)):
+        e = pos[neighbours[anchor]] + offset
+        valid = (e >= 0) & (e <= n - 2) & ((e < s[:, None] - 1) | (e >= s[:, None] + length))
+        e = np.where(valid, e, 0)
+        u, v = tour[e], tour[e + 1]
+        x, y = (first, last) if forward else (last, first)
+        delta = times[u, x[:, None]] + times[y[:, None], v] - times[u, v] - gain[:, None]
+        deltas.append(np.where(valid, delta, np.inf))
+        edges.append(e)
+        ways.append(np.full(e.shape, length if forward else -length))
+    delta, way, e = _best(np.hstack(deltas), np.hstack(ways), np.hstack(edges))
+    return delta, s, way, e
+
+
+def _span(kind, a, b, c):
+    """Tour positions a move reads or changes (first, last)."""
+    if kind == TWO_OPT:
+        return a, b + 1
+    return min(a - 1, c), max(a + abs(b), c + 1)
+
+
+def _apply(tour, kind, a, b, c):
+    """
+    Apply one move in place; it only permutes tour positions inside its
+    span. Returns the waypoints whose tour neighbours changed.
+    """
+    if kind == TWO_OPT:
+        ends = tour[[a, a + 1, b, b + 1]]
+        tour[a + 1:b + 1] = tour[a + 1:b + 1][::-1].copy()
+        return ends
+    length = abs(b)
+    ends = tour[[a - 1, a, a + length - 1, a + length, c, c + 1]]
+    segment = tour[a:a + length].copy()
+    if b < 0:
+        segment = segment[::-1]
+    if c < a:
+        tour[c + 1:a + length] = np.concatenate((segment, tour[c + 1:a]))
+    else:
+        tour[a:c + 1] = np.concatenate((tour[a + length:c + 1], segment))
+    return ends
+
+
+def improve(times, tour, neighbours, max_rounds=None):
+    """
+    2-opt and Or-opt over the neighbour lists until no move helps; returns
+    (tour, rounds). Don't-look bits: a waypoint is only looked at again
+    once a move changed its tour neighbours.
+    """
+    tour = np.array(tour)
+    n = len(tour)
+    pos = np.empty(n, int)
+    active = np.ones(n, bool)
+    rounds = 0
+    while max_rounds is None or rounds < max_rounds:
+        pos[tour] = np.arange(n)
+        looking = active[tour]
+        rows = [np.flatnonzero(looking[:-1])]
+        parts = [(_two_opt(times, tour, pos, neighbours, rows[0]), TWO_OPT)]
+        for length in (1, 2, 3):
+            s = np.arange(1, n - length)
+            rows.append(s[looking[s] | looking[s + length - 1]])
+            parts.append((_or_opt(times, tour, pos, neighbours, rows[-1], length), OR_OPT))
+        delta = np.concatenate([p[0] for p, _ in parts])
+        kind = np.concatenate([np.full(len(p[0]), k) for p, k in parts])
+        a, b, c = (np.concatenate([p[i] for p, _ in parts]).astype(int) for i in (1, 2, 3))
+        improving = np.flatnonzero(delta < -EPS)
+        # nothing to gain around the waypoints looked at: don't look again until a move touches them
+        active[tour[np.flatnonzero(looking)]] = False
+        active[tour[np.concatenate(rows)[improving]]] = True
+        if not len(improving):
+            break
+        taken = np.zeros(n, bool)
+        for m in improving[np.argsort(delta[improving])]:
+            lo, hi = _span(kind[m], a[m], b[m], c[m])
+            if taken[lo:hi + 1].any():
+                continue
+            taken[lo:hi + 1] = True
+            active[_apply(tour, kind[m], a[m], b[m], c[m])] = True
+        rounds += 1
+    return tour, rounds
+
+
+# ------------------------------
+# Waypoint routes
+# ------------------------------
+
+def order(points, fix_start=True, fix_end=True, v_max=1.0, v_z=0.5, a_max=2.0, neighbours=8):
+    """Visiting order (indices into points) with the shortest flight time."""
+    n = len(points)
+    if n < 3:
+        return np.arange(n)
+    times = travel_times(points, v_max, v_z, a_max)
+    near = nearest(times, neighbours)
+    # a free end is a dummy point with zero time to everything, fixed at that end
+    pad = (0 if fix_start else 1, 0 if fix_end else 1)
+    if any(pad):
+        times = np.pad(times, [pad, pad])
+        near = np.pad(near + pad[0], [pad, (0, 0)], constant_values=pad[0])
+    first, last = 0, len(times) - 1
+    tour = nearest_neighbour(times, first, last)
+    tour, _ = improve(times, tour, near)
+    return tour[pad[0]:len(tour) - pad[1]] - pad[0]
+
+
+def optimize(waypoints, fix_start=True, fix_end=True, v_max=1.0, v_z=0.5, a_max=2.0, neighbours=8, settle_s=1.0):
+    """
+    Waypoints ((x, y, z) or (x, y, z, duration)) reordered for the shortest
+    flight time, as (x, y, z, duration). Each duration is the leg time from
+    the previous waypoint plus settle_s, rounded up to 0.1 s; the first
+    waypoint keeps its own (settle_s if it has none).
+    """
+    waypoints = [tuple(wp) for wp in waypoints]
+    if not waypoints:
+        return []
+    points = np.array([wp[:3] for wp in waypoints], float)
+    idx = order(points, fix_start, fix_end, v_max, v_z, a_max, neighbours)
+    times = travel_times(points[idx], v_max, v_z, a_max)
+    first = waypoints[idx[0]]
+    route = [(*first[:3], first[3] if len(first) > 3 else settle_s)]
+    for k in range(1, len(idx)):
+        duration = math.ceil((times[k - 1, k] + settle_s) * 10.0 - 1e-9) / 10.0
+        route.append((*waypoints[idx[k]][:3], duration))
+    return route
+
+
+# ------------------------------
+# Benchmark
+# ------------------------------
+
+def sweep(n, size=20.0, heights=(0.3, 2.0), seed=0):
+    """n random inspection points over a size x size m area between two heights."""
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.uniform(0.0, size, (n, 2)), rng.uniform(*heights, n)])
+
+
+def benchmark(n, seed=0, neighbours=8):
+    points = sweep(n, seed=seed)
+    started = time.perf_counter()
+    times = travel_times(points)
+    near = nearest(times, neighbours)
+    seed_tour = nearest_neighbour(times, 0, n - 1)
+    seeded = time.perf_counter()
+    tour, rounds = improve(times, seed_tour, near)
+    done = time.perf_counter()
+    return {
+        "given": tour_time(times, np.arange(n)),
+        "nearest": tour_time(times, seed_tour),
+        "optimized": tour_time(times, tour),
+        "rounds": rounds,
+        "seed_s": seeded - started,
+        "total_s": done - started,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Optimize the waypoint order of a route, or benchmark it")
+    parser.add_argument("route", nargs="?", help="JSON list of (x, y, z[, duration]) waypoints to optimize")
+    parser.add_argument("--points", type=int, nargs="+", default=[100, 1000, 3000],
+                        help="benchmark on random sweeps of these sizes")
+    parser.add_argument("--free-end", action="store_true", help="let the route end anywhere")
+    parser.add_argument("--v-z", type=float, default=0.5, help="climb / descent speed (m/s)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.route:
+        with open(args.route, encoding="utf-8") as f:
+            waypoints = json.load(f)
+        route = optimize(waypoints, fix_end=not args.free_end, v_z=args.v_z)
+        print(json.dumps([list(wp) for wp in route]))
+        return
+
+    print(f"{'points':>7}  {'given':>9}  {'nearest':>9}  {'optimized':>9}  {'rounds':>6}  {'seed':>7}  {'total':>7}")
+    for n in args.points:
+        r = benchmark(n, seed=args.seed)
+        print(f"{n:7d}  {r['given']:8.0f}s  {r['nearest']:8.0f}s  {r['optimized']:8.0f}s  {r['rounds']:6d}  "
+              f"{r['seed_s'] * 1000:5.0f}ms  {r['total_s'] * 1000:5.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
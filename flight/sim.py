@@ -0,0 +1,1364 @@
+# Headless simulated Crazyflie + Multiranger backend
+"""
+Fly the Waypoint_Avoid scripts without a radio or a drone.
+
+The scripts run unchanged: run_script() executes them with an import hook
+that hands out simulated `cflib` modules (SyncCrazyflie, PositionHlCommander,
+Multiranger, LogConfig, ...) and a virtual `time` module (plus `threading`
+and `asyncio` running on the same virtual clock). Every sleep()
+advances a point-mass model of the drone instead of waiting, so a full
+`newsequence` mission takes milliseconds of wall time.
+
+    world = World(obstacles=[box(0.7, 0.0, 0.2, 0.6)])
+    report = run_script("Waypoint_Avoid06.py", world)
+    print(report["collisions"], report["min_clearance"], report["sim_time"])
+
+From the shell:
+
+    python -m flight.sim Waypoint_Avoid06.py --box 0.7,0.0,0.2,0.6
+"""
+import argparse
+import ast
+import asyncio
+import builtins
+import contextlib
+import heapq
+import itertools
+import importlib.util
+import io
+import json
+import math
+import os
+import random
+import selectors
+import struct
+import threading as _threading
+import time as _time
+import types
+from collections import namedtuple
+
+from flight.lipo import LIPO_CURVE
+
+Box = namedtuple("Box", "xmin ymin zmin xmax ymax zmax")
+
+# Multiranger log variables and the ray each one measures along (x forward, y left)
+RAYS = {
+    'range.front': (1.0, 0.0, 0.0),
+    'range.back': (-1.0, 0.0, 0.0),
+    'range.left': (0.0, 1.0, 0.0),
+    'range.right': (0.0, -1.0, 0.0),
+    'range.up': (0.0, 0.0, 1.0),
+    'range.zrange': (0.0, 0.0, -1.0),
+}
+OUT_OF_RANGE_MM = 8000      # Multiranger maps >= 8000 mm to None
+GRAVITY = 9.81
+
+
+def box(cx, cy, sx, sy, z0=0.0, z1=2.0):
+    """Axis-aligned obstacle centred on (cx, cy) with footprint sx by sy metres."""
+    return Box(cx - sx / 2.0, cy - sy / 2.0, z0, cx + sx / 2.0, cy + sy / 2.0, z1)
+
+
+def load_obstacles(path):
+    """
+    Obstacle map from JSON: a list of boxes, each either
+    {"center": [cx, cy], "size": [sx, sy], "z": [z0, z1]} or [xmin, ymin, zmin, xmax, ymax, zmax].
+    """
+    with open(path) as f:
+        items = json.load(f)
+    obstacles = []
+    for item in items:
+        if isinstance(item, dict):
+            z0, z1 = item.get("z", (0.0, 2.0))
+            obstacles.append(box(*item["center"], *item["size"], z0=z0, z1=z1))
+        else:
+            obstacles.append(Box(*item))
+    return obstacles
+
+
+def ray_box(origin, direction, b):
+    """Distance along a unit axis ray to box b (slab test), None on a miss."""
+    t_near, t_far = 0.0, math.inf
+    for o, d, lo, hi in zip(origin, direction, b[:3], b[3:]):
+        if d == 0.0:
+            if o < lo or o > hi:
+                return None
+            continue
+        t0, t1 = (lo - o) / d, (hi - o) / d
+        if t0 > t1:
+            t0, t1 = t1, t0
+        t_near, t_far = max(t_near, t0), min(t_far, t1)
+        if t_near > t_far:
+            return None
+    return t_near
+
+
+def box_distance(p, b):
+    """Euclidean distance from point p to box b (0 inside)."""
+    dx = max(b.xmin - p[0], 0.0, p[0] - b.xmax)
+    dy = max(b.ymin - p[1], 0.0, p[1] - b.ymax)
+    dz = max(b.zmin - p[2], 0.0, p[2] - b.zmax)
+    return math.sqrt(dx * dx + dy * dy + dz * dz)
+
+
+# ------------------------------
+# Virtual clock
+# ------------------------------
+
+class VirtualClock:
+    """
+    Stand-in for the `time` module. sleep() advances the world; time(),
+    monotonic() and perf_counter() all read simulated seconds. Anything
+    else (strftime, ...) falls through to the real module.
+
+    Threads started through the simulated `threading` module run in
+    lockstep: a sleep only advances the world once every registered thread
+    is asleep, and then only up to the earliest wake-up, so several link
+    threads share one consistent virtual time.
+    """
+
+    def __init__(self, world, epoch=1_700_000_000.0):
+        self._world = world
+        self._epoch = epoch
+        self._cond = _threading.Condition()
+        self._threads = set()
+        self._sleepers = []         # heap of (wake time, order)
+        self._order = itertools.count()
+
+    def time(self):
+        return self._epoch + self._world.now
+
+    def monotonic(self):
+        return self._world.now
+
+    perf_counter = monotonic
+
+    def time_ns(self):
+        return int(self.time() * 1e9)
+
+    def monotonic_ns(self):
+        return int(self._world.now * 1e9)
+
+    perf_counter_ns = monotonic_ns
+
+    def sleep(self, seconds):
+        if seconds < 0:
+            raise ValueError("sleep length must be non-negative")
+        if not self._threads:
+            self._world.advance(self._world.now + seconds)
+            return
+        me = _threading.current_thread()
+        with self._cond:
+            guest = me not in self._threads
+            if guest:
+                self._threads.add(me)
+            entry = (self._world.now + seconds, next(self._order))
+            heapq.heappush(self._sleepers, entry)
+            self._cond.notify_all()     # this may have been the last one awake
+            while not (len(self._sleepers) == len(self._threads) and self._sleepers[0] is entry):
+                self._cond.wait()
+            heapq.heappop(self._sleepers)
+            self._world.advance(entry[0])
+            if guest:
+                self._threads.discard(me)
+            self._cond.notify_all()
+
+    def _register(self, thread):
+        with self._cond:
+            self._threads.add(thread)
+
+    def _unregister(self, thread):
+        # a finished thread no longer holds the others back
+        with self._cond:
+            self._threads.discard(thread)
+            self._cond.notify_all()
+
+    def __getattr__(self, name):
+        return getattr(_time, name)
+
+
+# ------------------------------
+# Point-mass drone + world
+# ------------------------------
+
+# Poly4D trajectory piece as laid out in the Crazyflie trajectory memory
+POLY4D_FORMAT = '<' + 'f' * 33       # x[8], y[8], z[8], yaw[8], duration
+POLY4D_SIZE = struct.calcsize(POLY4D_FORMAT)
+
+
+def _eval_piece(piece, t):
+    """Position and velocity of an unpacked Poly4D piece (duration last) at local time t."""
+    pos, vel = [], []
+    for axis in range(3):
+        c = piece[axis * 8:axis * 8 + 8]
+        p = v = 0.0
+        for k in range(7, -1, -1):
+            p = p * t + c[k]
+        for k in range(7, 0, -1):
+            v = v * t + k * c[k]
+        pos.append(p)
+        vel.append(v)
+    return pos, vel
+
+
+class Battery:
+    """
+    Crazyflie 250 mAh 1S LiPo. Draws hover_w in the air plus per_m joules
+    per metre flown (idle_w on the ground); pm.vbat is the open-circuit
+    voltage of the charge left (LIPO_CURVE) minus the sag over the cell's
+    resistance, plus a little measurement noise. Empty in the air is a
+    brownout: the motors stop.
+    """
+
+    def __init__(self, capacity_wh=0.925, charge=1.0, resistance=0.1, hover_w=7.5, per_m=1.5, idle_w=0.3,
+                 noise=0.004, seed=None):
+        self.capacity = capacity_wh * 3600.0
+        self.energy = self.capacity * charge
+        self.resistance = resistance
+        self.hover_w = hover_w
+        self.per_m = per_m
+        self.idle_w = idle_w
+        self.noise = noise
+        self.power = idle_w
+        self.rng = random.Random(seed)      # own noise: the world's random sequence stays as it was
+
+    @property
+    def empty(self):
+        return self.energy <= 0.0
+
+    def drain(self, flying, speed, dt):
+        self.power = self.hover_w + self.per_m * speed if flying else self.idle_w
+        self.energy = max(0.0, self.energy - self.power * dt)
+
+    def open_circuit_voltage(self):
+        soc = self.energy / self.capacity
+        for (s0, v0), (s1, v1) in zip(LIPO_CURVE, LIPO_CURVE[1:]):
+            if soc <= s1:
+                return v0 + (v1 - v0) * (soc - s0) / (s1 - s0)
+        return LIPO_CURVE[-1][1]
+
+    def vbat(self):
+        v = self.open_circuit_voltage()
+        return v - self.resistance * self.power / v + self.rng.gauss(0.0, self.noise)
+
+
+class Drone:
+    """Point mass tracking a high-level-commander setpoint with a PD law."""
+
+    def __init__(self, world, uri, position=(0.0, 0.0, 0.0)):
+        self.world = world
+        self.uri = uri
+        self.pos = list(position)
+        self.vel = [0.0, 0.0, 0.0]
+        self.flying = False
+        self.armed = False
+        self._seg = None            # (p0, p1, t0, duration, linear)
+        self._traj = None           # (pieces, t0, time_scale, shift) of a started trajectory
+        self.trajectory_memory = b''
+        self.trajectories = {}      # id -> (byte offset, n pieces)
+        self.memory_writes = 0
+        self._setpoint = list(position)
+        self.log_configs = []
+        self._pending = []          # (apply_time, fn, args) delayed by radio latency
+        self.commands = 0
+        self.distance = 0.0
+        self.collisions = 0
+        self.in_contact = False
+        self.first_collision = None
+        self.min_clearance = math.inf
+        self.battery = Battery(charge=world.charge, seed=uri)
+        self.brownout = None                # when the battery ran out in the air
+
+    def place(self, position):
+        self.pos = list(position)
+        self._setpoint = list(position)
+
+    # ---- high-level commander ----
+
+    def send(self, fn, *args):
+        """Deliver a commander call after the world's radio latency (after the outage, if the link is down)."""
+        delay = max(self.world.command_delay(), self.world.outage_left())
+        if delay <= 0.0:
+            fn(*args)
+        else:
+            self._pending.append((self.world.now + delay, fn, args))
+
+    def command(self, target, duration, linear=False):
+        self.commands += 1
+        self._seg = (list(self.setpoint()[0]), list(target), self.world.now, max(duration, 1e-6), linear)
+        self._traj = None
+
+    def write_memory(self, data):
+        self.memory_writes += 1
+        self.trajectory_memory = bytes(data)
+
+    def define_trajectory(self, trajectory_id, offset, n_pieces):
+        self.commands += 1
+        self.trajectories[trajectory_id] = (offset, n_pieces)
+
+    def start_trajectory(self, trajectory_id, time_scale=1.0, relative=False):
+        self.commands += 1
+        offset, n_pieces = self.trajectories[trajectory_id]
+        pieces = [struct.unpack_from(POLY4D_FORMAT, self.trajectory_memory, offset + i * POLY4D_SIZE)
+                  for i in range(n_pieces)]
+        shift = (0.0, 0.0, 0.0)
+        if relative:
+            shift = [s - p for s, p in zip(self.setpoint()[0], _eval_piece(pieces[0], 0.0)[0])]
+        self._traj = (pieces, self.world.now, max(time_scale, 1e-6), shift)
+
+    def takeoff(self, height, duration):
+        if self.battery.empty:
+            return
+        self.flying = True
+        self._setpoint = list(self.pos)
+        self._seg = None
+        self._traj = None
+        self.command((self.pos[0], self.pos[1], height), duration)
+
+    def stop(self):
+        self.flying = False
+        self._seg = None
+        self._traj = None
+
+    def setpoint(self):
+        """Setpoint position and velocity of the current segment at world time."""
+        if self._traj is not None:
+            return self._trajectory_setpoint()
+        if self._seg is None:
+            return self._setpoint, (0.0, 0.0, 0.0)
+        p0, p1, t0, duration, linear = self._seg
+        s = min(max((self.world.now - t0) / duration, 0.0), 1.0)
+        if linear:
+            shape, rate = s, 1.0 / duration
+        else:
+            shape, rate = s * s * (3.0 - 2.0 * s), 6.0 * s * (1.0 - s) / duration
+        if s >= 1.0:
+            rate = 0.0
+        pos = [a + (b - a) * shape for a, b in zip(p0, p1)]
+        vel = [(b - a) * rate for a, b in zip(p0, p1)]
+        self._setpoint = pos
+        return pos, vel
+
+    def _trajectory_setpoint(self):
+        pieces, t0, scale, shift = self._traj
+        t = max(self.world.now - t0, 0.0) / scale
+        for piece in pieces:
+            duration = piece[-1]
+            if t <= duration or piece is pieces[-1]:
+                pos, vel = _eval_piece(piece, min(t, duration))
+                if t > duration:
+                    vel = (0.0, 0.0, 0.0)
+                break
+            t -= duration
+        pos = [p + d for p, d in zip(pos, shift)]
+        self._setpoint = pos
+        return pos, [v / scale for v in vel]
+
+    # ---- physics ----
+
+    def step(self, dt):
+        if self._pending:
+            due = [c for c in self._pending if c[0] <= self.world.now]
+            if due:
+                self._pending = [c for c in self._pending if c[0] > self.world.now]
+                for _, fn, args in due:
+                    fn(*args)
+        p, v = self.pos, self.vel
+        self.battery.drain(self.flying, math.sqrt(sum(c * c for c in v)), dt)
+        if self.flying and self.battery.empty:
+            self.brownout = self.world.now
+            self.stop()
+        if self.flying:
+            sp, sv = self.setpoint()
+            w = self.world
+            acc = [w.kp * (s - q) + w.kd * (u - r) for s, q, u, r in zip(sp, p, sv, v)]
+            norm = math.sqrt(sum(a * a for a in acc))
+            if norm > w.max_accel:
+                acc = [a * w.max_accel / norm for a in acc]
+        elif p[2] > 0.0:
+            acc = [0.0, 0.0, -GRAVITY]
+        else:
+            self.vel = [0.0, 0.0, 0.0]
+            return
+        for i in range(3):
+            v[i] += acc[i] * dt
+        step = [vi * dt for vi in v]
+        for i in range(3):
+            p[i] += step[i]
+        if p[2] < 0.0:      # floor
+            p[2] = 0.0
+            v[2] = max(v[2], 0.0)
+        self.distance += math.sqrt(sum(s * s for s in step))
+        self._check_clearance()
+
+    def _check_clearance(self):
+        world = self.world
+        if not world.obstacles or self.pos[2] < 0.05:
+            return
+        clearance = min(box_distance(self.pos, b) for b in world.obstacles) - world.radius
+        self.min_clearance = min(self.min_clearance, clearance)
+        contact = clearance <= 0.0
+        if contact and not self.in_contact:
+            self.collisions += 1
+            if self.first_collision is None:
+                self.first_collision = world.now
+        self.in_contact = contact
+
+    # ---- sensors ----
+
+    def range_mm(self, name):
+        """Ray-cast one Multiranger direction against obstacles, other drones (and the floor for zrange)."""
+        world = self.world
+        if world.range_outliers > 0.0 and world.rng.random() < world.range_outliers:
+            return int(world.rng.uniform(0.02, 0.3) * 1000.0)     # spurious short reading
+        if world.range_dropouts > 0.0 and world.rng.random() < world.range_dropouts:
+            return OUT_OF_RANGE_MM
+        direction = RAYS[name]
+        best = self.pos[2] if name == 'range.zrange' else math.inf
+        for b in self.world.obstacles + self.world.drone_boxes(self):
+            t = ray_box(self.pos, direction, b)
+            if t is not None and t < best:
+                best = t
+        if best > self.world.max_range:
+            return OUT_OF_RANGE_MM
+        if self.world.range_noise > 0.0:
+            best = max(0.0, best + self.world.rng.gauss(0.0, self.world.range_noise))
+        return int(round(best * 1000.0))
+
+    def log_value(self, name):
+        if name in RAYS:
+            return self.range_mm(name)
+        if name == 'pm.vbat':
+            return self.battery.vbat()
+        group, _, var = name.partition('.')
+        if group == 'stateEstimate':
+            axis = 'xyz'.find(var[-1])
+            if var in ('x', 'y', 'z'):
+                return self.pos[axis]
+            if var in ('vx', 'vy', 'vz'):
+                return self.vel[axis]
+        raise KeyError(f"Variable {name} not in simulated log TOC")
+
+    def report(self):
+        return {
+            "uri": self.uri,
+            "position": tuple(self.pos),
+            "flying": self.flying,
+            "commands": self.commands,
+            "memory_writes": self.memory_writes,
+            "distance": self.distance,
+            "collisions": self.collisions,
+            "first_collision": self.first_collision,
+            "min_clearance": self.min_clearance,
+            "battery": self.battery.energy / self.battery.capacity,
+            "brownout": self.brownout,
+        }
+
+
+class World:
+    """
+    Obstacle map, drones and the virtual clock they share.
+
+    range_noise: std-dev (m) added to every range reading.
+    range_outliers / range_dropouts: probability of a reading being a
+    spurious short range (2-30 cm) / missing (out of range).
+    latency / latency_jitter: one-way radio delay (s), uniform in
+    [latency, latency + latency_jitter], applied to commander calls on the
+    way up and to log packets on the way down.
+    packet_loss: probability of a log packet being lost on the way down.
+    outage_rate / outage_s: radio outages per second and their mean length
+    (s), both exponential; an outage loses every log packet and holds
+    commander calls back until it ends (the radio retries them).
+    rssi: uplink RSSI (dBm) the link statistics report, 40 dB lower in an outage.
+    charge: battery charge of every drone at connect (0 .. 1, see Battery).
+    """
+
+    def __init__(self, obstacles=(), dt=0.01, max_range=4.0, radius=0.06,
+                 kp=25.0, kd=10.0, max_accel=8.0, range_noise=0.0,
+                 latency=0.0, latency_jitter=0.0, seed=None, range_outliers=0.0, range_dropouts=0.0,
+                 packet_loss=0.0, outage_rate=0.0, outage_s=0.5, rssi=-50.0, charge=1.0):
+        self.obstacles = list(obstacles)
+        self.range_noise = range_noise
+        self.range_outliers = range_outliers
+        self.range_dropouts = range_dropouts
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.packet_loss = packet_loss
+        self.outage_rate = outage_rate
+        self.outage_s = outage_s
+        self.rssi = rssi
+        self.charge = charge
+        self._outage = (0.0, 0.0)          # (start, end) of the current or next outage
+        self.rng = random.Random(seed)
+        self.dt = dt
+        self.max_range = max_range
+        self.radius = radius
+        self.kp = kp
+        self.kd = kd
+        self.max_accel = max_accel
+        self.now = 0.0
+        self.clock = VirtualClock(self)
+        self.drones = {}
+        self.min_separation = math.inf      # closest gap between two airborne drones
+        self.drone_collisions = 0
+        self._touching = set()
+
+    def drone(self, uri, position=(0.0, 0.0, 0.0)):
+        """Drone answering on uri (created on first connect)."""
+        if uri not in self.drones:
+            self.drones[uri] = Drone(self, uri, position)
+        return self.drones[uri]
+
+    def command_delay(self):
+        if self.latency_jitter > 0.0:
+            return self.latency + self.rng.uniform(0.0, self.latency_jitter)
+        return self.latency
+
+    def outage_left(self):
+        """Seconds until the current radio outage ends (0 while the link is up)."""
+        if self.outage_rate <= 0.0:
+            return 0.0
+        while self.now >= self._outage[1]:
+            start = self._outage[1] + self.rng.expovariate(self.outage_rate)
+            self._outage = (start, start + self.rng.expovariate(1.0 / self.outage_s))
+        return self._outage[1] - self.now if self.now >= self._outage[0] else 0.0
+
+    def packet_lost(self):
+        if self.outage_left() > 0.0:
+            return True
+        return self.packet_loss > 0.0 and self.rng.random() < self.packet_loss
+
+    def advance(self, until):
+        """Step physics and deliver due log packets up to time `until`."""
+        while self.now < until - 1e-12:
+            dt = min(self.dt, until - self.now)
+            self.now += dt
+            for drone in self.drones.values():
+                drone.step(dt)
+                for conf in list(drone.log_configs):
+                    conf._poll(self.now)
+            if len(self.drones) > 1:
+                self._check_separation()
+
+    def drone_boxes(self, me):
+        """Every other airborne drone as a small box (what a ranger sees of it)."""
+        r = self.radius
+        return [Box(d.pos[0] - r, d.pos[1] - r, d.pos[2] - r, d.pos[0] + r, d.pos[1] + r, d.pos[2] + r)
+                for d in self.drones.values() if d is not me and d.pos[2] >= 0.05]
+
+    def _check_separation(self):
+        airborne = [d for d in self.drones.values() if d.pos[2] >= 0.05]
+        for i, a in enumerate(airborne):
+            for b in airborne[i + 1:]:
+                gap = math.dist(a.pos, b.pos) - 2.0 * self.radius
+                self.min_separation = min(self.min_separation, gap)
+                pair = (a.uri, b.uri)
+                if gap <= 0.0:
+                    if pair not in self._touching:
+                        self.drone_collisions += 1
+                        self._touching.add(pair)
+                else:
+                    self._touching.discard(pair)
+
+    def report(self):
+        drones = [d.report() for d in self.drones.values()]
+        out = {
+            "sim_time": self.now,
+            "collisions": sum(d["collisions"] for d in drones),
+            "min_clearance": min((d["min_clearance"] for d in drones), default=math.inf),
+            "drones": drones,
+        }
+        if len(drones) == 1:
+            out.update({k: v for k, v in drones[0].items() if k not in out})
+        else:
+            out["drone_collisions"] = self.drone_collisions
+            out["min_separation"] = self.min_separation
+        return out
+
+
+# ------------------------------
+# cflib surface
+# ------------------------------
+
+class Caller:
+    """Same interface as cflib.utils.callbacks.Caller."""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def add_callback(self, cb):
+        if cb not in self.callbacks:
+            self.callbacks.append(cb)
+
+    def remove_callback(self, cb):
+        self.callbacks.remove(cb)
+
+    def call(self, *args):
+        for cb in list(self.callbacks):
+            cb(*args)
+
+
+class LogConfig:
+    """Simulated cflib.crazyflie.log.LogConfig, fed from the drone model."""
+
+    def __init__(self, name, period_in_ms):
+        self.name = name
+        self.period_in_ms = period_in_ms
+        self.variables = []
+        self.data_received_cb = Caller()
+        self.error_cb = Caller()
+        self.started_cb = Caller()
+        self.added_cb = Caller()
+        self.cf = None
+        self.started = False
+        self.added = False
+        self._next = None
+
+    def add_variable(self, name, fetch_as=None):
+        self.variables.append(name)
+
+    def create(self):
+        pass
+
+    def start(self):
+        if self.cf is None:
+            raise AttributeError("LogConfig must be added to a Crazyflie before it is started")
+        self.started = True
+        self._next = self.cf._drone.world.now + self.period_in_ms / 1000.0
+        self.started_cb.call(self, True)
+
+    def stop(self):
+        self.started = False
+
+    def delete(self):
+        self.stop()
+        if self.cf is not None and self in self.cf._drone.log_configs:
+            self.cf._drone.log_configs.remove(self)
+
+    def _poll(self, now):
+        if not self.started or now + 1e-9 < self._next:
+            return
+        self._next += self.period_in_ms / 1000.0
+        drone = self.cf._drone
+        data = {name: drone.log_value(name) for name in self.variables}
+        if drone.world.packet_lost():
+            return
+        # Measured now, seen by the host after the radio hop back
+        drone.send(self.data_received_cb.call, int(now * 1000), data, self)
+
+
+class _Log:
+    def __init__(self, cf):
+        self._cf = cf
+
+    def add_config(self, logconf):
+        for name in logconf.variables:
+            self._cf._drone.log_value(name)    # KeyError like a missing TOC entry
+        logconf.cf = self._cf
+        logconf.added = True
+        self._cf._drone.log_configs.append(logconf)
+        logconf.added_cb.call(logconf, True)
+
+
+class _Latency:
+    """cflib link-statistics latency: p95 ping round trip (ms) once a second."""
+
+    def __init__(self, cf):
+        self._cf = cf
+        self.latency_updated = Caller()
+        self.latency = 0.0
+        self._next = None
+
+    def _poll(self, now):
+        if self._next is not None and now + 1e-9 < self._next:
+            return
+        self._next = now + 1.0
+        world = self._cf._drone.world
+        if world.outage_left() > 0.0:
+            return                  # no ping comes back
+        self.latency = 2000.0 * (world.latency + 0.95 * world.latency_jitter)
+        self.latency_updated.call(self.latency)
+
+
+class _LinkStatistics:
+    """cflib link statistics: latency, plus link quality (%) and uplink RSSI (dBm) once a second."""
+
+    def __init__(self, cf):
+        self._cf = cf
+        self.latency = _Latency(cf)
+        self.link_quality_updated = Caller()
+        self.uplink_rssi_updated = Caller()
+        self._next = None
+
+    def _poll(self, now):
+        self.latency._poll(now)
+        if self._next is not None and now + 1e-9 < self._next:
+            return
+        self._next = now + 1.0
+        world = self._cf._drone.world
+        down = world.outage_left() > 0.0
+        self.link_quality_updated.call(0.0 if down else 100.0 * (1.0 - world.packet_loss))
+        self.uplink_rssi_updated.call(world.rssi - 40.0 if down else world.rssi)
+
+
+class _Platform:
+    def __init__(self, cf):
+        self._cf = cf
+
+    def send_arming_request(self, do_arm):
+        self._cf._drone.armed = bool(do_arm)
+
+
+class _Param:
+    def __init__(self):
+        self.values = {}
+
+    def set_value(self, complete_name, value):
+        self.values[complete_name] = value
+
+
+class MemoryElement:
+    TYPE_TRAJ = 0x12
+
+
+class Poly:
+    def __init__(self, values=None):
+        self.values = list(values) if values is not None else [0.0] * 8
+
+
+class Poly4D:
+    def __init__(self, duration, x=None, y=None, z=None, yaw=None):
+        self.duration = duration
+        self.x = x or Poly()
+        self.y = y or Poly()
+        self.z = z or Poly()
+        self.yaw = yaw or Poly()
+
+
+class _TrajectoryMemory:
+    """Simulated trajectory memory: packs pieces like cflib and writes them in one go."""
+
+    type = MemoryElement.TYPE_TRAJ
+    size = 4096
+
+    def __init__(self, cf):
+        self._cf = cf
+        self.trajectory = []
+
+    def _pack(self):
+        data = b''
+        for piece in self.trajectory:
+            for poly in (piece.x, piece.y, piece.z, piece.yaw):
+                data += struct.pack('<ffffffff', *poly.values)
+            data += struct.pack('<f', piece.duration)
+        return data
+
+    def write_data_sync(self, start_addr=0):
+        data = self._pack()
+        if start_addr + len(data) > self.size:
+            return False
+        drone = self._cf._drone
+        drone.send(drone.write_memory, data)
+        return True
+
+    def write_data(self, write_finished_cb, write_failed_cb=None, start_addr=0):
+        if self.write_data_sync(start_addr):
+            write_finished_cb(self, start_addr)
+        elif write_failed_cb is not None:
+            write_failed_cb(self, start_addr)
+
+
+class _Mem:
+    def __init__(self, cf):
+        self._trajectory = _TrajectoryMemory(cf)
+
+    def get_mems(self, type):
+        return [self._trajectory] if type == MemoryElement.TYPE_TRAJ else []
+
+
+class _HighLevelCommander:
+    ALL_GROUPS = 0
+    TRAJECTORY_TYPE_POLY4D = 0
+
+    def __init__(self, cf):
+        self._cf = cf
+
+    def takeoff(self, absolute_height_m, duration_s, group_mask=ALL_GROUPS, yaw=0.0):
+        drone = self._cf._drone
+        drone.send(drone.takeoff, absolute_height_m, duration_s)
+
+    def land(self, absolute_height_m, duration_s, group_mask=ALL_GROUPS, yaw=0.0):
+        drone = self._cf._drone
+        drone.send(self._land, drone, absolute_height_m, duration_s)
+
+    @staticmethod
+    def _land(drone, height, duration_s):
+        x, y, _ = drone.setpoint()[0]
+        drone.command((x, y, height), duration_s)
+
+    def stop(self, group_mask=ALL_GROUPS):
+        drone = self._cf._drone
+        drone.send(drone.stop)
+
+    def go_to(self, x, y, z, yaw, duration_s, relative=False, linear=False, group_mask=ALL_GROUPS):
+        drone = self._cf._drone
+        drone.send(self._go_to, drone, (x, y, z), duration_s, relative, linear)
+
+    def define_trajectory(self, trajectory_id, offset, n_pieces, type=TRAJECTORY_TYPE_POLY4D):
+        drone = self._cf._drone
+        drone.send(drone.define_trajectory, trajectory_id, offset, n_pieces)
+
+    def start_trajectory(self, trajectory_id, time_scale=1.0, relative=False, reversed=False,
+                         group_mask=ALL_GROUPS):
+        if reversed:
+            raise NotImplementedError("reversed trajectories are not simulated")
+        drone = self._cf._drone
+        drone.send(drone.start_trajectory, trajectory_id, time_scale, relative)
+
+    @staticmethod
+    def _go_to(drone, target, duration_s, relative, linear):
+        if relative:
+            target = [s + t for s, t in zip(drone.setpoint()[0], target)]
+        drone.command(target, duration_s, linear)
+
+
+class SimCrazyflie:
+    """Simulated cflib.crazyflie.Crazyflie; bound to a drone when its link opens."""
+
+    world = None
+
+    def __init__(self, link=None, ro_cache=None, rw_cache=None):
+        self._drone = None
+        self.link_uri = None
+        self.platform = _Platform(self)
+        self.param = _Param()
+        self.log = _Log(self)
+        self.mem = _Mem(self)
+        self.link_statistics = _LinkStatistics(self)
+        self.high_level_commander = _HighLevelCommander(self)
+
+    def open_link(self, link_uri):
+        self.link_uri = link_uri
+        self._drone = self.world.drone(link_uri)
+        self._drone.log_configs.append(self.link_statistics)     # polled like a log block
+
+    def close_link(self):
+        self.link_uri = None
+
+    def is_connected(self):
+        return self.link_uri is not None
+
+
+class SimSyncCrazyflie:
+    """Simulated cflib.crazyflie.syncCrazyflie.SyncCrazyflie."""
+
+    crazyflie_class = SimCrazyflie
+
+    def __init__(self, link_uri, cf=None):
+        self._link_uri = link_uri
+        self.cf = cf if cf is not None else self.crazyflie_class()
+
+    def open_link(self):
+        self.cf.open_link(self._link_uri)
+
+    def close_link(self):
+        self.cf.close_link()
+
+    def is_link_open(self):
+        return self.cf.is_connected()
+
+    def __enter__(self):
+        self.open_link()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close_link()
+
+
+class SimPositionHlCommander:
+    """Mirror of cflib's PositionHlCommander (blocking go_to) on the virtual clock."""
+
+    CONTROLLER_PID = 1
+    CONTROLLER_MELLINGER = 2
+
+    DEFAULT = None
+
+    clock = _time
+
+    def __init__(self, crazyflie, x=0.0, y=0.0, z=0.0, default_velocity=0.5,
+                 default_height=0.5, controller=None, default_landing_height=0.0):
+        self._cf = getattr(crazyflie, "cf", crazyflie)
+        self._default_velocity = default_velocity
+        self._default_height = default_height
+        self._controller = controller
+        if controller is not None:
+            self._cf.param.set_value('stabilizer.controller', str(controller))
+        self._hl_commander = self._cf.high_level_commander
+        self._x = x
+        self._y = y
+        self._z = z
+        drone = self._cf._drone
+        if drone is not None and not drone.flying and drone.distance == 0.0:
+            drone.place((x, y, z))      # a drone that has not moved sits where it is said to start
+        self._is_flying = False
+        self._init_time = self.clock.time()
+        self._default_landing_height = default_landing_height
+
+    def take_off(self, height=DEFAULT, velocity=DEFAULT):
+        if self._is_flying:
+            raise Exception('Already flying')
+        if not self._cf.is_connected():
+            raise Exception('Crazyflie is not connected')
+        hold_back = self._init_time + 1.0 - self.clock.time()
+        if hold_back > 0.0:
+            self.clock.sleep(hold_back)
+        self._is_flying = True
+        height = self._height(height)
+        duration_s = height / self._velocity(velocity)
+        self._hl_commander.takeoff(height, duration_s)
+        self.clock.sleep(duration_s)
+        self._z = height
+
+    def land(self, velocity=DEFAULT, landing_height=DEFAULT):
+        if self._is_flying:
+            landing_height = self._landing_height(landing_height)
+            duration_s = (self._z - landing_height) / self._velocity(velocity)
+            self._hl_commander.land(landing_height, duration_s)
+            self.clock.sleep(duration_s)
+            self._z = landing_height
+            self._hl_commander.stop()
+            self._is_flying = False
+
+    def __enter__(self):
+        self.take_off()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.land()
+
+    def go_to(self, x, y, z=DEFAULT, velocity=DEFAULT):
+        z = self._height(z)
+        dx, dy, dz = x - self._x, y - self._y, z - self._z
+        distance = math.sqrt(dx * dx + dy * dy + dz * dz)
+        if distance > 0.0:
+            duration_s = distance / self._velocity(velocity)
+            self._hl_commander.go_to(x, y, z, 0, duration_s)
+            self.clock.sleep(duration_s)
+            self._x, self._y, self._z = x, y, z
+
+    def move_distance(self, distance_x_m, distance_y_m, distance_z_m, velocity=DEFAULT):
+        self.go_to(self._x + distance_x_m, self._y + distance_y_m,
+                   self._z + distance_z_m, velocity)
+
+    def set_default_velocity(self, velocity):
+        self._default_velocity = velocity
+
+    def set_default_height(self, height):
+        self._default_height = height
+
+    def get_position(self):
+        return self._x, self._y, self._z
+
+    def _velocity(self, velocity):
+        return self._default_velocity if velocity is self.DEFAULT else velocity
+
+    def _height(self, height):
+        return self._default_height if height is self.DEFAULT else height
+
+    def _landing_height(self, height):
+        return self._default_landing_height if height is self.DEFAULT else height
+
+
+class SimMultiranger:
+    """Mirror of cflib.utils.multiranger.Multiranger on a simulated LogConfig."""
+
+    FRONT = 'range.front'
+    BACK = 'range.back'
+    LEFT = 'range.left'
+    RIGHT = 'range.right'
+    UP = 'range.up'
+    DOWN = 'range.zrange'
+
+    def __init__(self, crazyflie, rate_ms=100, zranger=False):
+        self._cf = getattr(crazyflie, "cf", crazyflie)
+        self._log_config = LogConfig('multiranger', rate_ms)
+        for name in (self.FRONT, self.BACK, self.LEFT, self.RIGHT, self.UP, self.DOWN):
+            self._log_config.add_variable(name)
+        self._log_config.data_received_cb.add_callback(self._data_received)
+        self._up_distance = None
+        self._front_distance = None
+        self._back_distance = None
+        self._left_distance = None
+        self._right_distance = None
+        self._down_distance = None
+
+    def start(self):
+        self._cf.log.add_config(self._log_config)
+        self._log_config.start()
+
+    def stop(self):
+        self._log_config.delete()
+
+    @staticmethod
+    def _convert_log_to_distance(data):
+        return None if data >= OUT_OF_RANGE_MM else data / 1000.0
+
+    def _data_received(self, timestamp, data, logconf):
+        self._up_distance = self._convert_log_to_distance(data[self.UP])
+        self._front_distance = self._convert_log_to_distance(data[self.FRONT])
+        self._back_distance = self._convert_log_to_distance(data[self.BACK])
+        self._left_distance = self._convert_log_to_distance(data[self.LEFT])
+        self._right_distance = self._convert_log_to_distance(data[self.RIGHT])
+        if self.DOWN in data:
+            self._down_distance = self._convert_log_to_distance(data[self.DOWN])
+
+    up = property(lambda self: self._up_distance)
+    front = property(lambda self: self._front_distance)
+    back = property(lambda self: self._back_distance)
+    left = property(lambda self: self._left_distance)
+    right = property(lambda self: self._right_distance)
+    down = property(lambda self: self._down_distance)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def _uri_from_env(env='CFLIB_URI', default='radio://0/80/2M/E7E7E7E7E7'):
+    return os.environ.get(env, default)
+
+
+def threading_module(clock):
+    """
+    `threading` whose Thread runs in lockstep with the virtual clock. The
+    thread that starts one joins the lockstep too (otherwise the new thread
+    could run the world ahead while it is busy), and join() steps out of it
+    while waiting.
+    """
+
+    class Thread(_threading.Thread):
+        def start(self):
+            clock._register(_threading.current_thread())
+            clock._register(self)
+            run = self.run
+
+            def lockstep_run():
+                try:
+                    run()
+                finally:
+                    clock._unregister(self)
+
+            self.run = lockstep_run
+            try:
+                super().start()
+            except BaseException:
+                clock._unregister(self)
+                raise
+
+        def join(self, timeout=None):
+            me = _threading.current_thread()
+            registered = me in clock._threads
+            if registered:
+                clock._unregister(me)
+            try:
+                super().join(timeout)
+            finally:
+                if registered:
+                    clock._register(me)
+
+    mod = types.ModuleType('threading')
+    mod.__getattr__ = lambda name: getattr(_threading, name)
+    mod.Thread = Thread
+    return mod
+
+
+class VirtualSelector(selectors.BaseSelector):
+    """
+    Selector of the simulated event loop. Host file descriptors (the loop's
+    self-pipe) are only polled; waiting advances the world instead by at
+    most one physics step per call, so the tasks see a log packet that
+    arrived meanwhile at its simulated arrival time.
+    """
+
+    def __init__(self, world):
+        self._world = world
+        self._selector = selectors.DefaultSelector()
+
+    def register(self, fileobj, events, data=None):
+        return self._selector.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        return self._selector.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        return self._selector.modify(fileobj, events, data)
+
+    def get_map(self):
+        return self._selector.get_map()
+
+    def close(self):
+        self._selector.close()
+
+    def select(self, timeout=None):
+        ready = self._selector.select(0)
+        if not ready and (timeout is None or timeout > 1e-12):
+            self._world.clock.sleep(self._world.dt if timeout is None else min(self._world.dt, timeout))
+            ready = self._selector.select(0)
+        return ready
+
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    """
+    asyncio event loop on the world's virtual clock. run_in_executor runs
+    the call inline: simulated cflib calls never block the host, and a
+    worker thread would make runs non-deterministic.
+    """
+
+    def __init__(self, world):
+        super().__init__(VirtualSelector(world))
+        self._world = world
+
+    def time(self):
+        return self._world.now
+
+    def run_in_executor(self, executor, func, *args):
+        future = self.create_future()
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def asyncio_module(world):
+    """`asyncio` whose run() and new_event_loop() give VirtualEventLoops."""
+    mod = types.ModuleType('asyncio')
+    mod.__getattr__ = lambda name: getattr(asyncio, name)
+    mod.new_event_loop = lambda: VirtualEventLoop(world)
+
+    def run(main, *, debug=None):
+        with asyncio.Runner(debug=debug, loop_factory=mod.new_event_loop) as runner:
+            return runner.run(main)
+
+    mod.run = run
+    return mod
+
+
+def cflib_modules(world):
+    """Simulated `cflib` module tree (and `time`, `threading`, `asyncio`) bound to one world."""
+    crazyflie_cls = type("Crazyflie", (SimCrazyflie,), {"world": world})
+    sync_cls = type("SyncCrazyflie", (SimSyncCrazyflie,), {"crazyflie_class": crazyflie_cls})
+    commander_cls = type("PositionHlCommander", (SimPositionHlCommander,), {"clock": world.clock})
+
+    def module(name, **attrs):
+        m = types.ModuleType(name)
+        m.__dict__.update(attrs)
+        return m
+
+    mods = {
+        'cflib': module('cflib'),
+        'cflib.crtp': module('cflib.crtp', init_drivers=lambda *a, **k: None),
+        'cflib.crazyflie': module('cflib.crazyflie', Crazyflie=crazyflie_cls),
+        'cflib.crazyflie.syncCrazyflie': module('cflib.crazyflie.syncCrazyflie', SyncCrazyflie=sync_cls),
+        'cflib.crazyflie.log': module('cflib.crazyflie.log', LogConfig=LogConfig),
+        'cflib.crazyflie.mem': module('cflib.crazyflie.mem', MemoryElement=MemoryElement, Poly=Poly,
+                                      Poly4D=Poly4D),
+        'cflib.positioning': module('cflib.positioning'),
+        'cflib.positioning.position_hl_commander': module(
+            'cflib.positioning.position_hl_commander', PositionHlCommander=commander_cls),
+        'cflib.utils': module('cflib.utils'),
+        'cflib.utils.uri_helper': module('cflib.utils.uri_helper', uri_from_env=_uri_from_env),
+        'cflib.utils.multiranger': module('cflib.utils.multiranger', Multiranger=SimMultiranger),
+        'cflib.utils.callbacks': module('cflib.utils.callbacks', Caller=Caller),
+    }
+    for name, mod in mods.items():
+        parent, _, child = name.rpartition('.')
+        if parent:
+            setattr(mods[parent], child, mod)
+    mods['time'] = world.clock
+    mods['threading'] = threading_module(world.clock)
+    mods['asyncio'] = asyncio_module(world)
+    return mods
+
+
+# ------------------------------
+# Sandboxed script loading
+# ------------------------------
+
+_code_cache = {}
+
+
+def _compile(path):
+    mtime = os.path.getmtime(path)
+    cached = _code_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, encoding="utf-8") as f:
+            cached = (mtime, compile(f.read(), path, "exec"))
+        _code_cache[path] = cached
+    return cached[1]
+
+
+def _is_main_guard(node):
+    """`if __name__ == "__main__":` at module level."""
+    test = node.test if isinstance(node, ast.If) else None
+    return (isinstance(test, ast.Compare) and isinstance(test.left, ast.Name)
+            and test.left.id == "__name__" and len(test.comparators) == 1
+            and isinstance(test.comparators[0], ast.Constant) and test.comparators[0].value == "__main__")
+
+
+def _compile_with(path, overrides):
+    """
+    Script code with `NAME = value` inserted right before its main block, so
+    a run can change module-level settings (thresholds, rates) without
+    editing the file. Names the script does not assign at module level go
+    into its SETTINGS dict (mission settings, see flight/mission) if it has one.
+    """
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    assigned = {t.id for node in tree.body if isinstance(node, ast.Assign)
+                for t in node.targets if isinstance(t, ast.Name)}
+    unknown = set(overrides) - assigned
+    if unknown and "SETTINGS" not in assigned:
+        raise ValueError(f"{os.path.basename(path)} has no module-level setting {', '.join(sorted(unknown))}")
+    at = next((i for i, node in enumerate(tree.body) if _is_main_guard(node)), len(tree.body))
+    tree.body[at:at] = [ast.parse(f"{name if name in assigned else f'SETTINGS[{name!r}]'} = {value!r}").body[0]
+                        for name, value in overrides.items()]
+    return compile(ast.fix_missing_locations(tree), path, "exec")
+
+
+class Sandbox:
+    """
+    Import hook for one simulated run. `cflib.*`, `time`, `threading` and
+    `asyncio` resolve to the simulated modules; modules living next to the
+    script (the `flight` package) are loaded as fresh copies under the same
+    hook so they see the virtual clock too. Everything else is imported
+    normally.
+    """
+
+    def __init__(self, world, root, extra_modules=None):
+        self.root = os.path.abspath(root)
+        self.fake = cflib_modules(world)
+        self.fake.update(extra_modules or {})
+        self.local = {}
+        self.builtins = dict(builtins.__dict__, __import__=self.import_)
+
+    def _local_path(self, name):
+        base = os.path.join(self.root, *name.split('.'))
+        if os.path.isfile(os.path.join(base, "__init__.py")):
+            return os.path.join(base, "__init__.py"), True
+        if os.path.isfile(base + ".py"):
+            return base + ".py", False
+        return None, False
+
+    def _load_local(self, name):
+        if name in self.local:
+            return self.local[name]
+        parent, _, child = name.rpartition('.')
+        parent_mod = self._load_local(parent) if parent else None
+        path, is_pkg = self._local_path(name)
+        if path is None:
+            raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+        mod = types.ModuleType(name)
+        mod.__file__ = path
+        mod.__builtins__ = self.builtins
+        mod.__package__ = name if is_pkg else parent
+        if is_pkg:
+            mod.__path__ = [os.path.dirname(path)]
+        self.local[name] = mod
+        exec(_compile(path), mod.__dict__)
+        if parent_mod is not None:
+            setattr(parent_mod, child, mod)
+        return mod
+
+    def _resolve(self, name):
+        if name in self.fake:
+            return self.fake[name]
+        if name.partition('.')[0] in self.fake:
+            raise ModuleNotFoundError(f"No simulated module named '{name}'", name=name)
+        return self._load_local(name)
+
+    def import_(self, name, globals=None, locals=None, fromlist=(), level=0):
+        absolute = name
+        if level:
+            package = (globals or {}).get('__package__') or ''
+            absolute = importlib.util.resolve_name('.' * level + name, package)
+        top = absolute.partition('.')[0]
+        if top not in self.fake and self._local_path(top)[0] is None:
+            return builtins.__import__(name, globals, locals, fromlist, level)
+
+        parts = absolute.split('.')
+        for i in range(1, len(parts) + 1):
+            leaf = self._resolve('.'.join(parts[:i]))
+        if not fromlist:
+            return self._resolve(top)
+        for item in fromlist:
+            if item != '*' and not hasattr(leaf, item):
+                with contextlib.suppress(ModuleNotFoundError):
+                    self._resolve(f"{absolute}.{item}")
+        return leaf
+
+    def run(self, path, run_name="__main__", overrides=None):
+        """Execute a script inside the sandbox (see _compile_with for overrides); returns its globals."""
+        path = os.path.abspath(path)
+        namespace = {"__name__": run_name, "__file__": path, "__builtins__": self.builtins}
+        exec(_compile_with(path, overrides) if overrides else _compile(path), namespace)
+        return namespace
+
+
+def load_script(path, world, extra_modules=None):
+    """Import a Waypoint_Avoid script against the simulator without running its main block."""
+    sandbox = Sandbox(world, os.path.dirname(os.path.abspath(path)), extra_modules)
+    return types.SimpleNamespace(**sandbox.run(path, run_name="sim_script"))
+
+
+def run_script(path, world, quiet=True, extra_modules=None, overrides=None):
+    """
+    Fly a whole Waypoint_Avoid script in the simulator and return the world
+    report. overrides: {setting: value} for module-level settings of the script.
+    """
+    sandbox = Sandbox(world, os.path.dirname(os.path.abspath(path)), extra_modules)
+    out = io.StringIO()
+    started = _time.perf_counter()
+    with contextlib.redirect_stdout(out) if quiet else contextlib.nullcontext():
+        sandbox.run(path, overrides=overrides)
+    report = world.report()
+    report["wall_time"] = _time.perf_counter() - started
+    report["output"] = out.getvalue()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fly a Waypoint_Avoid script in the simulator")
+    parser.add_argument("script")
+    parser.add_argument("--box", action="append", default=[],
+                        help="obstacle as cx,cy,sx,sy (repeatable)")
+    parser.add_argument("--obstacles", help="JSON obstacle map (see load_obstacles)")
+    parser.add_argument("--outliers", type=float, default=0.0, help="probability of a spurious short range")
+    parser.add_argument("--dropouts", type=float, default=0.0, help="probability of a missing range")
+    parser.add_argument("--loss", type=float, default=0.0, help="probability of a lost log packet")
+    parser.add_argument("--outages", type=float, default=0.0, help="radio outages per second (0.5 s on average)")
+    parser.add_argument("--charge", type=float, default=1.0, help="battery charge at take-off (0 .. 1)")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the sensor faults")
+    parser.add_argument("--verbose", action="store_true", help="show the script's own output")
+    args = parser.parse_args()
+
+    obstacles = load_obstacles(args.obstacles) if args.obstacles else []
+    obstacles += [box(*map(float, spec.split(","))) for spec in args.box]
+    world = World(obstacles, range_outliers=args.outliers, range_dropouts=args.dropouts, seed=args.seed,
+                  packet_loss=args.loss, outage_rate=args.outages, charge=args.charge)
+    report = run_script(args.script, world, quiet=not args.verbose)
+    report.pop("output")
+    drones = report.pop("drones")
+    for key, value in report.items():
+        print(f"{key:>16}: {value}")
+    if len(drones) > 1:
+        for d in drones:
+            print(f"{d['uri']}: collisions {d['collisions']}, min_clearance {d['min_clearance']:.3f}, "
+                  f"distance {d['distance']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
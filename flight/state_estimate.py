@@ -0,0 +1,106 @@
+# Pose estimate subscription (stateEstimate log block)
+"""
+Where the drone is, not where it was last told to go.
+
+PositionHlCommander only remembers its last commanded setpoint. This
+subscribes to the on-board Kalman estimate (stateEstimate.x/y/z and
+vx/vy/vz) through a log config, the same way Multiranger does for the
+ranging deck, and keeps the newest sample for the avoidance logic:
+
+    with StateEstimate(scf) as state:
+        x, y, z = state.position()
+        x, y, z = state.predict(latency)    # where it will be when a command lands
+"""
+import time
+from collections import namedtuple
+
+from cflib.crazyflie.log import LogConfig
+
+POSITION = ('stateEstimate.x', 'stateEstimate.y', 'stateEstimate.z')
+VELOCITY = ('stateEstimate.vx', 'stateEstimate.vy', 'stateEstimate.vz')
+
+# seq: running sample number, t: host arrival time (monotonic s),
+# stamp: Crazyflie log timestamp (ms), position (m) and velocity (m/s)
+PoseSample = namedtuple("PoseSample", "seq t stamp x y z vx vy vz")
+
+
+class StateEstimate:
+    """
+    Latest pose estimate in a double buffer.
+
+    The log callback fills the slot readers are not looking at and then
+    publishes it by flipping the index. Samples are immutable tuples and the
+    flip is a single assignment, so readers never take a lock and never see
+    a half-written sample; every read is O(1).
+    """
+
+    def __init__(self, crazyflie, rate_ms=20, clock=time.monotonic):
+        self._cf = getattr(crazyflie, "cf", crazyflie)
+        self._clock = clock
+        self._slots = [None, None]
+        self._front = 0
+        self.seq = 0
+        self._log_config = LogConfig('stateEstimate', rate_ms)
+        for name in POSITION + VELOCITY:
+            self._log_config.add_variable(name, 'float')
+        self._log_config.data_received_cb.add_callback(self._data_received)
+
+    def start(self):
+        self._cf.log.add_config(self._log_config)
+        self._log_config.start()
+
+    def stop(self):
+        self._log_config.delete()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _data_received(self, timestamp, data, logconf):
+        self.seq += 1
+        back = 1 - self._front
+        self._slots[back] = PoseSample(self.seq, self._clock(), timestamp,
+                                       *(data[name] for name in POSITION + VELOCITY))
+        self._front = back
+
+    # ---- reading ----
+
+    def latest(self):
+        """Newest sample or None before the first log packet."""
+        return self._slots[self._front]
+
+    def age(self, sample=None):
+        """Seconds since the sample (default: newest) arrived; inf when there is none."""
+        if sample is None:
+            sample = self.latest()
+        if sample is None:
+            return float("inf")
+        return self._clock() - sample.t
+
+    def position(self):
+        """(x, y, z) of the newest sample, or None before the first one."""
+        sample = self.latest()
+        if sample is None:
+            return None
+        return sample.x, sample.y, sample.z
+
+    def velocity(self):
+        sample = self.latest()
+        if sample is None:
+            return None
+        return sample.vx, sample.vy, sample.vz
+
+    def predict(self, latency=0.0, sample=None):
+        """
+        Constant-velocity extrapolation of the position `latency` seconds
+        from now, counting the age of the sample too. None before the first one.
+        """
+        if sample is None:
+            sample = self.latest()
+        if sample is None:
+            return None
+        dt = self._clock() - sample.t + latency
+        return sample.x + sample.vx * dt, sample.y + sample.vy * dt, sample.z + sample.vz * dt
@@ -0,0 +1,248 @@
+# Multi-drone swarm runner (one thread per link, shared radio)
+"""
+Fly a configured mission (flight/mission) on several drones at once.
+
+Every drone gets its own thread: it opens its link, waits until all links
+are up, then flies its own copy of the mission engine, control loop and
+avoidance policy included, at its own rate. A drone that is slow (bad
+link, long bypass) only delays itself. Commander packets from all drones
+go through one RadioScheduler, which spaces them out so a single
+Crazyradio is never asked for more than it can carry:
+
+    missions = [DroneMission(uri, waypoints, origin=(0.0, y, 0.0)) for uri, y in ...]
+    results = Swarm(missions).run()
+
+With a shared Deconfliction service every drone publishes its pose each
+tick and checks its next stretch of path against the others, so it gives
+way to another drone before its Multiranger ever sees it.
+"""
+import math
+import threading
+import time
+
+from cflib.crazyflie import Crazyflie
+from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
+
+from flight.bypass import BypassManeuver
+from flight.mission.engine import Mission
+from flight.telemetry import FRONT_OBSTACLE, HOLD
+
+
+class RadioScheduler:
+    """
+    Packet pacing for links sharing one Crazyradio.
+
+    Callers get send slots first come, first served, at most `rate_hz` per
+    second across all links. Waiting for a slot costs one drone at most a
+    few slot lengths; it never blocks the others.
+    """
+
+    def __init__(self, rate_hz=400, clock=time.monotonic, sleep=time.sleep):
+        self.interval = 1.0 / rate_hz
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._next = 0.0
+        self.sent = 0
+        self.waited = 0.0
+
+    def slot(self):
+        """Block until this caller may put one packet on the air."""
+        with self._lock:
+            now = self._clock()
+            at = max(now, self._next)
+            self._next = at + self.interval
+            self.sent += 1
+            self.waited += at - now
+        if at > now:
+            self._sleep(at - now)
+
+
+class DroneMission(Mission):
+    """
+    One drone's flight of a configured mission (flight/mission), on its
+    own route: waypoints are (x, y, z, duration) in the shared frame and
+    origin is where the drone sits before takeoff. settings override the
+    mission's own; the mission's avoidance policy must be "bypass". Only
+    two things are added to the single-drone flight: deconfliction and
+    the shared radio.
+
+    With a deconfliction service, every tick publishes the drone's pose
+    and checks the next `lookahead` seconds of the leg against the other
+    drones. A drone that has to give way holds its setpoint (the leg's
+    clock stopped) while the other drone crosses. It sidesteps instead,
+    with the policy's bypass, when the other drone is in its way ahead or
+    the hold lasts longer than max_hold seconds.
+
+    Setpoints go through the mission's CommandDispatcher; only the packets
+    that go on the air take a slot of the shared radio.
+    """
+
+    def __init__(self, uri, waypoints, origin=(0.0, 0.0, 0.0), mission="Waypoint_Avoid06", settings=None,
+                 config=None, deconfliction=None, lookahead=0.5, max_hold=2.0):
+        overrides = {"route": [list(wp) for wp in waypoints], **(settings or {})}
+        super().__init__(mission, overrides, config, origin=origin)
+        if self.policy.name != "bypass":
+            raise ValueError(f"swarm drones need the bypass policy, not {self.policy.name!r}")
+        self.uri = uri
+        self.deconfliction = deconfliction
+        self.lookahead = lookahead
+        self.max_hold = max_hold
+        self.radio = None
+        self.bypasses = 0
+        self.holds = 0
+        self.give_way_bypasses = 0
+        self._held = 0
+        self.completed = False
+
+    def fly(self, scf, radio):
+        self.radio = radio
+        try:
+            self.fly_link(scf)
+            self.completed = True
+        finally:
+            if self.deconfliction is not None:
+                self.deconfliction.remove(self.uri)
+
+    def _dispatch(self, commander):
+        dispatcher = super()._dispatch(commander)
+
+        def on_air(*args, **kwargs):
+            self.radio.slot()
+            self._send(*args, **kwargs)
+
+        dispatcher.send = on_air
+        return dispatcher
+
+    def log_tick(self, branch, setpoint=None):
+        if branch == FRONT_OBSTACLE:
+            self.bypasses += 1
+        super().log_tick(branch, setpoint)
+
+    # ---- deconfliction ----
+
+    def watch(self, leg):
+        """Publish the pose, the mission's checks, then give way. True when this tick held."""
+        if self.deconfliction is None:
+            return super().watch(leg)
+        position = self.get_pos()
+        self.deconfliction.update(self.uri, position, self.state_estimate.velocity())
+        if super().watch(leg):
+            return True
+        if leg.bypass is not None:
+            return False
+        conflict = self.deconfliction.give_way(self.uri, self._ahead(leg))
+        if conflict is None:
+            self._held = 0
+            leg.resume()
+            return False
+        if self._held * self.control_loop.period < self.max_hold and \
+                not self._in_the_way(position, leg.target, conflict):
+            if self._held == 0:
+                self.holds += 1
+            self._held += 1             # keep the last setpoint, nothing to send
+            leg.pause()
+            self.log_tick(HOLD)
+            self.pace()
+            return True
+        self.give_way_bypasses += 1
+        self._held = 0
+        leg.resume()
+        p = self.policy
+        leg.bypass = BypassManeuver(position, p.side, p.forward, back=p.back)
+        return False
+
+    def _ahead(self, leg):
+        """Where the leg will be `lookahead` seconds from now."""
+        if leg.segment is None:
+            return leg.target
+        return leg.segment.setpoint(int(leg.k) + int(self.lookahead * self.settings["loop_rate_hz"]))[:3]
+
+    @staticmethod
+    def _in_the_way(position, target, conflict, crossing_speed=0.1):
+        """
+        True when the other drone is ahead on the way to target and not
+        crossing it (hovering or coming head-on), so holding will not clear it.
+        """
+        dx, dy = target[0] - position[0], target[1] - position[1]
+        ox, oy = conflict.position[0] - position[0], conflict.position[1] - position[1]
+        norm = math.hypot(dx, dy)
+        if norm == 0.0 or dx * ox + dy * oy <= 0.0:
+            return False
+        vx, vy = conflict.velocity[:2]
+        return abs(dx * vy - dy * vx) / norm < crossing_speed
+
+    def report(self):
+        r = self.control_loop.report()
+        commands = self.dispatcher
+        return {
+            "uri": self.uri,
+            "completed": self.completed,
+            "bypasses": self.bypasses,
+            "holds": self.holds,
+            "give_way_bypasses": self.give_way_bypasses,
+            "achieved_hz": r["achieved_hz"],
+            "missed": r["missed"],
+            "jitter_p99_ms": r["jitter_p99_ms"],
+            "commands_sent": commands.sent if commands is not None else 0,
+            "commands_saved": commands.saved if commands is not None else 0,
+        }
+
+
+class Swarm:
+    """
+    Run DroneMissions concurrently, one thread per link. A deconfliction
+    service given here is shared by every mission that has none of its own.
+    """
+
+    def __init__(self, missions, radio=None, deconfliction=None, connect_timeout=10.0,
+                 rw_cache="./cache"):
+        self.missions = list(missions)
+        self.radio = radio if radio is not None else RadioScheduler()
+        self.deconfliction = deconfliction
+        for mission in self.missions:
+            if mission.deconfliction is None:
+                mission.deconfliction = deconfliction
+        self.connect_timeout = connect_timeout
+        self.rw_cache = rw_cache
+        self._cond = threading.Condition()
+        self._arrived = 0
+        self.errors = {}
+
+    def _all_connected(self):
+        """
+        Wait (up to connect_timeout) until every link has opened or failed,
+        so nobody takes off while others are still connecting.
+        """
+        with self._cond:
+            self._arrived += 1
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: self._arrived >= len(self.missions), self.connect_timeout)
+
+    def _run_one(self, mission):
+        arrived = False
+        try:
+            with SyncCrazyflie(mission.uri, cf=Crazyflie(rw_cache=self.rw_cache)) as scf:
+                arrived = True
+                self._all_connected()
+                mission.fly(scf, self.radio)
+        except Exception as e:
+            self.errors[mission.uri] = f"{type(e).__name__}: {e}"
+        finally:
+            if not arrived:
+                self._all_connected()   # a failed link must not hold the others back
+
+    def run(self):
+        """Fly all missions; returns one report per drone (with 'error' when it failed)."""
+        threads = [threading.Thread(target=self._run_one, args=(m,), name=m.uri, daemon=True)
+                   for m in self.missions]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        reports = []
+        for mission in self.missions:
+            r = mission.report()
+            r["error"] = self.errors.get(mission.uri)
+            reports.append(r)
+        return reports
@@ -0,0 +1,283 @@
+# Binary per-tick flight telemetry in a memory-mapped ring file
+"""
+Record every control-loop tick as one fixed-size binary record instead of
+printing it.
+
+The hot loop only appends a tuple to a deque (no I/O, no lock). A
+background writer packs the pending ticks into a preallocated,
+memory-mapped ring file every flush_interval; once the ring is full the
+oldest records are overwritten. A whole flight loads back as a NumPy
+structured array:
+
+    with TelemetryRecorder("flight.cftl") as telemetry:
+        telemetry.attach(multiranger)       # raw sensor streams too (for replay)
+        telemetry.record(CRUISE, get_pos(commander), multiranger, setpoint, velocity)
+
+    records = ticks(read("flight.cftl"))
+    records["front"][records["branch"] == BYPASS]
+
+From the shell (summary of one flight):
+
+    python -m flight.telemetry flight.cftl
+"""
+import argparse
+import math
+import mmap
+import struct
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from flight.ranger_stream import BACK, DOWN, FRONT, LEFT, RIGHT, UP, to_distance
+
+# Decision branch of a tick
+CRUISE = 0          # following the precomputed leg
+TRACK = 1           # leg running on board, nothing sent
+FRONT_OBSTACLE = 2  # front trigger fired, bypass starts
+BYPASS = 3          # bypass maneuver ticking
+ABORT = 4           # bypass aborted (re-plan or give up)
+RIGHT_OBSTACLE = 5  # right trigger fired, sidestep left
+HOLD = 6            # giving way or link stale, setpoint kept
+ARRIVED = 7         # leg finished
+# Not ticks: raw log packets of attached sources (ranges only / pose only)
+# and the moment `leg` was set
+RANGE_PACKET = 8
+POSE_PACKET = 9
+LEG_START = 10
+BRANCHES = ("cruise", "track", "front_obstacle", "bypass", "abort", "right_obstacle", "hold", "arrived",
+            "range_packet", "pose_packet", "leg_start")
+
+# t: host time (monotonic s), seq: record number, leg: waypoint index,
+# x/y/z, vx/vy/vz: pose estimate (velocity NaN when unknown), ranges in
+# metres (NaN out of range), sx/sy/sz: setpoint commanded this tick (NaN
+# when there is none)
+RECORD = np.dtype([
+    ("t", "<f8"), ("seq", "<u4"), ("leg", "<u2"), ("branch", "u1"), ("_pad", "u1"),
+    ("x", "<f4"), ("y", "<f4"), ("z", "<f4"), ("vx", "<f4"), ("vy", "<f4"), ("vz", "<f4"),
+    ("front", "<f4"), ("back", "<f4"), ("left", "<f4"), ("right", "<f4"), ("up", "<f4"), ("down", "<f4"),
+    ("sx", "<f4"), ("sy", "<f4"), ("sz", "<f4"), ("_reserved", "<u4"),
+])
+_RECORD = struct.Struct("<dIHBx6f6f3f4x")
+assert _RECORD.size == RECORD.itemsize
+
+# magic, version, record size, capacity, records written, records dropped
+_HEADER = struct.Struct("<4sHHIQQ")
+HEADER_SIZE = 64
+MAGIC = b"CFTL"
+VERSION = 2
+
+_NAN3 = (math.nan, math.nan, math.nan)
+
+# stateEstimate log variables (flight.state_estimate needs cflib, this module must not)
+_POSITION = ('stateEstimate.x', 'stateEstimate.y', 'stateEstimate.z')
+_VELOCITY = ('stateEstimate.vx', 'stateEstimate.vy', 'stateEstimate.vz')
+
+
+def _f(value):
+    return math.nan if value is None else value
+
+
+class TelemetryRecorder:
+    """
+    Non-blocking tick recorder.
+
+    capacity: records in the ring file (80 bytes each). max_pending bounds
+    the ticks waiting for the writer; past it record() drops the tick and
+    counts it instead of ever blocking the loop. Set `leg` to the current
+    waypoint index; it is stamped on every record, and setting it records a
+    LEG_START marker.
+
+    attach() adds every log packet of a Multiranger or StateEstimate as a
+    RANGE_PACKET / POSE_PACKET record, stamped on arrival, which is what
+    flight.replay plays back.
+    """
+
+    def __init__(self, path, capacity=1 << 18, flush_interval=0.05, max_pending=8192,
+                 clock=time.monotonic):
+        self.path = path
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._clock = clock
+        self._pending = deque()
+        self._file = None
+        self._mm = None
+        self._thread = None
+        self._running = False
+        self._attached = []
+        self._leg = 0
+        self.written = 0
+        self.dropped = 0
+
+    # ---- lifecycle ----
+
+    def open(self):
+        size = HEADER_SIZE + self.capacity * RECORD.itemsize
+        self._file = open(self.path, "w+b")
+        self._file.truncate(size)
+        self._mm = mmap.mmap(self._file.fileno(), size)
+        self._write_header()
+        self._running = True
+        self._thread = threading.Thread(target=self._writer, name="telemetry", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        if self._thread is None:
+            return
+        for log_config in self._attached:
+            log_config.data_received_cb.remove_callback(self._on_log)
+        self._attached = []
+        self._running = False
+        self._thread.join()
+        self._thread = None
+        self._drain()
+        self._mm.flush()
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def attach(self, source):
+        """Record every log packet of a Multiranger or StateEstimate."""
+        source._log_config.data_received_cb.add_callback(self._on_log)
+        self._attached.append(source._log_config)
+
+    # ---- hot path ----
+
+    @property
+    def leg(self):
+        return self._leg
+
+    @leg.setter
+    def leg(self, value):
+        self.start_leg(value)
+
+    def start_leg(self, leg):
+        """Set the leg and record its LEG_START marker."""
+        self._leg = leg
+        self._push(LEG_START, _NAN3, None, (None,) * 6, None)
+
+    @property
+    def backlog(self):
+        """Records queued for the writer."""
+        return len(self._pending)
+
+    def _on_log(self, timestamp, data, logconf):
+        if _POSITION[0] in data:
+            self._push(POSE_PACKET, tuple(data[n] for n in _POSITION), tuple(data[n] for n in _VELOCITY),
+                       (None,) * 6, None)
+        else:
+            self._push(RANGE_PACKET, _NAN3, None,
+                       tuple(to_distance(data.get(n)) for n in (FRONT, BACK, LEFT, RIGHT, UP, DOWN)), None)
+
+    def record(self, branch, pose, ranges=None, setpoint=None, velocity=None, t=None):
+        """
+        Queue one tick. pose: (x, y, z); ranges: anything with
+        front/back/left/right/up/down attributes (Multiranger, RangeSample)
+        or None; setpoint: (x, y, z) commanded this tick or None;
+        velocity: (vx, vy, vz) of the pose estimate or None; t: time of the
+        tick when it is recorded later (default now).
+        """
+        r = (None,) * 6 if ranges is None else (ranges.front, ranges.back, ranges.left,
+                                                 ranges.right, ranges.up, ranges.down)
+        self._push(branch, pose, velocity, r, setpoint, t)
+
+    def _push(self, branch, pose, velocity, r, setpoint, t=None):
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append((self._clock() if t is None else t, self._leg, branch, pose, velocity, r, setpoint))
+
+    # ---- writer ----
+
+    def _write_header(self):
+        _HEADER.pack_into(self._mm, 0, MAGIC, VERSION, RECORD.itemsize, self.capacity,
+                          self.written, self.dropped)
+
+    def _writer(self):
+        while self._running:
+            self._drain()
+            time.sleep(self.flush_interval)
+
+    def _drain(self):
+        pending, mm, size = self._pending, self._mm, RECORD.itemsize
+        if not pending:
+            return
+        while pending:
+            t, leg, branch, pose, velocity, r, setpoint = pending.popleft()
+            offset = HEADER_SIZE + (self.written % self.capacity) * size
+            _RECORD.pack_into(mm, offset, t, self.written & 0xFFFFFFFF, leg, branch,
+                              *pose[:3], *(velocity[:3] if velocity is not None else _NAN3),
+                              *map(_f, r), *(setpoint[:3] if setpoint is not None else _NAN3))
+            self.written += 1
+        self._write_header()
+
+
+# ------------------------------
+# Reader
+# ------------------------------
+
+def read_header(path):
+    with open(path, "rb") as f:
+        magic, version, record_size, capacity, written, dropped = _HEADER.unpack(f.read(_HEADER.size))
+    if magic != MAGIC or version != VERSION or record_size != RECORD.itemsize:
+        raise ValueError(f"{path}: not a version {VERSION} telemetry file")
+    return {"capacity": capacity, "written": written, "dropped": dropped}
+
+
+def read(path):
+    """
+    Whole flight as a RECORD structured array, oldest tick first. A
+    read-only memmap view (no copy) unless the ring wrapped, in which case
+    the two halves are joined into one array.
+    """
+    header = read_header(path)
+    capacity, written = header["capacity"], header["written"]
+    data = np.memmap(path, dtype=RECORD, mode="r", offset=HEADER_SIZE, shape=(capacity,))
+    if written <= capacity:
+        return data[:written]
+    start = written % capacity
+    return np.concatenate((data[start:], data[:start]))
+
+
+def ticks(records):
+    """Only the control-loop ticks (no raw log packets)."""
+    return records[records["branch"] < RANGE_PACKET]
+
+
+def summary(records):
+    """Counts and timings of a flight for a quick look."""
+    out = {"records": len(records)}
+    if len(records) == 0:
+        return out
+    counts = np.bincount(records["branch"], minlength=len(BRANCHES))
+    out["branches"] = {name: int(n) for name, n in zip(BRANCHES, counts) if n}
+    records = ticks(records)
+    if len(records) == 0:
+        return out
+    t = records["t"]
+    out["duration_s"] = float(t[-1] - t[0])
+    out["rate_hz"] = (len(records) - 1) / out["duration_s"] if out["duration_s"] > 0 else math.nan
+    front = records["front"]
+    out["min_front_m"] = float(np.nanmin(front)) if not np.isnan(front).all() else math.nan
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a telemetry file")
+    parser.add_argument("path")
+    args = parser.parse_args()
+    header = read_header(args.path)
+    for key, value in {**header, **summary(read(args.path))}.items():
+        print(f"{key:>12}: {value}")
+
+
+if __name__ == "__main__":
+    main()
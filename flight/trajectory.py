@@ -0,0 +1,218 @@
+# Precomputed waypoint trajectories with smooth velocity profiles
+"""
+Turn a waypoint list into time-parameterized straight segments once, ahead
+of the flight, and sample them at the control-loop rate.
+
+Each segment follows a minimum-jerk or trapezoidal speed profile limited by
+a peak velocity and acceleration. All setpoints (and the go_to velocity
+that makes PositionHlCommander.go_to block for just under one period) are
+computed up front as NumPy arrays, so the loop only indexes them:
+
+    trajectory = Trajectory(newsequence, start=(0.0, 0.0, z0), rate_hz=LOOP_RATE_HZ)
+    segment = trajectory.segment(i, get_pos(commander))
+    x, y, z, velocity = segment[k]
+    commander.go_to(x, y, z, velocity=velocity)
+"""
+import math
+
+import numpy as np
+
+MIN_JERK = "min_jerk"
+TRAPEZOID = "trapezoid"
+PROFILES = (MIN_JERK, TRAPEZOID)
+
+# Peak velocity / acceleration of the normalized minimum-jerk profile
+# s(u) = 10u^3 - 15u^4 + 6u^5, in units of distance / duration (^2)
+MIN_JERK_PEAK_V = 1.875
+MIN_JERK_PEAK_A = 5.7735
+
+# PositionHlCommander.go_to sleeps distance / velocity. The commanded velocity
+# is sized so that sleep takes this fraction of the period, leaving the rest
+# for sensor reads and the deadline wait.
+GO_TO_DUTY = 0.8
+
+
+# ------------------------------
+# Speed profiles (distance travelled along a segment)
+# ------------------------------
+
+def min_jerk_duration(distance, v_max, a_max):
+    return max(MIN_JERK_PEAK_V * distance / v_max, math.sqrt(MIN_JERK_PEAK_A * distance / a_max))
+
+
+def min_jerk(t, distance, duration):
+    u = np.clip(t / duration, 0.0, 1.0) if duration > 0 else np.ones_like(t)
+    return distance * u ** 3 * (10.0 - 15.0 * u + 6.0 * u * u)
+
+
+def trapezoid_duration(distance, v_max, a_max):
+    if distance * a_max <= v_max * v_max:
+        return 2.0 * math.sqrt(distance / a_max)     # triangular: never reaches v_max
+    return distance / v_max + v_max / a_max
+
+
+def trapezoid_ramp(distance, duration, a_max):
+    """Cruise speed and ramp time that cover `distance` in `duration` with symmetric ramps."""
+    disc = max(0.0, duration * duration / 4.0 - distance / a_max)
+    v = a_max * (duration / 2.0 - math.sqrt(disc))
+    return v, v / a_max
+
+
+def trapezoid(t, distance, duration, a_max):
+    """Accelerate at a_max, cruise, decelerate at a_max; ends at `distance` after `duration`."""
+    if duration <= 0:
+        return np.full_like(t, distance)
+    v, t_acc = trapezoid_ramp(distance, duration, a_max)
+    t = np.clip(t, 0.0, duration)
+    rising = 0.5 * a_max * t * t
+    cruise = v * (t - t_acc / 2.0)
+    rest = duration - t
+    falling = distance - 0.5 * a_max * rest * rest
+    return np.where(t < t_acc, rising, np.where(t > duration - t_acc, falling, cruise))
+
+
+# ------------------------------
+# Segments
+# ------------------------------
+
+class Segment:
+    """
+    One straight leg sampled every 1 / rate_hz seconds. Row k of `samples`
+    is the setpoint for tick k + 1 as (x, y, z, go_to velocity).
+    """
+
+    def __init__(self, start, end, rate_hz, v_max=1.0, a_max=2.0, profile=MIN_JERK):
+        if profile not in PROFILES:
+            raise ValueError(f"unknown profile {profile!r}, expected one of {PROFILES}")
+        self.start = np.asarray(start, float)
+        self.end = np.asarray(end, float)
+        self.rate_hz = rate_hz
+        self.profile = profile
+        self.a_max = a_max
+        delta = self.end - self.start
+        self.distance = float(np.linalg.norm(delta))
+        self.unit = delta / self.distance if self.distance > 0 else np.zeros(3)
+        if profile == MIN_JERK:
+            self.duration = min_jerk_duration(self.distance, v_max, a_max)
+        else:
+            self.duration = trapezoid_duration(self.distance, v_max, a_max)
+
+        period = 1.0 / rate_hz
+        n = max(1, int(math.ceil(self.duration * rate_hz - 1e-9)))
+        t = np.arange(1, n + 1) * period
+        if profile == MIN_JERK:
+            s = min_jerk(t, self.distance, self.duration)
+        else:
+            s = trapezoid(t, self.distance, self.duration, a_max)
+        s[-1] = self.distance
+        positions = self.start + s[:, None] * self.unit
+        steps = np.diff(s, prepend=0.0)
+        velocity = np.maximum(steps / (period * GO_TO_DUTY), 1e-3)
+        self.samples = np.column_stack([positions, velocity])
+        # Plain tuples: indexing in the loop does no NumPy work
+        self._rows = [tuple(row) for row in self.samples.tolist()]
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, k):
+        return self._rows[k]
+
+    def setpoint(self, k):
+        """Setpoint for tick k, holding the end point once the segment is done."""
+        return self._rows[min(k, len(self._rows) - 1)]
+
+    def done(self, k):
+        return k >= len(self._rows) - 1e-9
+
+    def at(self, q):
+        """
+        Setpoint q ticks into the segment: row q - 1 for a whole q, in
+        between for a fractional one (a tick that moved only part of a step).
+        """
+        rows = self._rows
+        i = min(int(math.ceil(q - 1e-9)), len(rows))
+        row = rows[i - 1]
+        f = i - q
+        if f <= 1e-9:
+            return row
+        prev = rows[i - 2][:3] if i >= 2 else self.start.tolist()
+        return (*(r - f * (r - p) for r, p in zip(row[:3], prev)), row[3])
+
+    def pieces(self):
+        """
+        The same leg as polynomial pieces in local time, for the on-board
+        high-level commander: [(duration, x_coeffs, y_coeffs, z_coeffs)] with
+        8 coefficients per axis (lowest order first). Empty for a zero-length leg.
+        """
+        if self.distance <= 0.0:
+            return []
+        T = self.duration
+        if self.profile == MIN_JERK:
+            # distance along the leg as a polynomial in t
+            along = [(T, [0.0, 0.0, 0.0, 10.0 / T ** 3, -15.0 / T ** 4, 6.0 / T ** 5], self.distance)]
+        else:
+            v, t_acc = trapezoid_ramp(self.distance, T, self.a_max)
+            a = self.a_max
+            s1 = 0.5 * a * t_acc * t_acc
+            cruise = T - 2.0 * t_acc
+            along = [(t_acc, [0.0, 0.0, 0.5 * a], None)]
+            if cruise > 1e-6:
+                along.append((cruise, [s1, v], None))
+            along.append((t_acc, [s1 + v * max(cruise, 0.0), v, -0.5 * a], None))
+        out = []
+        for duration, coeffs, scale in along:
+            if scale is not None:
+                coeffs = [c * scale for c in coeffs]
+            coeffs = coeffs + [0.0] * (8 - len(coeffs))
+            axes = []
+            for p0, u in zip(self.start, self.unit):
+                axis = [float(c * u) for c in coeffs]
+                axis[0] += float(p0)
+                axes.append(axis)
+            out.append((duration, *axes))
+        return out
+
+
+class Trajectory:
+    """
+    Segments between consecutive waypoints of a (x, y, z, duration)
+    sequence, starting from `start`. The per-waypoint duration is ignored:
+    segment timing comes from the velocity profile.
+    """
+
+    def __init__(self, waypoints, start, rate_hz, v_max=1.0, a_max=2.0, profile=MIN_JERK, tolerance=0.02):
+        self.rate_hz = rate_hz
+        self.v_max = v_max
+        self.a_max = a_max
+        self.profile = profile
+        self.tolerance = tolerance
+        self.segments = []
+        prev = tuple(start)
+        for wp in waypoints:
+            self.segments.append(Segment(prev, wp[:3], rate_hz, v_max, a_max, profile))
+            prev = tuple(wp[:3])
+
+    def __len__(self):
+        return len(self.segments)
+
+    @property
+    def duration(self):
+        return sum(s.duration for s in self.segments)
+
+    def leg_duration(self, start, end):
+        """Seconds a segment from `start` to `end` would last (without building it)."""
+        distance = math.dist(start[:3], end[:3])
+        if self.profile == MIN_JERK:
+            return min_jerk_duration(distance, self.v_max, self.a_max)
+        return trapezoid_duration(distance, self.v_max, self.a_max)
+
+    def segment(self, i, position=None):
+        """
+        Segment to waypoint i. When the drone is not where the precomputed
+        segment starts (e.g. after a bypass) a new one is built from `position`.
+        """
+        seg = self.segments[i]
+        if position is None or np.linalg.norm(np.asarray(position[:3], float) - seg.start) <= self.tolerance:
+            return seg
+        return Segment(position[:3], seg.end, self.rate_hz, self.v_max, self.a_max, self.profile)
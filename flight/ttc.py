@@ -0,0 +1,144 @@
+# Latency-compensated time-to-collision obstacle trigger
+"""
+Decide whether to react to an obstacle from where it will be when the
+reaction actually happens, not from the raw range.
+
+A range reading is already old when the host sees it, and whatever the
+host sends takes another radio hop to act. Over that time the drone keeps
+closing in at its measured velocity. The trigger predicts the range at
+actuation time and fires when what is left would not cover the braking
+distance plus a fixed margin, or when the time to collision drops below a
+horizon. A slow drone can get close; a fast one reacts early:
+
+    reaction = ObstacleReaction(range_stream, state_estimate, CommandLatency(scf))
+    if reaction.front(): ...
+"""
+import math
+
+from flight.ranger_stream import BACK, FRONT, LEFT, RIGHT
+
+# Multiranger ray directions in the horizontal plane (x forward, y left)
+DIRECTIONS = {
+    FRONT: (1.0, 0.0),
+    BACK: (-1.0, 0.0),
+    LEFT: (0.0, 1.0),
+    RIGHT: (0.0, -1.0),
+}
+FIELDS = {FRONT: "front", BACK: "back", LEFT: "left", RIGHT: "right"}
+
+
+def closing_speed(velocity, direction):
+    """Speed towards whatever a ray sees (m/s, negative when moving away)."""
+    if velocity is None:
+        return 0.0
+    dx, dy = DIRECTIONS[direction]
+    return velocity[0] * dx + velocity[1] * dy
+
+
+def predicted_range(distance, speed, delay):
+    """Range left after closing in at `speed` for `delay` seconds."""
+    return distance - max(speed, 0.0) * delay
+
+
+def time_to_collision(distance, speed):
+    return distance / speed if speed > 0.0 else math.inf
+
+
+class CommandLatency:
+    """
+    Round-trip radio latency estimate (s).
+
+    Uses cflib's link statistics (ping round-trip, 95th percentile) when the
+    installed cflib has them, smoothed like TCP's RTT estimator so a single
+    late ping does not make the trigger jumpy. Falls back to `default`.
+    """
+
+    def __init__(self, crazyflie=None, default=0.03, gain=0.125):
+        self.default = default
+        self.gain = gain
+        self.smoothed = None
+        self.deviation = 0.0
+        self.samples = 0
+        cf = getattr(crazyflie, "cf", crazyflie)
+        latency = getattr(getattr(cf, "link_statistics", None), "latency", None)
+        if latency is not None:
+            latency.latency_updated.add_callback(self._latency_updated)
+
+    def _latency_updated(self, latency_ms):
+        self.observe(latency_ms / 1000.0)
+
+    def observe(self, rtt):
+        self.samples += 1
+        if self.smoothed is None:
+            self.smoothed, self.deviation = rtt, rtt / 2.0
+            return
+        self.deviation += self.gain * (abs(rtt - self.smoothed) - self.deviation)
+        self.smoothed += self.gain * (rtt - self.smoothed)
+
+    @property
+    def value(self):
+        """Conservative round trip: smoothed + 2 deviations (default before any sample)."""
+        if self.smoothed is None:
+            return self.default
+        return self.smoothed + 2.0 * self.deviation
+
+
+class ObstacleReaction:
+    """
+    Time-to-collision check on the newest Multiranger sample.
+
+    The delay between the measurement and the reaction taking effect is the
+    sample's age on the host plus one radio round trip (the reading's way
+    down and the command's way up). margin is the clearance that must be
+    left after braking at `decel`; horizon (s) is the minimum time to
+    collision at actuation. Once a direction has triggered, it stays
+    triggered until the clearance exceeds margin + hysteresis.
+    """
+
+    def __init__(self, ranges, state, latency, margin=0.25, decel=2.0, horizon=0.3, hysteresis=0.0):
+        self.ranges = ranges
+        self.state = state
+        self.latency = latency
+        self.margin = margin
+        self.decel = decel
+        self.horizon = horizon
+        self.hysteresis = hysteresis
+        self.triggered = set()  # directions currently in the obstacle state
+        self.last = None        # (direction, distance, predicted, ttc) of the last trigger
+
+    def delay(self, sample):
+        return self.ranges.age(sample) + self.latency.value
+
+    def check(self, direction, sample=None):
+        if sample is None:
+            sample = self.ranges.latest()
+        if sample is None:
+            return False
+        distance = getattr(sample, FIELDS[direction])
+        if distance is None:
+            self.triggered.discard(direction)
+            return False
+        velocity = self.state.velocity() if self.state is not None else None
+        speed = closing_speed(velocity, direction)
+        remaining = predicted_range(distance, speed, self.delay(sample))
+        braking = max(speed, 0.0) ** 2 / (2.0 * self.decel)
+        ttc = time_to_collision(remaining, speed)
+        margin = self.margin + self.hysteresis if direction in self.triggered else self.margin
+        if remaining - braking < margin or ttc < self.horizon:
+            self.triggered.add(direction)
+            self.last = (direction, distance, remaining, ttc)
+            return True
+        self.triggered.discard(direction)
+        return False
+
+    def front(self):
+        return self.check(FRONT)
+
+    def back(self):
+        return self.check(BACK)
+
+    def left(self):
+        return self.check(LEFT)
+
+    def right(self):
+        return self.check(RIGHT)
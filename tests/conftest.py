@@ -0,0 +1,32 @@
+# Shared fixtures: missions flown headless in flight.sim
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from flight.sim import World, run_script  # noqa: E402
+
+FLY_SCRIPT = os.path.join(ROOT, "Fly_Mission.py")
+
+
+def line(report, start):
+    """First line of the run's output starting with `start` (None if there is none)."""
+    return next((text for text in report["output"].splitlines() if text.startswith(start)), None)
+
+
+@pytest.fixture
+def fly():
+    """
+    fly(settings=None, world=None, mission="Waypoint_Avoid06") flies a
+    mission of missions.json in the simulator and returns the world's
+    report; settings override the mission's, dotted keys included.
+    Telemetry is off unless a setting turns it on.
+    """
+    def run(settings=None, world=None, mission="Waypoint_Avoid06"):
+        overrides = {"MISSION": mission, "SETTINGS": {"telemetry_file": None, **(settings or {})}}
+        return run_script(FLY_SCRIPT, world if world is not None else World(), overrides=overrides)
+    return run
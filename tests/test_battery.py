@@ -0,0 +1,124 @@
+# Battery-aware scheduling: energy model, trimmed routes and flights on a low battery
+import pytest
+
+from flight.sim import Sandbox, World
+
+from conftest import ROOT, line
+
+HOME = (0.0, 0.0, 0.4, 3.0)
+ROUTE = [(1.0, 0.0, 0.4, 3.0), (1.0, -0.4, 0.4, 3.0), (0.0, -0.4, 0.4, 3.0)]
+
+
+@pytest.fixture(scope="module")
+def battery():
+    """flight.battery (it logs pm.vbat through cflib) loaded against the simulated cflib."""
+    return Sandbox(World(), ROOT)._load_local("flight.battery")
+
+
+class FakeBattery:
+    """BatteryMonitor stand-in reporting whatever energy the test sets."""
+
+    capacity = 3000.0
+
+    def __init__(self, energy):
+        self.energy = energy
+
+    def voltage(self):
+        return 3.7
+
+    def state_of_charge(self, power=0.0):
+        return self.energy / self.capacity
+
+    def energy_left(self, power=0.0):
+        return self.energy
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def fly_legs(scheduler, energies, clock):
+    """Legs next_leg hands out, arriving on each waypoint; energies[n]: reading before leg n."""
+    position, legs = HOME[:3], []
+    while True:
+        scheduler.battery.energy = energies[min(len(legs), len(energies) - 1)]
+        i = scheduler.next_leg(position)
+        if i is None:
+            return legs
+        legs.append(i)
+        clock.now += 3.3
+        position = scheduler._waypoint(i)[:3]
+
+
+def test_model_fits_the_drain(battery):
+    model = battery.EnergyModel(per_s=8.0, per_m=2.0)
+    for t in range(60):
+        seconds, metres = 0.5 * t, 0.2 * t
+        model.observe(seconds, metres, 3000.0 - 10.0 * seconds - 3.0 * metres)
+    per_s, per_m = model.fit()
+
+    assert 8.0 < per_s <= 10.0 + 1e-6       # pulled from the prior towards the drain
+    assert model.cost(10.0, 2.0) == pytest.approx(per_s * 10.0 + per_m * 2.0)
+
+
+def test_full_battery_flies_the_route_as_planned(battery, capsys):
+    clock = Clock()
+    scheduler = battery.BatteryScheduler(FakeBattery(3000.0), battery.EnergyModel(), ROUTE, HOME, clock=clock)
+
+    assert fly_legs(scheduler, [3000.0], clock) == [0, 1, 2]
+    assert not scheduler.cut_short and scheduler.hover
+    assert "Battery" not in capsys.readouterr().out
+
+
+def test_low_battery_trims_and_returns_home(battery, capsys):
+    clock = Clock()
+    scheduler = battery.BatteryScheduler(FakeBattery(120.0), battery.EnergyModel(), ROUTE, HOME, clock=clock)
+
+    assert fly_legs(scheduler, [120.0, 90.0], clock) == [0, scheduler.home]
+    assert scheduler.cut_short and not scheduler.hover
+    out = capsys.readouterr().out
+    assert "1 → home, skipping waypoints 2, 3" in out
+    assert "Battery: 3.70 V" in scheduler.summary() and "1 of 3 waypoints, cut short" in scheduler.summary()
+
+
+def test_trimmed_plan_that_keeps_every_waypoint_still_ends_at_home(battery):
+    clock = Clock()
+    scheduler = battery.BatteryScheduler(FakeBattery(120.0), battery.EnergyModel(), ROUTE, HOME, clock=clock)
+
+    # the reading recovers after the first leg: every waypoint fits again, but the plan stays trimmed
+    assert fly_legs(scheduler, [120.0, 3000.0], clock) == [0, 1, 2, scheduler.home]
+    assert not scheduler.cut_short
+
+
+def test_skipped_waypoints_leave_out_the_visited_ones(battery, capsys):
+    route = [HOME] + ROUTE + [HOME]             # starts and ends on the take-off spot
+    clock = Clock()
+    scheduler = battery.BatteryScheduler(FakeBattery(120.0), battery.EnergyModel(), route, HOME, clock=clock)
+    scheduler.next_leg(HOME[:3])
+
+    # waypoints 1 and 5 are the take-off spot: already visited, not skipped
+    assert capsys.readouterr().out == "Battery 4% (120 J): 2 → home, skipping waypoints 3, 4\n"
+
+
+def test_mission_on_a_low_battery_lands_home_instead_of_browning_out(fly):
+    blind = fly(world=World(charge=0.05))
+    report = fly({"battery.reserve": 0.01}, World(charge=0.05))
+
+    assert blind["brownout"] is not None
+    assert report["brownout"] is None
+    assert "Mission completed successfully" in report["output"]
+    assert "cut short" in line(report, "Battery:")
+    assert "of 7 waypoints" in line(report, "Battery:")
+    x, y, _ = report["drones"][0]["position"]
+    assert abs(x) < 0.05 and abs(y) < 0.05     # flew home before landing
+
+
+def test_mission_on_a_full_battery_keeps_the_whole_route(fly):
+    report = fly({"battery.reserve": 0.01})
+
+    assert "7 of 7 waypoints" in line(report, "Battery:")
+    assert "skipping" not in report["output"]
@@ -0,0 +1,82 @@
+# Benchmark baselines: save/load, verdicts per metric kind, and --compare failing on a regression
+import json
+import sys
+
+import pytest
+
+from flight import bench
+from flight.bench import HIGHER, LOWER, Metric, best, compare, load, save
+
+
+def us(value):
+    return Metric(value, "us", LOWER, False)
+
+
+def verdicts(baseline, metrics, tolerance=0.2):
+    return {name: verdict for name, _, _, _, verdict in compare(baseline, metrics, tolerance)}
+
+
+def test_timings_compare_within_the_tolerance():
+    baseline = {"a": us(100.0), "b": us(100.0), "c": us(100.0), "hz": Metric(50.0, "Hz", HIGHER, False)}
+    now = {"a": us(115.0), "b": us(130.0), "c": us(70.0), "hz": Metric(35.0, "Hz", HIGHER, False)}
+
+    assert verdicts(baseline, now) == {"a": "same", "b": "worse", "c": "better", "hz": "worse"}
+    assert verdicts(baseline, now, tolerance=0.5)["b"] == "same"
+
+
+def test_exact_metrics_flag_any_change():
+    baseline = {"collision_rate": Metric(0.1, "", LOWER, True), "completion_rate": Metric(0.9, "", HIGHER, True),
+                "missed": Metric(0.0, "", LOWER, True)}
+    now = {"collision_rate": Metric(0.1, "", LOWER, True), "completion_rate": Metric(0.85, "", HIGHER, True),
+           "missed": Metric(0.01, "", LOWER, True), "grid_kib": Metric(17.0, "KiB", LOWER, True)}
+    rows = {row[0]: row for row in compare(baseline, now)}
+
+    assert rows["collision_rate"][4] == "same"
+    assert rows["completion_rate"][4] == "worse" and rows["completion_rate"][3] == pytest.approx(-0.05 / 0.9)
+    assert rows["missed"][3] == float("inf") and rows["missed"][4] == "worse"      # from zero
+    assert rows["grid_kib"] == ("grid_kib", None, 17.0, None, "new")
+
+
+def test_best_keeps_the_fastest_host_timing_only():
+    runs = [{"t": us(12.0), "hz": Metric(40.0, "Hz", HIGHER, False), "rate": Metric(0.5, "", HIGHER, True)},
+            {"t": us(10.0), "hz": Metric(45.0, "Hz", HIGHER, False), "rate": Metric(0.6, "", HIGHER, True)}]
+    merged = best(runs)
+
+    assert (merged["t"].value, merged["hz"].value, merged["rate"].value) == (10.0, 45.0, 0.5)
+
+
+def test_baselines_round_trip(tmp_path):
+    metrics = {"planner.grid_kib": Metric(17.0, "KiB", LOWER, True), "decision.decision_p50_us": us(3.5)}
+    path = tmp_path / "baseline.json"
+    save(path, metrics, {"seeds": 5})
+
+    assert load(path) == metrics
+    assert json.loads(path.read_text())["options"] == {"seeds": 5}
+
+
+def cli(monkeypatch, *argv):
+    monkeypatch.setattr(sys, "argv", ["bench", *argv])
+    with pytest.raises(SystemExit) as stopped:
+        bench.main()
+    return stopped.value.code
+
+
+def test_compare_exits_one_on_a_regression(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "baseline.json"
+    monkeypatch.setattr(sys, "argv", ["bench", "planner", "--repeat", "1", "--save", str(path)])
+    bench.main()
+    assert cli(monkeypatch, "planner", "--repeat", "1", "--compare", str(path), "--tolerance", "100") == 0
+    assert "0 regression(s)" in capsys.readouterr().out
+
+    doc = json.loads(path.read_text())
+    doc["metrics"]["planner.grid_kib"]["value"] /= 2         # the grid used to take half the memory
+    path.write_text(json.dumps(doc))
+
+    assert cli(monkeypatch, "planner", "--repeat", "1", "--compare", str(path), "--tolerance", "100") == 1
+    out = capsys.readouterr().out
+    assert "1 regression(s): planner.grid_kib" in out
+    assert "+100.0%  worse" in out
+
+
+def test_unknown_benchmarks_are_refused(monkeypatch):
+    assert cli(monkeypatch, "warp") == 2
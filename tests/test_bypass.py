@@ -0,0 +1,181 @@
+# Bypass maneuver and BypassPolicy ticked by a control loop, without sleeping
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from flight.bypass import ABORTED, DONE, FORWARD, RETURN, SIDESTEP, BypassManeuver
+from flight.dispatch import SAFETY
+from flight.mission.policies import BypassPolicy, Leg
+from flight.ranger_stream import FRONT, RIGHT
+from flight.telemetry import BYPASS, CRUISE, FRONT_OBSTACLE, HOLD, RIGHT_OBSTACLE
+
+PERIOD = 0.0625     # exact in binary: the settle lasts a whole number of ticks
+
+
+def clear(**near):
+    ranges = dict(front=2.0, back=2.0, left=2.0, right=2.0, up=None, down=None)
+    ranges.update(near)
+    return SimpleNamespace(**ranges)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeMission:
+    """What a policy sees of the engine; the drone sits on every setpoint it is sent."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.position = (0.0, 0.0, 0.4)
+        self.close = set()          # directions whose trigger is on
+        self.sent = []
+        self.branches = []
+        self.commander = self
+
+    def go_to(self, x, y, z, priority=None):
+        self.sent.append(((x, y, z), priority))
+        self.position = (x, y, z)
+
+    def get_pos(self):
+        return self.position
+
+    def ranges(self):
+        return clear(front=0.3) if FRONT in self.close else clear()
+
+    def step_scale(self):
+        return 1.0
+
+    def range_lead(self):
+        return (0.0, 0.0)
+
+    def is_close(self, direction):
+        return direction in self.close
+
+    def log_tick(self, branch, setpoint=None):
+        self.branches.append(branch)
+
+    def cruise(self, leg):
+        self.log_tick(CRUISE)
+        self.pace()
+        return True
+
+    def pace(self):
+        self.clock.now += PERIOD
+
+    def hold(self, seconds):
+        raise AssertionError("the bypass policy must not hold the loop")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "time", clock)
+    return clock
+
+
+def run(policy, mission, leg, ticks):
+    """Tick like Mission.fly_leg; returns the ticks the leg lasted (None: still going)."""
+    for n in range(1, ticks + 1):
+        if not policy.tick(mission, leg):
+            return n
+    return None
+
+
+def test_right_shift_settles_without_blocking(clock):
+    mission, policy = FakeMission(clock), BypassPolicy(shift=-0.5, settle_s=1.0)
+    leg = Leg(1, (1.0, 0.0, 0.4), 3.0)
+    mission.close = {RIGHT}
+
+    ticks = run(policy, mission, leg, 100)
+
+    assert mission.sent == [((0.0, -0.5, 0.4), SAFETY)]
+    assert mission.branches[0] == RIGHT_OBSTACLE
+    assert set(mission.branches[1:]) == {HOLD}
+    assert ticks == 2 + round(1.0 / PERIOD)        # the shift, the settle ticks, the end of the leg
+
+
+def test_front_obstacle_during_the_settle_starts_a_bypass(clock):
+    mission, policy = FakeMission(clock), BypassPolicy(side=0.5, forward=0.5)
+    leg = Leg(1, (1.0, 0.0, 0.4), 3.0)
+    mission.close = {RIGHT}
+    assert run(policy, mission, leg, 5) is None
+
+    mission.close = {FRONT}
+    policy.tick(mission, leg)
+
+    assert mission.branches[-1] == FRONT_OBSTACLE
+    assert leg.bypass is not None and leg.bypass.legs[0][1] == pytest.approx((0.0, 0.0, 0.4))    # from the shift
+    assert policy.settling is None
+    mission.close = set()
+    assert policy.tick(mission, leg) and mission.branches[-1] == BYPASS
+
+
+def test_bypass_runs_until_done_then_cruises(clock):
+    mission, policy = FakeMission(clock), BypassPolicy(side=-0.5, forward=0.5)
+    leg = Leg(1, (2.0, 0.0, 0.4), 3.0)
+    mission.close = {FRONT}
+    policy.tick(mission, leg)
+    mission.close = set()
+
+    ticks = run(policy, mission, leg, 200)
+
+    assert ticks is not None and leg.bypass is None and policy.handled
+    assert mission.position == pytest.approx((0.5, 0.0, 0.4))
+    assert max(abs(b[0][1] - a[0][1]) + abs(b[0][0] - a[0][0]) for a, b in zip(mission.sent, mission.sent[1:])) \
+        <= 0.05 + 1e-9                             # one step a tick
+    assert policy.tick(mission, leg) and mission.branches[-1] == CRUISE
+
+
+def test_one_shot_reacts_once_per_mission(clock):
+    mission, policy = FakeMission(clock), BypassPolicy(one_shot=True)
+    policy.start_mission(mission)
+    policy.handled = True
+    mission.close = {FRONT, RIGHT}
+
+    assert policy.tick(mission, Leg(1, (1.0, 0.0, 0.4), 3.0))
+    assert mission.branches == [CRUISE] and not mission.sent
+
+
+def follow(maneuver, ranges=None, ticks=300):
+    """Tick with the drone on every setpoint; the states it went through."""
+    position, states = (0.0, 0.0, 0.4), []
+    for _ in range(ticks):
+        setpoint = maneuver.tick(position, ranges or clear())
+        states.append(maneuver.state)
+        if setpoint is None:
+            return position, states
+        position = setpoint
+    return position, states
+
+
+def test_maneuver_phases_end_on_convergence():
+    maneuver = BypassManeuver((0.0, 0.0, 0.4), side=-0.5, forward=0.8)
+    position, states = follow(maneuver)
+
+    assert maneuver.state == DONE
+    assert position == pytest.approx((0.8, 0.0, 0.4))
+    assert [s for i, s in enumerate(states) if i == 0 or states[i - 1] != s] == [SIDESTEP, FORWARD, RETURN, DONE]
+    assert states.count(SIDESTEP) == 10 + 1     # 0.5 m in 5 cm steps, then the tick that sees convergence
+
+
+def test_maneuver_aborts_when_the_way_ahead_closes_and_replans_further_out():
+    maneuver = BypassManeuver((0.0, 0.0, 0.4), side=-0.5, forward=0.8)
+    position = (0.0, 0.0, 0.4)
+    while maneuver.state != FORWARD:
+        position = maneuver.tick(position, clear()) or position
+    for _ in range(3):
+        position = maneuver.tick(position, clear()) or position
+    assert maneuver.tick(position, clear(front=0.2)) is None
+
+    assert maneuver.state == ABORTED and maneuver.abort_reason == "front blocked during forward"
+    again = maneuver.replan(position)
+    assert again is not None and again.replans_left == maneuver.replans_left - 1
+    assert again.legs[0][1][1] == pytest.approx(position[1] - 0.5)        # sidesteps further out
+    assert again.legs[1][1][0] == pytest.approx(0.8)                       # same end of the forward leg
+    assert again.return_y == pytest.approx(0.0)                            # back onto the original line
@@ -0,0 +1,98 @@
+# Mission settings: layering of defaults, extends and overrides, and validation
+import pytest
+
+from flight.mission.config import SETTINGS, load, merge, mission_settings
+from flight.mission.policies import make_policy
+
+
+def config(**missions):
+    return {"defaults": {"policy": {"name": "bypass", "side": -0.5, "forward": 0.5}}, "missions": missions}
+
+
+def test_layers_apply_in_order():
+    cfg = config(base={"loop_rate_hz": 10, "policy": {"back": 0.3}},
+                 child={"extends": "base", "policy": {"forward": 0.8}, "pause_s": 0.5})
+    s = mission_settings("child", {"pause_s": 1.0}, cfg)
+
+    assert s["mission"] == "child"
+    assert s["loop_rate_hz"] == 10                  # from the mission it extends
+    assert s["pause_s"] == 1.0                      # overrides come last
+    assert s["policy"] == {"name": "bypass", "side": -0.5, "forward": 0.8, "back": 0.3}
+    assert s["hover_s"] == SETTINGS["hover_s"]
+
+
+def test_the_shipped_missions_load():
+    missions = load()["missions"]
+    for name in missions:
+        assert mission_settings(name)["mission"] == name
+    assert mission_settings("Waypoint_Avoid07")["policy"]["one_shot"] is True
+
+
+def test_nested_settings_merge_key_by_key_and_null_turns_them_off():
+    s = merge({**SETTINGS, "link_health": None}, {"link_health": {"stale_s": 0.5}}, "test")
+    assert s["link_health"] == {"stale_s": 0.5}
+
+    s = merge(s, {"link_health": {"max_hold_s": 2.0}, "range_filter": {"window": 5}}, "test")
+    assert s["link_health"] == {"stale_s": 0.5, "max_hold_s": 2.0}
+    assert s["range_filter"] == {**SETTINGS["range_filter"], "window": 5}
+
+    s = merge(s, {"range_filter": None}, "test")
+    assert s["range_filter"] is None
+
+
+def test_dotted_keys_set_one_parameter():
+    s = mission_settings("Waypoint_Avoid09", {"policy.forward": 1.0, "battery.reserve": 0.05})
+
+    assert s["policy"] == {"name": "bypass", "side": 0.5, "forward": 1.0, "back": 0.5}
+    assert s["battery"] == {"reserve": 0.05}        # a dotted key turns an entry that was off on
+
+
+def test_another_policy_drops_the_old_parameters():
+    assert mission_settings("Waypoint_Avoid09", {"policy": {"name": "detour"}})["policy"] == {"name": "detour"}
+    assert mission_settings("Waypoint_Avoid09", {"policy.name": "detour"})["policy"] == {"name": "detour"}
+    s = mission_settings("Waypoint_Avoid09", {"policy.name": "bypass"})     # the same policy keeps them
+    assert s["policy"]["forward"] == 0.8
+
+
+@pytest.mark.parametrize("overrides, message", [
+    ({"speed": 1.0}, "unknown setting 'speed'"),
+    ({"height.max": 1.0}, "unknown setting 'height.max'"),
+    ({"policy": "bypass"}, "policy must be an object"),
+])
+def test_merge_rejects_unknown_settings(overrides, message):
+    with pytest.raises(ValueError, match=message):
+        mission_settings("Waypoint_Avoid06", overrides)
+
+
+@pytest.mark.parametrize("overrides, message", [
+    ({"cruise": "teleport"}, "cruise must be one of trajectory, direct"),
+    ({"trigger": "bump"}, "trigger must be one of"),
+    ({"runtime": "fork"}, "runtime must be one of"),
+    ({"loop_rate_hz": 0}, "loop_rate_hz must be positive"),
+    ({"command_rate_hz": -1}, "command_rate_hz must be positive"),
+    ({"command_deadband": -0.01}, "command_deadband must not be negative"),
+    ({"route": []}, "route must be a list"),
+    ({"route": [[0.0, 0.0, 0.4]]}, "route must be a list"),
+    ({"battery.reserv": 0.1}, "unknown battery parameter reserv"),
+    ({"occupancy": {"cell": 0.1}}, "unknown occupancy parameter cell"),
+])
+def test_validate_rejects_bad_settings(overrides, message):
+    with pytest.raises(ValueError, match=message):
+        mission_settings("Waypoint_Avoid06", overrides)
+
+
+def test_missions_and_extends_are_checked():
+    with pytest.raises(ValueError, match="no mission 'nope'"):
+        mission_settings("nope")
+    with pytest.raises(ValueError, match="extends unknown mission 'gone'"):
+        mission_settings("a", config=config(a={"extends": "gone"}))
+    with pytest.raises(ValueError, match="circular extends"):
+        mission_settings("a", config=config(a={"extends": "b"}, b={"extends": "a"}))
+
+
+def test_policies_are_checked_when_made():
+    with pytest.raises(ValueError, match="unknown avoidance policy 'teleport'"):
+        make_policy(mission_settings("Waypoint_Avoid06", {"policy.name": "teleport"})["policy"])
+    with pytest.raises(ValueError, match="policy 'detour'"):
+        make_policy(mission_settings("Waypoint_Avoid06", {"policy": {"name": "detour", "side": 0.5}})["policy"])
+    assert make_policy(mission_settings("Waypoint_Avoid09")["policy"]).forward == 0.8
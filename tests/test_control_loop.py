@@ -0,0 +1,128 @@
+# Deadline-scheduled control loop on a fake clock: fixed grid, overruns, jitter, asyncio
+import asyncio
+
+import pytest
+
+from flight.control_loop import ControlLoop, percentile
+
+
+class Clock:
+    """Monotonic clock whose sleep advances it, plus optional oversleep per call."""
+
+    def __init__(self, late=0.0):
+        self.now = 0.0
+        self.late = late
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds + self.late
+
+
+class Stages:
+    def __init__(self):
+        self.ns = {}
+
+    def record(self, stage, ns):
+        self.ns.setdefault(stage, []).append(ns)
+
+
+def ticks(loop, clock, work, n):
+    """n iterations doing `work` seconds each; the wake-up times."""
+    woke = []
+    for _ in range(n):
+        clock.now += work
+        loop.wait()
+        woke.append(clock.now)
+    return woke
+
+
+def test_deadlines_sit_on_a_fixed_grid():
+    clock = Clock()
+    loop = ControlLoop(20, clock=clock, sleep=clock.sleep)
+    loop.start()
+
+    woke = ticks(loop, clock, 0.01, 100)
+
+    assert woke == pytest.approx([0.05 * (k + 1) for k in range(100)])      # work is absorbed, no drift
+    r = loop.report()
+    assert r["ticks"] == 100 and r["missed"] == 0
+    assert r["achieved_hz"] == pytest.approx(20.0)
+    assert r["busy_s"] == pytest.approx(1.0) and r["sleep_s"] == pytest.approx(4.0)
+    assert r["jitter_max_ms"] == pytest.approx(0.0, abs=1e-9)
+
+
+def test_overrun_skips_missed_slots_instead_of_bursting():
+    clock = Clock()
+    loop = ControlLoop(20, clock=clock, sleep=clock.sleep)
+    loop.start()
+
+    clock.now += 0.12                       # slots at 0.05 and 0.10 missed
+    late = loop.wait()
+    assert late == pytest.approx(0.02)      # behind the slot it should have made
+    assert clock.now == pytest.approx(0.12)     # no sleep on an overrun
+    woke = ticks(loop, clock, 0.0, 2)
+
+    assert woke == pytest.approx([0.15, 0.20])      # back on the grid, one tick per slot
+    assert loop.missed == 1 and loop.skipped == 1
+
+
+def test_start_reanchors_the_grid_and_keeps_statistics():
+    clock = Clock()
+    loop = ControlLoop(10, clock=clock, sleep=clock.sleep)
+    ticks(loop, clock, 0.0, 3)              # the first wait anchors the grid itself
+    clock.now = 5.03
+    loop.start()
+
+    assert ticks(loop, clock, 0.0, 1) == pytest.approx([5.13])
+    assert loop.ticks == 4
+
+
+def test_jitter_and_profiler_stages():
+    clock = Clock(late=0.002)
+    loop = ControlLoop(50, clock=clock, sleep=clock.sleep)
+    loop.profiler = Stages()
+    loop.start()
+    ticks(loop, clock, 0.005, 20)
+
+    r = loop.report()
+    assert r["jitter_p50_ms"] == pytest.approx(2.0)
+    assert r["missed"] == 0
+    assert len(loop.profiler.ns["work"]) == len(loop.profiler.ns["sleep"]) == 20
+    assert "Loop " in loop.summary() and "jitter p50 2.00 ms" in loop.summary()
+
+
+def test_wait_async_awaits_the_same_deadlines(monkeypatch):
+    clock = Clock()
+    loop = ControlLoop(20, clock=clock, sleep=clock.sleep)
+    real_sleep = asyncio.sleep
+
+    async def sleep(seconds):
+        clock.now += seconds
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+
+    async def run():
+        loop.start()
+        woke = []
+        for _ in range(5):
+            clock.now += 0.01
+            await loop.wait_async()
+            woke.append(clock.now)
+        return woke
+
+    assert asyncio.run(run()) == pytest.approx([0.05, 0.10, 0.15, 0.20, 0.25])
+
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        ControlLoop(0)
+
+
+def test_percentile_is_nearest_rank():
+    values = [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert percentile(values, 50) == 2.0
+    assert percentile(values, 100) == 4.0
+    assert percentile([], 99) == 0.0
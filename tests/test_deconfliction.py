@@ -0,0 +1,94 @@
+# Deconfliction: spatial hash queries against brute force, closest approach and who gives way
+import math
+import random
+
+import pytest
+
+from flight.deconfliction import (Agent, Deconfliction, SpatialHash, brute_force_within, closest_approach,
+                                  segment_distance)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def agent(i, x, y, z=0.4):
+    return Agent(i, x, y, z, 0.0, 0.0, 0.0, 0.0)
+
+
+def test_geometry():
+    assert segment_distance((0.5, 1.0, 0.0), (0.0, 0.0, 0.0), (1.0, 0.0, 0.0)) == pytest.approx(1.0)
+    assert segment_distance((2.0, 0.0, 0.0), (0.0, 0.0, 0.0), (1.0, 0.0, 0.0)) == pytest.approx(1.0)
+    assert segment_distance((0.0, 3.0, 4.0), (0.0, 0.0, 0.0), (0.0, 0.0, 0.0)) == pytest.approx(5.0)
+
+    t, d = closest_approach((2.0, 0.2, 0.0), (-1.0, 0.0, 0.0), horizon=5.0)      # head-on, 0.2 m apart sideways
+    assert (t, d) == pytest.approx((2.0, 0.2))
+    assert closest_approach((2.0, 0.2, 0.0), (-1.0, 0.0, 0.0), horizon=1.0) == pytest.approx((1.0, math.hypot(1.0, 0.2)))
+    assert closest_approach((1.0, 0.0, 0.0), (1.0, 0.0, 0.0), horizon=1.0) == (0.0, 1.0)    # moving apart
+
+
+def test_hash_queries_match_brute_force():
+    rng = random.Random(0)
+    index = SpatialHash(cell=0.5)
+    for i in range(300):
+        index.update(agent(i, rng.uniform(0.0, 10.0), rng.uniform(0.0, 10.0), rng.uniform(0.0, 2.0)))
+    for i in range(0, 300, 3):                              # move a third of them
+        index.update(agent(i, rng.uniform(0.0, 10.0), rng.uniform(0.0, 10.0), rng.uniform(0.0, 2.0)))
+    for i in range(0, 300, 7):
+        index.remove(i)
+    agents = list(index.agents.values())
+
+    for _ in range(50):
+        point = (rng.uniform(0.0, 10.0), rng.uniform(0.0, 10.0), rng.uniform(0.0, 2.0))
+        for radius in (0.35, 1.3, 30.0):
+            assert sorted(a.id for a, _ in index.within(point, radius)) == \
+                sorted(a.id for a, _ in brute_force_within(agents, point, radius))
+        end = (rng.uniform(0.0, 10.0), rng.uniform(0.0, 10.0), 1.0)
+        assert sorted(a.id for a, _ in index.near_segment(point, end, 0.5)) == \
+            sorted(a.id for a in agents if segment_distance((a.x, a.y, a.z), point, end) <= 0.5)
+    assert sum(len(ids) for ids in index._cells.values()) == len(agents)
+
+
+def test_head_on_pair_one_gives_way():
+    service = Deconfliction(radius=0.35, horizon=1.0, clock=Clock())
+    service.update("cf1", (0.0, 0.0, 0.4), (0.5, 0.0, 0.0))
+    service.update("cf2", (1.0, 0.0, 0.4), (-0.5, 0.0, 0.0))
+
+    conflict = service.conflicts("cf1")[0]
+    assert conflict.other == "cf2" and conflict.distance == pytest.approx(1.0)
+    assert conflict.t_cpa == pytest.approx(1.0) and conflict.d_cpa == pytest.approx(0.0)
+    assert service.give_way("cf1") is None                  # cf1 has right of way
+    assert service.give_way("cf2").other == "cf1"
+
+
+def test_passing_and_parked_drones():
+    service = Deconfliction(radius=0.35, horizon=1.0, clock=Clock())
+    service.update("cf1", (0.0, 0.0, 0.4), (0.5, 0.0, 0.0))
+    service.update("cf2", (1.0, 0.5, 0.4), (-0.5, 0.0, 0.0))    # passes 0.5 m to the side
+    assert service.conflicts("cf1") == []
+
+    service.update("cf3", (1.5, 0.1, 0.4))                       # hovering on cf1's next segment
+    assert service.conflicts("cf1") == []                        # out of reach at its current velocity
+    conflict = service.conflicts("cf1", target=(2.0, 0.0, 0.4))[0]
+    assert conflict.other == "cf3" and conflict.t_cpa == 0.0 and conflict.d_cpa == pytest.approx(0.1)
+
+
+def test_stale_and_removed_drones_are_ignored():
+    clock = Clock()
+    service = Deconfliction(radius=0.35, max_age=0.5, clock=clock)
+    service.update("cf1", (0.0, 0.0, 0.4))
+    service.update("cf2", (0.2, 0.0, 0.4))
+    assert service.neighbours("cf1") == [("cf2", pytest.approx(0.2))]
+
+    clock.now = 0.6
+    service.update("cf1", (0.0, 0.0, 0.4))
+    assert service.neighbours("cf1") == [] and service.conflicts("cf1") == []     # cf2's link went quiet
+
+    service.update("cf2", (0.2, 0.0, 0.4))
+    service.remove("cf2")
+    assert service.neighbours("cf1") == [] and service.get("cf2") is None
+    assert service.neighbours("cf9") == [] and service.give_way("cf9") is None
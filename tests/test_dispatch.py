@@ -0,0 +1,133 @@
+# CommandDispatcher: deduplication, coalescing, priorities and the packet budget
+import re
+
+from flight.dispatch import SAFETY, CommandDispatcher
+from flight.sim import World, box
+
+from conftest import line
+
+
+class FakeCommander:
+    """PositionHlCommander stand-in that records the go_to's put on the air."""
+
+    _default_height = 0.4
+    _default_velocity = 0.5
+
+    def __init__(self):
+        self.sent = []
+        self.landed = False
+
+    def go_to(self, x, y, z, velocity=None):
+        self.sent.append((x, y, z, velocity))
+
+    def get_position(self):
+        return (0.0, 0.0, 0.4)
+
+    def land(self):
+        self.landed = True
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def counts(report):
+    """(sent, requested, duplicates, coalesced, safety) from the mission's Commands line."""
+    match = re.match(r"Commands: (\d+) of (\d+) go_to sent, \d+ packets saved \(\d+%: (\d+) duplicate, "
+                     r"(\d+) coalesced\), (\d+) safety", line(report, "Commands:"))
+    return tuple(int(n) for n in match.groups())
+
+
+def test_identical_setpoints_go_out_once():
+    commander = FakeCommander()
+    dispatcher = CommandDispatcher(commander)
+    for _ in range(5):
+        dispatcher.go_to(1.0, 0.0, 0.4)
+    dispatcher.go_to(1.0, 0.2, 0.4)
+
+    assert commander.sent == [(1.0, 0.0, 0.4, None), (1.0, 0.2, 0.4, None)]
+    assert dispatcher.report() == {"requested": 6, "sent": 2, "saved": 4, "duplicates": 4, "coalesced": 0,
+                                   "safety": 0}
+
+
+def test_deadband_drops_small_steps():
+    commander = FakeCommander()
+    dispatcher = CommandDispatcher(commander, deadband=0.005)
+    dispatcher.go_to(1.0, 0.0, 0.4)
+    dispatcher.go_to(1.003, 0.0, 0.4)
+    dispatcher.go_to(1.01, 0.0, 0.4)
+
+    assert [x for x, *_ in commander.sent] == [1.0, 1.01]
+    assert dispatcher.duplicates == 1
+
+
+def test_burst_over_budget_is_coalesced_to_the_latest():
+    clock = Clock()
+    commander = FakeCommander()
+    dispatcher = CommandDispatcher(commander, rate_hz=10, burst=1, clock=clock)
+    for i in range(5):
+        dispatcher.go_to(0.1 * (i + 1), 0.0, 0.4)
+    assert len(commander.sent) == 1
+    assert not dispatcher.flush()               # still no token
+
+    clock.now = 0.1
+    assert dispatcher.flush()
+    assert commander.sent[-1][0] == 0.5         # only the latest target
+    assert dispatcher.coalesced == 3
+    assert dispatcher.pending is None
+
+
+def test_safety_commands_never_wait_and_cancel_routine():
+    clock = Clock()
+    commander = FakeCommander()
+    dispatcher = CommandDispatcher(commander, rate_hz=10, burst=1, clock=clock)
+    dispatcher.go_to(0.1, 0.0, 0.4)
+    dispatcher.go_to(0.2, 0.0, 0.4)             # held back
+    assert dispatcher.go_to(0.0, -0.5, 0.4, priority=SAFETY)
+
+    assert commander.sent[-1][:3] == (0.0, -0.5, 0.4)
+    assert dispatcher.pending is None
+    assert dispatcher.safety == 1 and dispatcher.coalesced == 1
+    clock.now = 0.1
+    assert dispatcher.delay() == 0.0            # the safety packet left no debt behind
+
+    dispatcher.land()
+    assert commander.landed and dispatcher.safety == 2
+
+
+def test_direct_cruise_sends_each_waypoint_once(fly):
+    report = fly(mission="Waypoint_Avoid04")
+    sent, requested, duplicates, coalesced, _ = counts(report)
+
+    assert "Mission completed successfully" in report["output"]
+    assert sent == 7                            # one go_to per waypoint
+    assert duplicates == requested - sent and coalesced == 0
+    assert report["drones"][0]["commands"] == sent + 1     # and the take-off
+
+
+def test_packet_budget_coalesces_the_stream(fly):
+    unlimited = fly()
+    limited = fly({"command_rate_hz": 10})
+    sent, requested, duplicates, coalesced, _ = counts(limited)
+
+    assert requested == counts(unlimited)[1]
+    assert coalesced > 0 and duplicates == 0
+    assert sent + coalesced == requested
+    assert sent <= 10 * limited["sim_time"]
+    assert limited["drones"][0]["commands"] < unlimited["drones"][0]["commands"]
+    x, y, _ = limited["drones"][0]["position"]
+    assert abs(x) < 0.05 and abs(y) < 0.05     # still flew the whole route
+    assert abs(limited["sim_time"] - unlimited["sim_time"]) < 1.0
+
+
+def test_bypass_goes_out_as_safety_commands(fly):
+    report = fly({"command_rate_hz": 5}, World([box(0.5, 0.0, 0.2, 0.2)]), mission="Waypoint_Avoid09")
+    _, _, _, _, safety = counts(report)
+
+    assert "Obstacle detected in FRONT" in report["output"]
+    assert safety > 0
+    assert report["collisions"] == 0
@@ -0,0 +1,143 @@
+# Link-health monitor and the mission's hold on stale sensor data
+import math
+
+import pytest
+
+from flight.link_health import LinkHealth, LinkLost
+from flight.sim import World
+
+from conftest import line
+
+OUTAGE = (9.0, 10.0)        # on the second leg, the drone at cruise speed
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Callbacks:
+    def __init__(self):
+        self.callbacks = []
+
+    def add_callback(self, cb):
+        self.callbacks.append(cb)
+
+
+class LogConfig:
+    def __init__(self, name, period_in_ms):
+        self.name = name
+        self.period_in_ms = period_in_ms
+        self.data_received_cb = Callbacks()
+
+
+class Source:
+    """Multiranger stand-in: one log block whose packets the test delivers."""
+
+    def __init__(self, name="ranges", period_in_ms=100):
+        self._log_config = LogConfig(name, period_in_ms)
+
+    def packet(self, timestamp):
+        for cb in self._log_config.data_received_cb.callbacks:
+            cb(timestamp, {}, self._log_config)
+
+
+class OutageWorld(World):
+    """World with one radio outage from `start` to `end`; records the drone's track."""
+
+    def __init__(self, start, end, **kwargs):
+        super().__init__(outage_rate=1.0, **kwargs)
+        self.outage = (start, end)
+        self.track = []
+
+    def outage_left(self):
+        start, end = self.outage
+        return end - self.now if start <= self.now < end else 0.0
+
+    def advance(self, until):
+        super().advance(until)
+        for drone in self.drones.values():
+            self.track.append((self.now, tuple(drone.pos)))
+
+    def top_speed(self, start, end):
+        points = [(t, p) for t, p in self.track if start <= t <= end]
+        return max(math.dist(p, q) / (s - t) for (t, p), (s, q) in zip(points, points[1:]) if s > t)
+
+
+def test_stale_data_holds_and_fresh_data_resumes():
+    clock = Clock()
+    link = LinkHealth(stale_s=0.3, clock=clock)
+    ranges = Source()
+    link.attach(ranges)
+    for i in range(5):
+        clock.now = 0.1 * i
+        ranges.packet(100 * i)
+        link.update()
+    assert not link.stale and link.scale == 1.0
+
+    clock.now = 0.8
+    link.update()
+    assert link.stale and link.holds == 1
+
+    clock.now = 0.9
+    ranges.packet(900)
+    link.update()
+    assert not link.stale
+    assert link.report()["held_s"] == pytest.approx(0.1)
+    assert link.report()["loss"] > 0.0                  # the gap in the log timestamps
+
+
+def test_slow_link_scales_the_step_down():
+    clock = Clock()
+    link = LinkHealth(nominal_delay=0.2, min_scale=0.3, clock=clock)
+    link.attach(Source())
+    link._on_latency(300.0)
+    link.update()
+
+    assert link.delay == pytest.approx(0.3)
+    assert link.scale == pytest.approx(0.2 / 0.3)
+    assert link.margin(1.0) == pytest.approx(0.1)
+
+    link._on_latency(2000.0)
+    link.update()
+    assert link.scale == 0.3
+
+
+def test_holding_too_long_loses_the_link():
+    clock = Clock()
+    link = LinkHealth(stale_s=0.3, max_hold_s=1.0, clock=clock)
+    link.attach(Source())
+    clock.now = 0.5
+    link.update()
+    clock.now = 1.6
+    with pytest.raises(LinkLost):
+        link.update()
+
+
+def test_mission_hovers_through_an_outage(fly):
+    blind = OutageWorld(*OUTAGE)
+    fly(world=blind)
+    world = OutageWorld(*OUTAGE)
+    report = fly({"link_health.stale_s": 0.3}, world)
+
+    assert "holding position" in report["output"]
+    assert "held 1 times" in line(report, "Link:")
+    assert line(report, "Commands:").endswith(" 1 safety")        # the hold's go_to
+    assert "Mission completed successfully" in report["output"]
+    assert report["collisions"] == 0
+    x, y, _ = report["drones"][0]["position"]
+    assert abs(x) < 0.05 and abs(y) < 0.05
+    # the held leg restarts from where the drone stopped instead of racing to catch up
+    end = OUTAGE[1]
+    assert world.top_speed(end, end + 0.5) < 0.5 * blind.top_speed(end, end + 0.5)
+
+
+def test_clean_link_never_holds(fly):
+    report = fly({"link_health.stale_s": 0.3})
+
+    assert "holding position" not in report["output"]
+    assert "held 0 times" in line(report, "Link:")
+    assert "slowed 0% of ticks" in line(report, "Link:")
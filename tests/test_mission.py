@@ -0,0 +1,44 @@
+# Mission engine: checks before take-off and the max_flight_s failsafe
+import pytest
+
+from flight.sim import Sandbox, World
+
+from conftest import ROOT
+
+SWEEP = [(0.1 * i, 0.2 * (i % 2), 0.4, 1.0) for i in range(40)]     # more legs than the trajectory memory holds
+
+
+@pytest.fixture
+def engine():
+    """flight.mission.engine (it imports cflib) in a fresh simulated world."""
+    return Sandbox(World(), ROOT)._load_local("flight.mission.engine")
+
+
+def test_failsafe_lands_and_ends_the_flight(fly):
+    report = fly({"max_flight_s": 5.0})
+
+    out = report["output"]
+    assert "Failsafe: max flight time exceeded — landing." in out
+    assert "Mission aborted: max flight time exceeded" in out
+    assert "Mission completed successfully" not in out
+    assert not report["drones"][0]["flying"]
+
+
+def test_failsafe_aborts_a_swarm_drone_only():
+    swarm = Sandbox(World(), ROOT)._load_local("flight.swarm")
+    route = [(0.0, 0.0, 0.4, 3.0), (1.0, 0.0, 0.4, 3.0), (1.0, 0.5, 0.4, 3.0), (0.0, 0.5, 0.4, 3.0)]
+    drones = [swarm.DroneMission("radio://0/80/2M/E7E7E7E701", route, settings={"max_flight_s": 4.0}),
+              swarm.DroneMission("radio://0/80/2M/E7E7E7E702", [(x, y + 1.0, z, s) for x, y, z, s in route],
+                                 origin=(0.0, 1.0, 0.0))]
+    aborted, flown = swarm.Swarm(drones).run()
+
+    assert aborted["error"] == "MissionAborted: max flight time exceeded"
+    assert not aborted["completed"]
+    assert flown["error"] is None and flown["completed"]
+
+
+def test_onboard_route_too_long_fails_before_connecting(engine):
+    with pytest.raises(ValueError, match="mission 'Waypoint_Avoid06': 39 trajectory pieces do not fit"):
+        engine.Mission("Waypoint_Avoid06", {"route": SWEEP, "onboard_trajectory": True})
+
+    assert engine.Mission("Waypoint_Avoid06", {"route": SWEEP}).trajectory is not None     # streamed: no limit
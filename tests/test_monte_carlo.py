@@ -0,0 +1,61 @@
+# Monte Carlo runner: seeded scenarios, interval statistics and the pooled run streaming to a results file
+import json
+import os
+
+import pytest
+
+from flight.monte_carlo import ROUTE_XY, SCENARIO, Summary, faulty, make_world, run, run_one, summarize, wilson
+
+from conftest import ROOT
+
+SCRIPT = os.path.join(ROOT, "Waypoint_Avoid06.py")
+
+
+def test_a_seed_fixes_the_scenario():
+    a, b = make_world(7), make_world(7)
+    assert a.obstacles == b.obstacles
+    assert (a.range_noise, a.latency) == (b.range_noise, b.latency)
+    assert any(make_world(seed).obstacles != a.obstacles for seed in range(5))
+
+
+def test_obstacles_keep_clear_of_the_route():
+    for seed in range(50):
+        world = make_world(seed)
+        assert 0 <= len(world.obstacles) <= SCENARIO["boxes"][1]
+        for b in world.obstacles:
+            for x, y in ROUTE_XY:
+                gap = max(b.xmin - x, x - b.xmax, b.ymin - y, y - b.ymax)
+                assert gap > SCENARIO["keep_out"] - 1e-9
+
+
+def test_faulty_scenarios_pin_the_fault_rates():
+    world = make_world(3, faulty(SCENARIO, outliers=0.1, loss=0.2, charge=0.5))
+    assert (world.range_outliers, world.packet_loss) == (0.1, 0.2)
+
+
+def test_wilson_interval():
+    assert wilson(0, 0) == (0.0, 1.0)
+    assert wilson(0, 10) == pytest.approx((0.0, 0.2775), abs=1e-4)
+    assert wilson(5, 10) == pytest.approx((0.2366, 0.7634), abs=1e-4)
+
+
+def test_summary_statistics():
+    s = Summary()
+    for t, collided in ((10.0, False), (12.0, True), (14.0, False)):
+        s.add({"collided": collided, "completed": not collided, "sim_time": t, "min_clearance": t / 100})
+    r = s.report()
+
+    assert r["runs"] == 3 and r["collision_rate"] == pytest.approx(1 / 3)
+    assert r["time_mean"] == pytest.approx(12.0)
+    assert r["time_ci95"] == pytest.approx((12.0 - 1.959964 * 2.0 / 3 ** 0.5, 12.0 + 1.959964 * 2.0 / 3 ** 0.5))
+    assert r["min_clearance"] == 0.1
+
+
+def test_pooled_run_matches_single_flights(tmp_path):
+    out = tmp_path / "results.jsonl"
+    results = run([SCRIPT], runs=2, seed=5, workers=1, chunk=1, out=str(out))
+
+    lines = [json.loads(line) for line in out.read_text().splitlines()]
+    assert sorted(r["seed"] for r in lines) == [5, 6]
+    assert json.loads(json.dumps(summarize(out))) == json.loads(json.dumps(results))
+    assert lines[0] == json.loads(json.dumps(run_one(SCRIPT, lines[0]["seed"])))     # deterministic per seed
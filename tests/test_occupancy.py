@@ -0,0 +1,128 @@
+# Occupancy grid: ray traversal, log-odds updates across tiles, change tracking and the mission feeding it
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from flight.occupancy import OccupancyGrid, line_cells
+from flight.sim import Sandbox, World, box
+
+from conftest import ROOT
+
+
+def ranges(front=None, back=None, left=None, right=None, up=None, down=None):
+    return SimpleNamespace(front=front, back=back, left=left, right=right, up=up, down=down)
+
+
+def test_line_cells_includes_both_ends():
+    cells = line_cells((0, 0), (5, 2)).tolist()
+
+    assert cells[0] == [0, 0] and cells[-1] == [5, 2]
+    assert cells == [[0, 0], [1, 0], [2, 1], [3, 1], [4, 2], [5, 2]]
+    steps = np.diff(np.asarray(cells), axis=0)
+    assert np.abs(steps).max() == 1             # no gaps between consecutive cells
+
+
+def test_line_cells_single_cell_and_3d():
+    assert line_cells((3, -4), (3, -4)).tolist() == [[3, -4]]
+
+    cells = line_cells((0, 0, 0), (-2, 4, 1)).tolist()
+    assert len(cells) == 5
+    assert cells[0] == [0, 0, 0] and cells[-1] == [-2, 4, 1]
+
+
+def test_free_and_occupied_log_odds():
+    grid = OccupancyGrid(resolution=0.1, max_range=2.0)
+    grid.update_ray((0.05, 0.05, 0.4), (1.0, 0.0, 0.0), 0.5)
+
+    hit = grid.cell((0.55, 0.05))
+    assert grid.log_odds(hit) == pytest.approx(grid.l_occ)
+    assert grid.is_occupied_at((0.55, 0.05, 0.4))
+    for x in range(5):
+        assert grid.log_odds((x, 0)) == pytest.approx(grid.l_free)
+    assert grid.log_odds((6, 0)) == 0.0         # past the hit: unknown
+    assert grid.probability((6, 0)) == pytest.approx(0.5)
+
+
+def test_log_odds_clip_at_the_bounds():
+    grid = OccupancyGrid(resolution=0.1, max_range=2.0)
+    for _ in range(20):
+        grid.update_ray((0.05, 0.05), (1.0, 0.0, 0.0), 0.5)
+
+    assert grid.log_odds((5, 0)) == pytest.approx(grid.l_max)
+    assert grid.log_odds((2, 0)) == pytest.approx(grid.l_min)
+
+
+def test_nothing_in_range_marks_the_whole_ray_free():
+    grid = OccupancyGrid(resolution=0.1, max_range=1.0)
+    grid.update_ray((0.05, 0.05), (0.0, 1.0, 0.0), None)
+
+    assert all(grid.log_odds((0, y)) == pytest.approx(grid.l_free) for y in range(11))
+    assert not list(grid.occupied_cells())
+
+
+@pytest.mark.parametrize("direction", [(1.0, 0.0, 0.0), (-1.0, 0.0, 0.0), (0.0, -1.0, 0.0)])
+def test_rays_across_tile_boundaries(direction):
+    grid = OccupancyGrid(resolution=0.1, tile=4, max_range=3.0)
+    grid.update_ray((0.05, 0.05), direction, 1.5)
+
+    dx, dy = int(direction[0]), int(direction[1])
+    assert grid.is_occupied((15 * dx, 15 * dy))
+    assert all(grid.log_odds((k * dx, k * dy)) == pytest.approx(grid.l_free) for k in range(15))
+    # cells 0..±15 over tiles of 4: four tiles going up, five going down (the origin's tile and -1..-4)
+    assert len(grid.tiles) == len({(k * dx // 4, k * dy // 4) for k in range(16)})
+    assert list(grid.occupied_cells()) == [(15 * dx, 15 * dy)]
+
+
+def test_update_counts_the_shared_cell_once():
+    grid = OccupancyGrid(resolution=0.1, max_range=1.0)
+    grid.update((0.05, 0.05, 0.4), ranges(front=0.5, back=0.5, left=None, right=0.3))
+
+    # every planar ray starts in the drone's cell
+    assert grid.log_odds((0, 0)) == pytest.approx(grid.l_free)
+    assert grid.is_occupied((5, 0)) and grid.is_occupied((-5, 0)) and grid.is_occupied((0, -3))
+    assert grid.log_odds((0, 10)) == pytest.approx(grid.l_free)
+    assert grid.version == 1
+
+
+def test_yaw_rotates_the_rays():
+    grid = OccupancyGrid(resolution=0.1, max_range=1.0)
+    grid.update((0.05, 0.05, 0.4), ranges(front=0.5), yaw=np.pi / 2)
+
+    assert grid.is_occupied((0, 5))             # front points along +y
+
+
+def test_drain_changes_reports_each_flip_once():
+    grid = OccupancyGrid(resolution=0.1, max_range=2.0)
+    grid.update_ray((0.05, 0.05), (1.0, 0.0, 0.0), 0.5)
+
+    assert grid.drain_changes() == {(5, 0)}     # free cells stay on the free side: no flip
+    assert grid.drain_changes() == set()
+
+    grid.update_ray((0.05, 0.05), (1.0, 0.0, 0.0), 0.5)
+    assert grid.drain_changes() == set()        # more evidence, same state
+
+    for _ in range(5):                          # the obstacle moved away
+        grid.update_ray((0.05, 0.05), (1.0, 0.0, 0.0), None)
+    assert grid.drain_changes() == {(5, 0)}
+    assert not grid.is_occupied((5, 0))
+
+
+def test_mission_maps_the_obstacle_it_flies_past():
+    world = World(obstacles=[box(0.5, 0.0, 0.2, 0.2)])
+    mission = Sandbox(world, ROOT)._load_local("flight.mission.engine")
+    flight = mission.Mission("Waypoint_Avoid09", {"telemetry_file": None})
+    flight.fly()
+
+    grid = flight.grid
+    assert grid.version > 100                   # fed every tick
+    assert grid.is_occupied_at((0.41, 0.0))     # the box's near face
+    assert not grid.is_occupied_at((0.2, 0.0))
+    occupied = np.asarray([grid.center(c) for c in grid.occupied_cells()])
+    assert len(occupied)
+    assert (np.abs(occupied[:, 0] - 0.5) <= 0.15).mean() > 0.5
+
+
+def test_grid_can_be_turned_off():
+    mission = Sandbox(World(), ROOT)._load_local("flight.mission.engine")
+    assert mission.Mission("Waypoint_Avoid09", {"telemetry_file": None, "occupancy": None}).grid is None
@@ -0,0 +1,101 @@
+# On-board trajectory execution against the simulator's trajectory memory and commander
+import pytest
+
+from flight.sim import Sandbox, World, box
+from flight.trajectory import Trajectory
+
+from conftest import ROOT, line
+
+FINISH = (0.0, 0.0)         # the route ends where it started
+ROUTE_LENGTH = 4.8          # horizontal length of the default route (m)
+
+
+@pytest.fixture(scope="module")
+def hl_trajectory():
+    """flight.hl_trajectory (it imports cflib's memory classes) loaded against the simulated cflib."""
+    return Sandbox(World(), ROOT)._load_local("flight.hl_trajectory")
+
+
+class FakeCf:
+    """Just the high-level commander, recording what would go on the air."""
+
+    def __init__(self):
+        self.high_level_commander = self
+        self.sent = []
+
+    def start_trajectory(self, *args):
+        self.sent.append(("start_trajectory",) + args)
+
+    def go_to(self, *args):
+        self.sent.append(("go_to",) + args)
+
+
+def test_track_and_overrides_keep_the_expected_position(hl_trajectory):
+    cf = FakeCf()
+    trajectory = Trajectory([(0.0, 0.0, 0.4, 3.0), (1.0, 0.0, 0.4, 3.0)], start=(0.0, 0.0, 0.4), rate_hz=20)
+    onboard = hl_trajectory.OnboardTrajectory(cf, trajectory, velocity=0.5)
+    onboard.compile()
+    onboard.uploaded = True
+    assert onboard.position() is None
+
+    segment = onboard.start(1, (0.0, 0.0, 0.4))
+    assert cf.sent == [("start_trajectory", 2, 1.0, False)]
+    assert onboard.position() == (0.0, 0.0, 0.4)
+
+    onboard.track(segment, 11)
+    x, y, z = onboard.position()
+    assert x == pytest.approx(float(segment.setpoint(10)[0])) and 0.0 < x < 1.0
+
+    onboard.go_to(x, -0.5, 0.4)                 # an override pre-empts the leg from there
+    assert cf.sent[-1] == ("go_to", x, -0.5, 0.4, 0.0, pytest.approx(1.0))
+    assert onboard.position() == (x, -0.5, 0.4)
+
+    onboard.start(1, onboard.position())        # off the plan: one go_to to the waypoint
+    assert cf.sent[-1][:4] == ("go_to", 1.0, 0.0, 0.4)
+
+
+def test_legs_are_uploaded_once_and_started_on_board(fly):
+    streamed = fly()
+    onboard = fly({"onboard_trajectory": True})
+    drone = onboard["drones"][0]
+
+    assert "Mission completed successfully" in onboard["output"]
+    assert drone["memory_writes"] == 1
+    assert streamed["drones"][0]["memory_writes"] == 0
+    # a define_trajectory per leg plus a start_trajectory per leg, no go_to stream
+    assert drone["commands"] < streamed["drones"][0]["commands"] / 5
+    assert line(onboard, "Commands:").startswith("Commands: 0 of 0 go_to sent")
+
+
+def test_onboard_flight_follows_the_streamed_route(fly):
+    streamed = fly()
+    onboard = fly({"onboard_trajectory": True})
+
+    assert abs(onboard["sim_time"] - streamed["sim_time"]) < 2.0
+    assert onboard["distance"] > ROUTE_LENGTH
+    for report in (streamed, onboard):
+        x, y, _ = report["drones"][0]["position"]
+        assert abs(x - FINISH[0]) < 0.05 and abs(y - FINISH[1]) < 0.05
+
+
+def test_avoidance_overrides_the_onboard_leg(fly):
+    world = World([box(0.5, 0.0, 0.2, 0.2)])
+    report = fly({"onboard_trajectory": True}, world, mission="Waypoint_Avoid09")
+
+    assert "Obstacle detected in FRONT" in report["output"]
+    assert "Mission completed successfully" in report["output"]
+    assert report["collisions"] == 0
+    assert report["drones"][0]["memory_writes"] == 1
+    assert int(line(report, "Commands:").split()[1]) > 0        # the bypass went out as go_to's
+
+
+def test_swarm_overrides_of_onboard_legs_take_radio_slots():
+    swarm = Sandbox(World([box(0.5, 0.0, 0.2, 0.2)]), ROOT)._load_local("flight.swarm")
+    drone = swarm.DroneMission("radio://0/80/2M/E7E7E7E701", [(0.0, 0.0, 0.4, 3.0), (1.0, 0.0, 0.4, 3.0)],
+                               settings={"onboard_trajectory": True, "telemetry_file": None})
+    run = swarm.Swarm([drone])
+    [report] = run.run()
+
+    assert report["error"] is None and report["bypasses"] == 1
+    assert report["commands_sent"] > 0
+    assert run.radio.sent == report["commands_sent"]      # every override went through the shared radio
@@ -0,0 +1,65 @@
+# D* Lite over the occupancy grid and the planner policy flying around what the grid has seen
+import pytest
+
+from flight.mission.config import mission_settings
+from flight.occupancy import OccupancyGrid
+from flight.planner import DStarLite
+from flight.sim import World, box
+
+from conftest import line
+
+WIDE = box(0.5, 0.0, 0.2, 0.8)          # wider than the bypass policy's 0.5 m sidestep
+
+
+def wall(grid, x, y0, y1):
+    """Mark the cells of a wall at x from y0 to y1 occupied."""
+    y = y0
+    while y <= y1:
+        grid.update_ray((x - 0.3, y), (1.0, 0.0, 0.0), 0.3)
+        y += grid.resolution
+
+
+def test_planner_goes_around_a_wall_it_learns_about():
+    grid = OccupancyGrid(resolution=0.05, max_range=2.0)
+    planner = DStarLite(grid, (0.0, 0.0, 0.4), (1.0, 0.0, 0.4))
+    planner.replan((0.0, 0.0, 0.4))
+
+    assert planner.straight()
+    assert planner.next_point() == (1.0, 0.0, 0.4)
+
+    wall(grid, 0.5, -0.4, 0.4)
+    planner.replan((0.0, 0.0, 0.4))
+
+    assert not planner.straight()
+    assert planner.next_point() != (1.0, 0.0, 0.4)
+    corners = planner.waypoints()
+    assert max(abs(y) for _, y, _ in corners) > 0.4 + planner.grid.resolution   # round the wall's end
+    assert corners[-1] == (1.0, 0.0, 0.4)
+    cells = planner.path()
+    assert cells[0] == planner.start and cells[-1] == planner.goal
+    assert not any(planner.blocked(c) for c in cells)
+
+
+def test_planner_mission_gets_around_a_wide_obstacle(fly):
+    bypass = fly(world=World(obstacles=[WIDE]))
+    report = fly(world=World(obstacles=[WIDE]), mission="Waypoint_Avoid10")
+
+    assert bypass["collisions"]                 # a 0.5 m sidestep is not enough
+    assert report["collisions"] == 0
+    assert "Mission completed successfully" in report["output"]
+    assert report["output"].count("Planned path complete") == 2     # out along y = 0 and back along y = -0.4
+    x, y, _ = report["drones"][0]["position"]
+    assert abs(x) < 0.05 and abs(y) < 0.05
+
+
+def test_planner_mission_cruises_without_obstacles(fly):
+    report = fly(mission="Waypoint_Avoid10")
+
+    assert "Obstacle" not in report["output"]
+    assert line(report, "Commands:").endswith(" 0 safety")
+
+
+def test_planner_needs_the_occupancy_grid():
+    assert mission_settings("Waypoint_Avoid10")["policy"] == {"name": "planner"}
+    with pytest.raises(ValueError, match="planner policy needs the occupancy grid"):
+        mission_settings("Waypoint_Avoid10", {"occupancy": None})
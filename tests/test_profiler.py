@@ -0,0 +1,121 @@
+# Stage profiler: log-linear histogram precision, timed wrappers and the saved report
+import json
+import random
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from flight import profiler
+from flight.profiler import Histogram, Profiler, bucket, bucket_value
+
+
+class Clock:
+    """perf_counter_ns stand-in: every read moves time on by `step` ns."""
+
+    def __init__(self, step):
+        self.now = 0
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+def test_buckets_hold_values_to_about_three_percent():
+    for value in list(range(200)) + [random.Random(1).randrange(1, 1 << 45) for _ in range(2000)]:
+        top = bucket_value(bucket(value))
+        assert value <= top <= value * (1 + 1 / 32) + 1
+        assert bucket(top) == bucket(value)
+
+
+def test_percentiles_track_the_exact_ones():
+    rng = random.Random(0)
+    values = sorted(int(rng.lognormvariate(11, 1)) for _ in range(5000))
+    h = Histogram()
+    for v in values:
+        h.record(v)
+
+    for pct in (50, 90, 99):
+        exact = values[int(round(pct / 100 * len(values))) - 1]
+        assert exact <= h.percentile(pct) <= exact * 1.04
+    assert h.percentile(100) == h.max == values[-1] and h.min == values[0]
+    assert h.count == 5000 and h.total == sum(values)
+    assert Histogram().percentile(99) == 0
+
+
+def test_merge_adds_up():
+    a, b, both = Histogram(), Histogram(), Histogram()
+    for v in (5, 900, 70000):
+        a.record(v)
+        both.record(v)
+    for v in (1, 3000000):
+        b.record(v)
+        both.record(v)
+    a.merge(b)
+
+    assert (a.counts, a.count, a.total, a.min, a.max) == (both.counts, both.count, both.total, both.min, both.max)
+
+
+def test_wrapped_calls_are_timed_even_when_they_raise():
+    p = Profiler(clock=Clock(1500))
+
+    def is_close():
+        return True
+
+    def go_to():
+        raise RuntimeError("link lost")
+
+    assert p.wrap(is_close)() is True
+    with pytest.raises(RuntimeError):
+        p.wrap(go_to, "dispatch")()
+
+    assert p.stages["is_close"].count == 1 and p.stages["is_close"].total == 1500
+    assert p.stages["dispatch"].count == 1
+
+
+def test_instrument_patches_globals_and_objects():
+    p = Profiler(clock=Clock(10))
+    namespace = {"get_pos": lambda: (0.0, 0.0, 0.4)}
+    commander = SimpleNamespace(go_to=lambda x, y, z: None)
+    p.instrument(namespace, "get_pos")
+    p.instrument(commander, "go_to")
+    namespace["get_pos"]()
+    commander.go_to(1.0, 0.0, 0.4)
+
+    assert set(p.stages) == {"get_pos", "go_to"}
+
+
+def test_a_disabled_profiler_leaves_the_code_alone():
+    p = Profiler(enabled=False)
+
+    def get_pos():
+        pass
+
+    assert p.wrap(get_pos) is get_pos
+    namespace = {"get_pos": get_pos}
+    p.instrument(namespace, "get_pos")
+    p.record("work", 1000)
+    assert namespace["get_pos"] is get_pos and p.stages == {}
+
+
+def test_report_shares_and_the_saved_profile(tmp_path, monkeypatch, capsys):
+    p = Profiler()
+    for _ in range(10):
+        p.record("work", 20_000_000)
+        p.record("sleep", 80_000_000)
+        p.record("is_close", 5_000_000)
+    r = p.report()
+
+    assert r["loop_hz"] == pytest.approx(10.0)
+    assert (r["work_s"], r["sleep_s"]) == pytest.approx((0.2, 0.8))
+    assert list(r["stages"]) == ["sleep", "work", "is_close"]
+    assert r["stages"]["is_close"]["share"] == pytest.approx(0.05)
+    assert r["stages"]["work"]["p50_us"] == pytest.approx(20000, rel=0.04)
+
+    path = tmp_path / "flight.profile.json"
+    p.dump(path)
+    assert json.loads(path.read_text()) == json.loads(json.dumps(r))
+    monkeypatch.setattr(sys, "argv", ["profiler", str(path)])
+    profiler.main()
+    assert capsys.readouterr().out.strip() == p.summary()
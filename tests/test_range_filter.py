@@ -0,0 +1,80 @@
+# Range filter: spike rejection, median and EWMA per direction, dropouts, and the hysteresis trigger
+import pytest
+
+from flight.range_filter import DirectionFilter, FilteredRangeStream, Hysteresis
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def feed(f, readings):
+    return [f.update(x) for x in readings]
+
+
+def test_a_lone_spike_never_reaches_the_trigger():
+    f = DirectionFilter(window=3, spike=0.3, confirm=1)
+    out = feed(f, [1.0, 1.0, 1.0, 0.2, 1.0, 1.0])
+
+    assert out == [1.0] * 6
+    assert f.rejected == 1
+
+
+def test_a_real_obstacle_costs_confirm_samples():
+    f = DirectionFilter(window=3, spike=0.3, confirm=1)
+    assert feed(f, [1.0, 1.0, 0.2, 0.2]) == pytest.approx([1.0, 1.0, 1.0, 0.2])     # the window restarts on the step
+
+    f = DirectionFilter(window=3, spike=0.3, confirm=2)
+    assert feed(f, [1.0, 0.2, 0.25, 0.2]) == pytest.approx([1.0, 1.0, 1.0, 0.2])
+    assert f.rejected == 2
+
+
+def test_a_dropout_does_not_clear_an_obstacle():
+    f = DirectionFilter(window=3, spike=0.3, confirm=1)
+    assert feed(f, [0.4, 0.4, None]) == [0.4, 0.4, 0.4]
+    assert feed(f, [None]) == [None]        # a second missing reading: out of range
+
+
+def test_median_and_ewma():
+    f = DirectionFilter(window=3, spike=None)
+    assert feed(f, [1.0, 1.0, 0.5, 0.5]) == [1.0, 1.0, 1.0, 0.5]
+
+    f = DirectionFilter(window=1, alpha=0.5, spike=None)
+    assert feed(f, [1.0, 0.0, 0.0]) == pytest.approx([1.0, 0.5, 0.25])
+    assert DirectionFilter(window=3, alpha=0.5).lag() == 2.0
+
+
+def test_filter_parameters_are_checked():
+    with pytest.raises(ValueError):
+        DirectionFilter(window=0)
+    with pytest.raises(ValueError):
+        DirectionFilter(alpha=0.0)
+
+
+def test_filtered_stream_reports_the_filter_lag_in_its_age():
+    clock = Clock()
+    stream = FilteredRangeStream(window=3, spike=0.3, clock=clock)
+    for i in range(5):
+        clock.now = 0.01 * i
+        sample = stream.push(i, 1.0, None, 0.5, 0.6, None)
+    clock.now = 0.045
+
+    assert (sample.front, sample.back, sample.left, sample.right) == (1.0, None, 0.5, 0.6)
+    assert stream.interval == pytest.approx(0.01)
+    assert stream.lag() == pytest.approx(0.01)                     # one sample through a median of three
+    assert stream.age() == pytest.approx(0.005 + 0.01)
+
+    stream.push(5, 0.1, None, 0.5, 0.6, None)
+    assert stream.latest().front == 1.0 and stream.rejected == 1
+
+
+def test_hysteresis_enters_and_exits_at_different_ranges():
+    h = Hysteresis(0.3, exit=0.35)
+    assert [h.update(d) for d in (0.4, 0.29, 0.32, 0.34, 0.36, 0.32)] == [False, True, True, True, False, False]
+    assert Hysteresis(0.3).exit == 0.3
+    h.update(0.1)
+    assert h.update(None) is False
@@ -0,0 +1,126 @@
+# Multiranger log stream: conversion, ring buffer, freshness and waking readers on new data
+import asyncio
+import threading
+
+import pytest
+
+from flight.ranger_stream import BACK, DOWN, FRONT, LEFT, RIGHT, UP, RangeStream, to_distance
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Callbacks:
+    def __init__(self):
+        self.callbacks = []
+
+    def add_callback(self, cb):
+        self.callbacks.append(cb)
+
+    def remove_callback(self, cb):
+        self.callbacks.remove(cb)
+
+    def call(self, *args):
+        for cb in list(self.callbacks):
+            cb(*args)
+
+
+class FakeMultiranger:
+    """Just the log block a Multiranger subscribes to."""
+
+    def __init__(self):
+        self._log_config = type("LogConfig", (), {})()
+        self._log_config.data_received_cb = Callbacks()
+
+    def packet(self, stamp, **mm):
+        self._log_config.data_received_cb.call(stamp, mm, self._log_config)
+
+
+def test_raw_ranges_convert_like_multiranger():
+    assert to_distance(250) == 0.25
+    assert to_distance(7999) == 7.999
+    assert to_distance(8000) is None and to_distance(None) is None
+
+
+def test_log_packets_become_stamped_samples():
+    clock, ranger = Clock(), FakeMultiranger()
+    stream = RangeStream(clock=clock)
+    stream.attach(ranger)
+    clock.now = 1.5
+
+    ranger.packet(120, **{FRONT: 300, BACK: 8000, LEFT: 1200, RIGHT: 450, UP: 9000, DOWN: 400})
+    sample = stream.latest()
+
+    assert (sample.seq, sample.t, sample.stamp) == (1, 1.5, 120)
+    assert (sample.front, sample.back, sample.left, sample.right, sample.up, sample.down) == \
+        (0.3, None, 1.2, 0.45, None, 0.4)
+
+    stream.detach()
+    ranger.packet(140, **{FRONT: 100})
+    assert stream.seq == 1
+
+
+def test_ring_buffer_keeps_the_newest():
+    stream = RangeStream(size=4, clock=Clock())
+    for i in range(10):
+        stream.push(i, 1.0, None, None, None, None)
+
+    assert [s.seq for s in stream.history()] == [7, 8, 9, 10]
+    assert stream.latest().stamp == 9
+
+
+def test_age_and_freshness():
+    clock = Clock()
+    stream = RangeStream(clock=clock)
+    assert stream.age() == float("inf") and stream.fresh(1.0) is None and stream.latest() is None
+
+    first = stream.push(0, 1.0, None, None, None, None)
+    clock.now = 0.1
+    assert stream.age() == pytest.approx(0.1)
+    assert stream.fresh(0.15) is first
+    clock.now = 0.2
+    assert stream.fresh(0.15) is None
+
+
+def test_subscribers_get_every_sample():
+    stream = RangeStream(clock=Clock())
+    got = []
+    stream.subscribe(got.append)
+    stream.push(0, 1.0, None, None, None, None)
+    stream.unsubscribe(got.append)
+    stream.push(1, 1.0, None, None, None, None)
+
+    assert [s.seq for s in got] == [1]
+
+
+def test_wait_newer_wakes_on_a_packet_from_another_thread():
+    stream = RangeStream()
+    stream.push(0, 2.0, None, None, None, None)
+    assert stream.wait_newer(0, timeout=0.0).seq == 1      # already there
+    assert stream.wait_newer(1, timeout=0.01) is None
+
+    timer = threading.Timer(0.02, stream.push, (1, 0.5, None, None, None, None))
+    timer.start()
+    sample = stream.wait_newer(1, timeout=5.0)
+    timer.join()
+
+    assert sample.seq == 2 and sample.front == 0.5
+
+
+def test_next_sample_wakes_an_asyncio_reader():
+    stream = RangeStream()
+
+    async def read():
+        timer = threading.Timer(0.02, stream.push, (1, 0.7, None, None, None, None))
+        timer.start()
+        sample = await asyncio.wait_for(stream.next_sample(0), timeout=5.0)
+        timer.join()
+        return sample
+
+    sample = asyncio.run(read())
+    assert sample.seq == 1 and sample.front == 0.7
@@ -0,0 +1,49 @@
+# Replay of recorded flights: record in the simulator, replay through the CLI
+import os
+import sys
+
+import pytest
+
+from flight import replay
+from flight.sim import World, box, run_script
+
+from conftest import ROOT
+
+SCRIPT = os.path.join(ROOT, "Waypoint_Avoid09.py")
+
+
+@pytest.fixture(scope="module")
+def recording(tmp_path_factory):
+    """Telemetry of Waypoint_Avoid09 flown past one obstacle."""
+    path = tmp_path_factory.mktemp("flights") / "Waypoint_Avoid09.cftl"
+    report = run_script(SCRIPT, World([box(0.5, 0.0, 0.2, 0.2)]), overrides={"telemetry_file": str(path)})
+    assert "Bypass complete" in report["output"]
+    return path
+
+
+def cli(monkeypatch, *args):
+    """Exit status of `python -m flight.replay args...`."""
+    monkeypatch.setattr(sys, "argv", ["flight.replay", *args])
+    with pytest.raises(SystemExit) as exit_:
+        replay.main()
+    return exit_.value.code
+
+
+def test_unchanged_settings_replay_without_a_mismatch(recording):
+    result = replay.replay(SCRIPT, recording)
+
+    assert result["diff"]["mismatches"] == 0
+    assert result["diff"]["first_divergence"] is None
+    assert result["diff"]["replayed"] == result["diff"]["ticks"] > 0
+
+
+def test_cli_replays_a_recorded_flight(recording, monkeypatch, capsys):
+    assert cli(monkeypatch, SCRIPT, str(recording)) == 0
+    assert "1/1 flights replayed within tolerance" in capsys.readouterr().out
+
+
+def test_cli_reports_a_changed_decision(recording, monkeypatch, capsys):
+    assert cli(monkeypatch, SCRIPT, str(recording), "--set", "safety_margin=0.5") == 1
+    out = capsys.readouterr().out
+    assert "0/1 flights replayed within tolerance" in out
+    assert "cruise -> front_obstacle" in out
@@ -0,0 +1,67 @@
+# Route optimizer: leg times, brute-force optimality on small routes, free ends and the mission route
+import itertools
+import math
+
+import numpy as np
+import pytest
+
+from flight.route_optimizer import benchmark, optimize, order, sweep, tour_time, travel_times
+from flight.trajectory import MIN_JERK_PEAK_A, MIN_JERK_PEAK_V
+
+
+def brute_force(times, fix_end=True):
+    """Shortest tour time from point 0 over every visiting order (ending on the last point if fixed)."""
+    n = len(times)
+    middle = np.array(list(itertools.permutations(range(1, n - 1 if fix_end else n))), int).reshape(-1, n - 1 - fix_end)
+    tours = np.hstack([np.zeros((len(middle), 1), int), middle] + ([np.full((len(middle), 1), n - 1)] if fix_end else []))
+    return float(times[tours[:, :-1], tours[:, 1:]].sum(axis=1).min())
+
+
+def gaps(fix_end):
+    """Relative excess over the optimum for 50 random routes of each size 3..8."""
+    out = []
+    for n in range(3, 9):
+        for seed in range(50):
+            points = sweep(n, size=5.0, seed=seed)
+            idx = order(points, fix_end=fix_end)
+            assert sorted(idx) == list(range(n)) and idx[0] == 0
+            if fix_end:
+                assert idx[-1] == n - 1
+            times = travel_times(points)
+            out.append(tour_time(times, idx) / brute_force(times, fix_end) - 1.0)
+    return np.array(out)
+
+
+@pytest.mark.parametrize("fix_end", [True, False])
+def test_small_routes_are_near_the_brute_force_optimum(fix_end):
+    g = gaps(fix_end)
+
+    assert g.min() > -1e-5                        # nothing beats the brute force
+    assert (g < 1e-5).mean() >= 0.95              # local search finds the optimum almost always
+    assert g.max() < 0.06
+
+
+def test_leg_times_follow_the_min_jerk_profile():
+    points = [(0.0, 0.0, 0.4), (2.0, 0.0, 0.4), (0.0, 0.0, 2.4), (0.01, 0.0, 0.4)]
+    t = travel_times(points, v_max=1.0, v_z=0.5, a_max=2.0)
+
+    assert np.allclose(t, t.T) and np.all(np.diag(t) == 0.0)
+    assert t[0, 1] == pytest.approx(2.0 * MIN_JERK_PEAK_V, rel=1e-4)     # velocity-limited
+    assert t[0, 2] == pytest.approx(2.0 * t[0, 1], rel=1e-4)        # climbing at half the speed
+    assert t[0, 3] == pytest.approx(math.sqrt(0.01 * MIN_JERK_PEAK_A / 2.0), rel=1e-3)      # short leg: acceleration-limited
+
+
+def test_local_search_improves_on_the_seed_tour():
+    r = benchmark(300)
+    assert r["optimized"] < 0.9 * r["nearest"] < r["given"]
+    assert r["rounds"] > 0
+
+
+def test_optimized_route_feeds_a_mission():
+    sweep_route = [(0.0, 0.0, 0.4, 2.0), (2.0, 0.0, 0.4), (1.0, 0.0, 0.4), (3.0, 0.0, 0.4)]
+    route = optimize(sweep_route, settle_s=1.0)
+
+    assert [wp[:3] for wp in route] == [(0.0, 0.0, 0.4), (1.0, 0.0, 0.4), (2.0, 0.0, 0.4), (3.0, 0.0, 0.4)]
+    assert route[0][3] == 2.0                                       # the first waypoint keeps its own
+    assert [wp[3] for wp in route[1:]] == [math.ceil((MIN_JERK_PEAK_V + 1.0) * 10) / 10] * 3
+    assert optimize([]) == [] and list(order(np.zeros((2, 3)))) == [0, 1]
@@ -0,0 +1,121 @@
+# Asyncio runtime: its channels, and the same flights as the threaded engine
+import math
+
+import pytest
+
+from flight.mission.config import mission_settings
+from flight.monte_carlo import make_world
+from flight.sim import Sandbox, World, box
+
+from conftest import ROOT, line
+
+
+@pytest.fixture(scope="module")
+def runtime():
+    """flight.mission.runtime (the engine imports cflib) loaded against the simulated cflib."""
+    return Sandbox(World(), ROOT)._load_local("flight.mission.runtime")
+
+
+def both(fly, settings=None, world=None, mission="Waypoint_Avoid06"):
+    """The same flight on the threaded engine and on the asyncio runtime, in fresh copies of `world`."""
+    return [fly({"runtime": name, **(settings or {})}, world(), mission) for name in ("thread", "asyncio")]
+
+
+def assert_same_flight(thread, asyncio):
+    assert "Mission completed successfully" in thread["output"]
+    assert "Mission completed successfully" in asyncio["output"]
+    assert asyncio["collisions"] == thread["collisions"]
+    assert asyncio["output"].count("Obstacle ") == thread["output"].count("Obstacle ")
+    assert asyncio["sim_time"] == pytest.approx(thread["sim_time"], abs=0.5)
+    assert asyncio["distance"] == pytest.approx(thread["distance"], rel=0.05)
+    assert math.dist(asyncio["drones"][0]["position"], thread["drones"][0]["position"]) < 0.05
+
+
+class FakeCommander:
+    """Only PositionHlCommander's public position (the sender must not reach for more)."""
+
+    def get_position(self):
+        return (0.0, 0.0, 0.4)
+
+
+class FakeHl:
+    def __init__(self):
+        self.sent = []
+
+    def go_to(self, *args):
+        self.sent.append(args)
+
+
+class FakeEstimate:
+    def __init__(self, position=None):
+        self.at = position
+
+    def position(self):
+        return self.at
+
+
+def test_channel_sheds_the_oldest_by_default(runtime):
+    channel = runtime.Channel(2)
+    for item in range(4):
+        assert channel.offer(item)
+
+    assert [channel.take(), channel.take()] == [2, 3]
+    assert channel.dropped == 2 and channel.high_water == 2
+
+
+def test_channel_can_keep_what_is_queued(runtime):
+    channel = runtime.Channel(2, shed="newest")
+
+    assert [channel.offer(item) for item in range(4)] == [True, True, False, False]
+    assert len(channel) == 2 and channel.take() == 0
+    assert channel.dropped == 2
+
+
+def test_sender_queues_and_times_moves_without_the_commanders_internals(runtime):
+    hl, estimate = FakeHl(), FakeEstimate((0.1, 0.0, 0.4))
+    channel = runtime.Channel(1)
+    sender = runtime.CommandSender(FakeCommander(), hl, estimate, channel, height=0.4, velocity=0.5)
+
+    sender.go_to(0.2, 0.0)                      # default height, from the commander's position
+    assert channel.take() == (0.2, 0.0, 0.4, None, runtime.ROUTINE)
+    assert sender.travel == pytest.approx(0.4)
+    sender.go_to(0.2, 0.0)                      # already queued there: nothing to do
+    assert not len(channel) and sender.travel == pytest.approx(0.4)
+
+    sender.send(0.2, 0.0, 0.4)                  # first move: from the estimated position
+    estimate.at = (0.15, 0.0, 0.4)
+    sender.send(0.3, 0.0, 0.4, velocity=1.0)    # then from the setpoint the drone's planner is on
+    assert hl.sent == [(0.2, 0.0, 0.4, 0.0, pytest.approx(0.2)), (0.3, 0.0, 0.4, 0.0, pytest.approx(0.1))]
+    assert sender.sent == 2
+
+
+def test_async_mission_takes_an_origin(runtime):
+    mission = runtime.AsyncMission("Waypoint_Avoid06", {"battery": {}}, origin=(0.5, -0.2, 0.0))
+
+    assert mission.origin == (0.5, -0.2, 0.0)
+    assert mission.waypoints[-1][:2] == (0.5, -0.2)     # the battery scheduler's way home
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_asyncio_matches_thread_on_seeded_scenarios(fly, seed):
+    assert_same_flight(*both(fly, world=lambda: make_world(seed)))
+
+
+def test_asyncio_matches_thread_around_an_obstacle(fly):
+    thread, asyncio = both(fly, world=lambda: World([box(0.5, 0.0, 0.2, 0.2)]), mission="Waypoint_Avoid09")
+
+    assert "Bypass complete" in asyncio["output"]
+    assert_same_flight(thread, asyncio)
+
+
+def test_asyncio_runtime_reports_its_channels(fly):
+    report = fly({"runtime": "asyncio"})
+
+    channels = line(report, "Channels:")
+    assert "setpoints 1/1" in channels
+    assert "telemetry 0/256 (dropped 0)" in channels        # telemetry off: nothing queued
+
+
+def test_onboard_legs_need_the_thread_runtime():
+    with pytest.raises(ValueError, match="onboard_trajectory needs the thread runtime"):
+        mission_settings("Waypoint_Avoid06", {"runtime": "asyncio", "onboard_trajectory": True})
@@ -0,0 +1,77 @@
+# Simulator: ray casting, the drone model, radio latency, and whole scripts on the virtual clock
+import json
+
+import pytest
+
+from flight.sim import Box, World, box, box_distance, load_obstacles, ray_box
+
+URI = "radio://0/80/2M/E7E7E7E7E7"
+
+
+def test_ray_and_distance_to_a_box():
+    b = box(1.0, 0.0, 0.2, 0.4)
+
+    assert ray_box((0.0, 0.0, 0.4), (1.0, 0.0, 0.0), b) == pytest.approx(0.9)
+    assert ray_box((0.0, 0.0, 0.4), (-1.0, 0.0, 0.0), b) is None
+    assert ray_box((0.0, 0.5, 0.4), (1.0, 0.0, 0.0), b) is None                  # passes beside it
+    assert ray_box((1.0, 0.0, 0.4), (1.0, 0.0, 0.0), b) == 0.0                   # inside
+    assert box_distance((0.0, 0.0, 0.4), b) == pytest.approx(0.9)
+    assert box_distance((0.0, 0.5, 3.0), b) == pytest.approx((0.9 ** 2 + 0.3 ** 2 + 1.0 ** 2) ** 0.5)
+
+
+def test_obstacle_maps(tmp_path):
+    path = tmp_path / "room.json"
+    path.write_text(json.dumps([{"center": [1.0, 0.0], "size": [0.2, 0.4], "z": [0.0, 1.0]},
+                                [0.0, 0.0, 0.0, 1.0, 1.0, 1.0]]))
+
+    assert load_obstacles(path) == [box(1.0, 0.0, 0.2, 0.4, z1=1.0), Box(0.0, 0.0, 0.0, 1.0, 1.0, 1.0)]
+
+
+def test_multiranger_rays():
+    world = World([box(1.0, 0.0, 0.2, 0.4), box(0.0, -0.5, 0.4, 0.2)], max_range=2.0)
+    drone = world.drone(URI)
+    drone.place((0.0, 0.0, 0.4))
+
+    assert drone.log_value("range.front") == 900
+    assert drone.log_value("range.right") == 400
+    assert drone.log_value("range.left") == 8000 and drone.log_value("range.back") == 8000    # beyond max_range
+    assert drone.log_value("range.zrange") == 400                                            # the floor
+    assert drone.log_value("stateEstimate.y") == 0.0
+
+
+def test_commands_arrive_after_the_radio_latency():
+    world = World(latency=0.05)
+    drone = world.drone(URI)
+    drone.send(drone.takeoff, 0.4, 1.0)
+
+    world.advance(0.04)
+    assert not drone.flying
+    world.advance(0.06)
+    assert drone.flying
+    world.advance(2.0)
+    assert drone.pos[2] == pytest.approx(0.4, abs=0.01)
+
+
+def test_flying_through_a_box_counts_one_collision():
+    world = World([box(1.0, 0.0, 0.2, 0.4)])
+    drone = world.drone(URI)
+    drone.takeoff(0.4, 1.0)
+    world.advance(2.0)
+    drone.command((2.0, 0.0, 0.4), 4.0)
+    world.advance(8.0)
+
+    report = world.report()
+    assert report["collisions"] == 1 and 2.0 < report["first_collision"] < 6.0
+    assert report["min_clearance"] < 0.0
+    assert report["position"] == pytest.approx((2.0, 0.0, 0.4), abs=0.01)
+
+
+def test_a_mission_flies_on_the_virtual_clock(fly):
+    first = fly(world=World([box(0.5, -0.4, 0.2, 0.2)], seed=1))
+    again = fly(world=World([box(0.5, -0.4, 0.2, 0.2)], seed=1))
+
+    assert first["sim_time"] > 10 * first["wall_time"]              # sleeps cost no real time
+    assert not first["flying"] and first["commands"] > 0
+    assert "Mission completed successfully" in first["output"]
+    first.pop("wall_time"), again.pop("wall_time")
+    assert first == again                                           # same world, same flight
@@ -0,0 +1,100 @@
+# Pose estimate double buffer: publishing by flip, freshness and prediction
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from flight.sim import Sandbox, World
+
+from conftest import ROOT
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def module():
+    """flight.state_estimate (it imports cflib) in a fresh simulated world."""
+    return Sandbox(World(), ROOT)._load_local("flight.state_estimate")
+
+
+def packet(module, x, y, z, vx=0.0, vy=0.0, vz=0.0):
+    return dict(zip(module.POSITION + module.VELOCITY, (x, y, z, vx, vy, vz)))
+
+
+def test_nothing_before_the_first_packet(module):
+    state = module.StateEstimate(SimpleNamespace(), clock=Clock())
+
+    assert state.latest() is None and state.age() == float("inf")
+    assert state.position() is None and state.velocity() is None and state.predict(0.1) is None
+
+
+def test_each_packet_fills_the_back_slot_and_flips(module):
+    clock = Clock()
+    state = module.StateEstimate(SimpleNamespace(), clock=clock)
+
+    clock.now = 1.0
+    state._data_received(500, packet(module, 0.1, 0.2, 0.4), None)
+    first = state.latest()
+    clock.now = 1.02
+    state._data_received(520, packet(module, 0.2, 0.2, 0.4, vx=0.5), None)
+
+    assert (first.seq, first.t, first.stamp) == (1, 1.0, 500)
+    assert first.x == 0.1                             # a reader's sample is never overwritten
+    assert state.latest().seq == 2 and state._slots[1 - state._front] is first
+    assert state.position() == (0.2, 0.2, 0.4) and state.velocity() == (0.5, 0.0, 0.0)
+
+
+def test_age_and_prediction_count_the_time_since_arrival(module):
+    clock = Clock()
+    state = module.StateEstimate(SimpleNamespace(), clock=clock)
+    state._data_received(0, packet(module, 1.0, 0.0, 0.4, vx=0.5, vy=-0.25), None)
+    clock.now = 0.04
+
+    assert state.age() == pytest.approx(0.04)
+    assert state.predict() == pytest.approx((1.02, -0.01, 0.4))
+    assert state.predict(0.06) == pytest.approx((1.05, -0.025, 0.4))
+
+
+def test_readers_only_see_whole_samples(module):
+    state = module.StateEstimate(SimpleNamespace())
+    done = threading.Event()
+
+    def write():
+        for i in range(20000):
+            state._data_received(i, packet(module, i, i, i, i, i, i), None)
+        done.set()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    last = 0
+    while not done.is_set():
+        sample = state.latest()
+        if sample is not None:
+            assert len(set(sample[3:])) == 1 and sample.x == sample.seq - 1
+            assert sample.seq >= last
+            last = sample.seq
+    writer.join()
+    assert state.latest().seq == 20000
+
+
+def test_streams_the_simulated_estimate():
+    world = World()
+    sandbox = Sandbox(world, ROOT)
+    module = sandbox._load_local("flight.state_estimate")
+    scf = sandbox.fake["cflib.crazyflie.syncCrazyflie"].SyncCrazyflie("radio://0/80/2M/E7E7E7E7E7")
+    scf.open_link()
+
+    with module.StateEstimate(scf, rate_ms=20, clock=lambda: world.now) as state:
+        world.advance(0.5)
+        sample = state.latest()
+        assert 20 <= sample.seq <= 26
+        assert state.position() == pytest.approx((0.0, 0.0, 0.0), abs=0.01)
+        assert state.age() < 0.05
+    world.advance(1.0)
+    assert state.latest() is sample                 # stopped: no more packets
@@ -0,0 +1,79 @@
+# Swarm runner: Swarm_Avoid.py flown in the simulator, one thread per drone on one radio
+import os
+import re
+
+import pytest
+
+from flight.sim import Sandbox, World, box, run_script
+
+from conftest import ROOT
+
+SWARM_SCRIPT = os.path.join(ROOT, "Swarm_Avoid.py")
+LANE = 0.8
+
+
+def uris(n):
+    return [f'radio://0/80/2M/E7E7E7E7{i:02X}' for i in range(1, n + 1)]
+
+
+def drone_lines(report):
+    """{uri: its line of the swarm summary}."""
+    return {text.split(": ")[0]: text for text in report["output"].splitlines() if text.startswith("radio://")}
+
+
+@pytest.fixture(scope="module")
+def swarm():
+    """flight.swarm (it opens cflib links) loaded against the simulated cflib."""
+    return Sandbox(World(), ROOT)._load_local("flight.swarm")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_radio_scheduler_spaces_packets(swarm):
+    clock = Clock()
+    radio = swarm.RadioScheduler(rate_hz=100, clock=clock, sleep=clock.sleep)
+    for _ in range(5):
+        radio.slot()
+
+    assert radio.sent == 5
+    assert clock.now == pytest.approx(0.04)         # the first packet goes at once
+    assert radio.waited == pytest.approx(0.04)             # one slot length before each of the others
+
+
+def test_drones_need_the_bypass_policy(swarm):
+    with pytest.raises(ValueError, match="bypass policy"):
+        swarm.DroneMission(uris(1)[0], [(1.0, 0.0, 0.4, 3.0)], settings={"policy": {"name": "detour"}})
+
+
+def test_ten_drones_fly_their_lanes_on_one_radio():
+    report = run_script(SWARM_SCRIPT, World(), overrides={"URIS": uris(10)})
+    lines = drone_lines(report)
+
+    assert len(lines) == 10 and all(": ok," in text for text in lines.values())
+    assert report["collisions"] == 0 and report["drone_collisions"] == 0
+    sent = sum(int(re.search(r"(\d+) go_to sent", text).group(1)) for text in lines.values())
+    assert f"Radio: {sent} packets" in report["output"]
+    for i, drone in enumerate(report["drones"]):
+        x, y, _ = drone["position"]
+        assert abs(x) < 0.05 and abs(y - i * LANE) < 0.05      # back on its own take-off spot
+
+
+def test_drones_give_way_around_a_bypass():
+    report = run_script(SWARM_SCRIPT, World([box(0.6, 1.6, 0.2, 0.2)]), overrides={"URIS": uris(3)})
+    lines = drone_lines(report)
+    first, _, blocked = uris(3)
+
+    assert all(": ok," in text for text in lines.values())
+    assert report["collisions"] == 0 and report["drone_collisions"] == 0
+    assert not lines[blocked].startswith(f"{blocked}: ok, 0 bypasses, 0 holds, 0 give-way")
+    # a drone far from the trouble keeps its own loop rate and never waits
+    assert lines[first].startswith(f"{first}: ok, 0 bypasses, 0 holds, 0 give-way sidesteps, loop 20.0 Hz")
@@ -0,0 +1,78 @@
+# Telemetry: the memory-mapped ring file, and a mission recording that replays
+import math
+from collections import namedtuple
+
+import numpy as np
+import pytest
+
+from flight import telemetry
+from flight.replay import replay
+from flight.sim import World, box
+
+from conftest import FLY_SCRIPT
+
+Ranges = namedtuple("Ranges", "front back left right up down")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 0.05
+        return self.now
+
+
+def test_ticks_round_trip_through_the_ring(tmp_path):
+    path = tmp_path / "flight.cftl"
+    with telemetry.TelemetryRecorder(path, capacity=16, clock=Clock()) as recorder:
+        recorder.leg = 2
+        recorder.record(telemetry.CRUISE, (1.0, 2.0, 0.4), Ranges(0.5, None, 1.0, 1.5, None, 0.4),
+                        (1.1, 2.0, 0.4), (0.2, 0.0, 0.0))
+        recorder.record(telemetry.BYPASS, (1.1, 2.0, 0.4))
+
+    records = telemetry.read(path)
+    assert telemetry.read_header(path) == {"capacity": 16, "written": 3, "dropped": 0}
+    assert records["branch"].tolist() == [telemetry.LEG_START, telemetry.CRUISE, telemetry.BYPASS]
+    assert records["seq"].tolist() == [0, 1, 2] and (records["leg"] == 2).all()
+    cruise, bypass = telemetry.ticks(records)
+    assert (cruise["x"], cruise["y"], cruise["front"], cruise["sx"], cruise["vx"]) == \
+        pytest.approx((1.0, 2.0, 0.5, 1.1, 0.2))
+    assert math.isnan(cruise["back"]) and math.isnan(cruise["up"])
+    assert math.isnan(bypass["sx"]) and math.isnan(bypass["vx"]) and math.isnan(bypass["front"])
+    assert bypass["t"] > cruise["t"]
+
+
+def test_a_full_ring_keeps_the_newest_records_in_order(tmp_path):
+    path = tmp_path / "flight.cftl"
+    with telemetry.TelemetryRecorder(path, capacity=8, clock=Clock()) as recorder:
+        for i in range(20):
+            recorder.record(telemetry.CRUISE, (float(i), 0.0, 0.4))
+
+    records = telemetry.read(path)
+    assert telemetry.read_header(path)["written"] == 20
+    assert records["x"].tolist() == [float(i) for i in range(12, 20)]
+    assert (np.diff(records["seq"].astype(int)) == 1).all()
+
+
+def test_a_full_backlog_drops_instead_of_blocking(tmp_path):
+    recorder = telemetry.TelemetryRecorder(tmp_path / "flight.cftl", max_pending=4)
+    for i in range(6):
+        recorder.record(telemetry.CRUISE, (float(i), 0.0, 0.4))
+
+    assert recorder.backlog == 4 and recorder.dropped == 2
+
+
+def test_a_recorded_mission_replays_unchanged(fly, tmp_path):
+    path = tmp_path / "Waypoint_Avoid09.cftl"
+    world = World([box(0.5, 0.0, 0.2, 0.2)])
+    fly({"telemetry_file": str(path)}, world, mission="Waypoint_Avoid09")
+
+    records = telemetry.read(path)
+    summary = telemetry.summary(records)
+    assert summary["branches"]["bypass"] > 0
+    assert summary["branches"]["range_packet"] > 0 and summary["branches"]["pose_packet"] > 0
+
+    result = replay(FLY_SCRIPT, path, {"MISSION": "Waypoint_Avoid09"})
+    assert result["diff"]["mismatches"] == 0
+    assert len(result["records"]) == len(telemetry.ticks(records))
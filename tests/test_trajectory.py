@@ -0,0 +1,87 @@
+# Precomputed trajectories: profile limits, sampling on the loop grid and the on-board polynomial pieces
+import numpy as np
+import pytest
+
+from flight.trajectory import (GO_TO_DUTY, MIN_JERK, TRAPEZOID, Segment, Trajectory, min_jerk_duration,
+                               trapezoid_duration)
+
+
+def derivatives(segment, rate=2000):
+    """Speed and acceleration along a segment, sampled finely."""
+    fine = Segment(segment.start, segment.end, rate, profile=segment.profile)
+    s = np.linalg.norm(fine.samples[:, :3] - fine.start, axis=1)
+    v = np.diff(s, prepend=0.0) * rate
+    return v, np.diff(v) * rate
+
+
+@pytest.mark.parametrize("profile", [MIN_JERK, TRAPEZOID])
+@pytest.mark.parametrize("distance", [0.1, 2.0])
+def test_profiles_stay_within_the_limits(profile, distance):
+    segment = Segment((0.0, 0.0, 0.4), (distance, 0.0, 0.4), 20, v_max=1.0, a_max=2.0, profile=profile)
+    v, a = derivatives(segment)
+
+    assert v.max() <= 1.0 + 1e-2 and np.abs(a).max() <= 2.0 * 1.02
+    assert max(v.max() / 1.0, np.abs(a).max() / 2.0) > 0.95         # and use one of them fully
+
+
+def test_durations():
+    assert min_jerk_duration(2.0, 1.0, 2.0) == pytest.approx(3.75)
+    assert trapezoid_duration(2.0, 1.0, 2.0) == pytest.approx(2.5)           # ramp up, cruise, ramp down
+    assert trapezoid_duration(0.5, 1.0, 2.0) == pytest.approx(1.0)           # triangular
+
+
+def test_samples_sit_on_the_loop_grid_and_end_on_the_waypoint():
+    segment = Segment((0.0, 0.0, 0.4), (1.0, 1.0, 0.4), 20)
+
+    assert len(segment) == int(np.ceil(segment.duration * 20))
+    assert segment[len(segment) - 1][:3] == pytest.approx((1.0, 1.0, 0.4))
+    assert segment.setpoint(10 ** 6) == segment[len(segment) - 1]
+    steps = np.linalg.norm(np.diff(segment.samples[:, :3], axis=0, prepend=[segment.start]), axis=1)
+    assert segment.samples[:, 3] == pytest.approx(np.maximum(steps / (0.05 * GO_TO_DUTY), 1e-3))
+    assert not segment.done(len(segment) - 1) and segment.done(len(segment))
+
+
+def test_fractional_ticks_interpolate():
+    segment = Segment((0.0, 0.0, 0.4), (1.0, 0.0, 0.4), 20)
+
+    assert segment.at(3) == segment[2]
+    assert segment.at(2.5)[0] == pytest.approx((segment[1][0] + segment[2][0]) / 2)
+    assert segment.at(0.5)[0] == pytest.approx(segment[0][0] / 2)
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError, match="unknown profile 'cubic'"):
+        Segment((0.0, 0.0, 0.0), (1.0, 0.0, 0.0), 20, profile="cubic")
+
+
+def evaluate(pieces, t):
+    """Position at local time t through a list of pieces."""
+    for duration, *axes in pieces:
+        if t <= duration + 1e-12:
+            return [np.polyval(axis[::-1], t) for axis in axes]
+        t -= duration
+    raise AssertionError("past the last piece")
+
+
+@pytest.mark.parametrize("profile", [MIN_JERK, TRAPEZOID])
+def test_pieces_reproduce_the_sampled_profile(profile):
+    segment = Segment((0.2, -0.1, 0.4), (1.4, 0.8, 0.9), 20, profile=profile)
+    pieces = segment.pieces()
+
+    assert sum(p[0] for p in pieces) == pytest.approx(segment.duration)
+    assert all(len(axis) == 8 for p in pieces for axis in p[1:])
+    for k in range(len(segment) - 1):
+        assert evaluate(pieces, (k + 1) / 20) == pytest.approx(segment[k][:3], abs=1e-9)
+    assert evaluate(pieces, segment.duration) == pytest.approx(segment.end.tolist())
+    assert Segment((0.0, 0.0, 0.4), (0.0, 0.0, 0.4), 20).pieces() == []
+
+
+def test_trajectory_rebuilds_a_segment_away_from_its_start():
+    trajectory = Trajectory([(1.0, 0.0, 0.4, 3.0), (1.0, 1.0, 0.4, 3.0)], start=(0.0, 0.0, 0.4), rate_hz=20)
+
+    assert len(trajectory) == 2
+    assert trajectory.duration == pytest.approx(2 * min_jerk_duration(1.0, 1.0, 2.0))
+    assert trajectory.segment(1, (1.01, 0.0, 0.4)) is trajectory.segments[1]        # within the tolerance
+    moved = trajectory.segment(1, (1.5, 0.0, 0.4))
+    assert moved.start.tolist() == [1.5, 0.0, 0.4] and moved.end.tolist() == [1.0, 1.0, 0.4]
+    assert moved.duration == pytest.approx(trajectory.leg_duration((1.5, 0.0, 0.4), (1.0, 1.0, 0.4)))
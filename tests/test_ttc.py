@@ -0,0 +1,102 @@
+# Time-to-collision trigger: latency compensation, braking distance, hysteresis and the RTT estimate
+from types import SimpleNamespace
+
+import pytest
+
+from flight.ranger_stream import BACK, FRONT, RangeStream
+from flight.ttc import CommandLatency, ObstacleReaction, closing_speed, predicted_range, time_to_collision
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class State:
+    def __init__(self, vx=0.0, vy=0.0):
+        self.v = (vx, vy, 0.0)
+
+    def velocity(self):
+        return self.v
+
+
+class Latency:
+    def __init__(self, value=0.03):
+        self.value = value
+
+
+def reaction(front, vx, age=0.05, **params):
+    clock = Clock()
+    ranges = RangeStream(clock=clock)
+    ranges.push(0, front, 2.0, 2.0, 2.0, None)
+    clock.now = age
+    return ObstacleReaction(ranges, State(vx), Latency(), **params)
+
+
+def test_geometry_helpers():
+    assert closing_speed((0.5, -0.2, 0.0), FRONT) == 0.5
+    assert closing_speed((0.5, -0.2, 0.0), BACK) == -0.5
+    assert closing_speed(None, FRONT) == 0.0
+    assert predicted_range(1.0, 0.5, 0.2) == pytest.approx(0.9)
+    assert predicted_range(1.0, -0.5, 0.2) == 1.0               # moving away never closes in
+    assert time_to_collision(1.0, 0.5) == 2.0 and time_to_collision(1.0, 0.0) == float("inf")
+
+
+def test_a_fast_drone_reacts_where_a_slow_one_flies_on():
+    slow, fast = reaction(0.4, 0.1), reaction(0.4, 1.0)
+
+    assert not slow.front()
+    assert fast.front()
+    direction, distance, remaining, ttc = fast.last
+    assert (direction, distance) == (FRONT, 0.4)
+    assert remaining == pytest.approx(0.4 - 1.0 * (0.05 + 0.03))
+
+
+def test_old_readings_count_against_the_clearance():
+    assert not reaction(0.5, 0.6, age=0.0).front()
+    assert reaction(0.5, 0.6, age=0.3).front()        # 0.33 s closing in at 0.6 m/s eats the margin
+
+
+def test_the_ttc_horizon_fires_before_the_braking_check():
+    r = reaction(0.6, 1.5, age=0.0, margin=0.0, decel=100.0, horizon=0.5)
+    assert r.front() and r.last[3] < 0.5
+
+
+def test_hysteresis_holds_the_trigger_until_clear():
+    clock = Clock()
+    ranges = RangeStream(clock=clock)
+    r = ObstacleReaction(ranges, State(), Latency(), margin=0.25, hysteresis=0.05)
+    assert not r.front()                            # no sample yet
+
+    states = []
+    for d in (0.3, 0.24, 0.28, 0.31, 0.28):
+        ranges.push(0, d, None, None, None, None)
+        states.append(r.front())
+
+    assert states == [False, True, True, False, False]
+    ranges.push(0, 0.1, None, None, None, None)
+    assert r.front()
+    ranges.push(0, None, None, None, None, None)
+    assert not r.front() and FRONT not in r.triggered
+    assert not r.back()                             # back out of range
+
+
+def test_command_latency_smooths_link_pings():
+    latency_updated = SimpleNamespace(add_callback=lambda cb: callbacks.append(cb))
+    callbacks = []
+    cf = SimpleNamespace(link_statistics=SimpleNamespace(latency=SimpleNamespace(latency_updated=latency_updated)))
+    latency = CommandLatency(SimpleNamespace(cf=cf), default=0.05)
+    assert latency.value == 0.05
+
+    callbacks[0](20.0)
+    assert latency.value == pytest.approx(0.02 + 2 * 0.01)
+    for _ in range(200):
+        latency.observe(0.02)
+    assert latency.value == pytest.approx(0.02, abs=1e-6)
+    latency.observe(0.1)
+    assert 0.02 < latency.value < 0.1                # one late ping only nudges it
+
+    assert CommandLatency(object()).value == 0.03    # no link statistics: the default